@@ -6,17 +6,23 @@ from flasgger import Swagger
 from flask_wtf.csrf import CSRFProtect
 from werkzeug.middleware.proxy_fix import ProxyFix
 import os
-import redis
 
-from app.cache import CacheManager
+from app.cache import CacheManager, CacheLocal
+from app.identidad import identidades
+from app.metricas import metricas
+from app.trabajos import trabajos
+from app.redis_resiliente import crear_cliente
 from app.config import config
 from app.models import db
+from app.models.sqlite import configurar_sqlite
+from app.models.enrutado import configurar_lectura, engine_lectura
 
 # Inicializar extensiones globalmente (sin vincular a app todavía)
 migrate = Migrate(compare_type=True)
 csrf = CSRFProtect()
 swagger = Swagger()
 redis_client = None
+redis_raw_client = None # Mismo servidor, respuestas en bytes (caché de respuestas HTTP)
 
 # Directorio base de la aplicación
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -67,8 +73,10 @@ def create_app(config_name='default'):
 # Inicializar extensiones Flask
 def initialize_extensions(app):
  
-    # Base de datos
+    # Base de datos (con el perfil SQLite y, si está configurado, el engine de lectura)
     db.init_app(app)
+    configurar_sqlite(app, db)
+    configurar_lectura(app, db)
     migrate.init_app(app, db)
     print("SQLAlchemy y Flask-Migrate inicializados")
     
@@ -76,26 +84,109 @@ def initialize_extensions(app):
     csrf.init_app(app)
     print("CSRF Protection activado")
     
-    # Redis para caché
-    global redis_client
+    # Redis, caché y métricas
+    initialize_redis(app)
+
+# Crear los clientes Redis y los componentes que dependen de ellos
+def initialize_redis(app):
+    
+    # Timeouts explícitos, pool acotado y circuit breaker compartido por los dos clientes
+    # (si Redis cae, la caché se desactiva y se reactiva sola)
+    global redis_client, redis_raw_client
+    redis_client = crear_cliente(app.config['REDIS_URL'], app.config, decode_responses=True)
+    redis_raw_client = crear_cliente(app.config['REDIS_URL'], app.config, breaker=redis_client.breaker)
     try:
-        redis_client = redis.from_url(
-            app.config['REDIS_URL'], 
-            decode_responses=True
-        )
         redis_client.ping()
         print("Redis conectado correctamente")
-        
-        # Inicializar gestor de caché
-        cache_manager = CacheManager(redis_client)
-        app.cache_manager = cache_manager
-        print("CacheManager inicializado")
-        
     except Exception as e:
         print(f" Redis no disponible: {e}")
-        print("   La aplicación funcionará sin caché")
-        redis_client = None
-        app.cache_manager = None
+        print("   La aplicación funcionará sin caché hasta que Redis responda")
+        redis_client.breaker.abrir()
+    
+    # Inicializar gestor de caché
+    l1 = None
+    if app.config.get('CACHE_L1_ENABLED'):
+        l1 = CacheLocal()
+        l1.init_app(app, redis_client)
+    cache_manager = CacheManager(redis_client, l1)
+    app.cache_manager = cache_manager
+    print("CacheManager inicializado")
+    
+    # Caché de identidades (invalidada por pub/sub si hay Redis)
+    identidades.init_app(app, redis_client)
+    print("Caché de identidades inicializada")
+    
+    # Métricas de caché y peticiones agregadas entre workers (requieren Redis)
+    metricas.init_app(app, redis_client)
+    print("Métricas compartidas inicializadas")
+    
+    # Cola de trabajos en segundo plano (consumida por worker.py; sin Redis, hilos locales)
+    trabajos.init_app(app, redis_client)
+    print("Cola de trabajos inicializada")
+
+# Con preload_app=True la app se crea en el master y los workers heredan sus conexiones.
+# Llamar en cada worker justo tras el fork (hook post_fork de gunicorn): descarta el pool
+# de SQLAlchemy heredado sin cerrar los sockets del master y crea pools Redis propios,
+# dimensionados para la concurrencia del worker
+def reinit_worker(app, concurrency=None):
+    
+    with app.app_context():
+        for engine in [*db.engines.values(), engine_lectura(app)]:
+            if engine is not None:
+                engine.dispose(close=False) # Los sockets heredados siguen siendo del master
+    
+    if concurrency:
+        app.config['REDIS_MAX_CONNECTIONS'] = redis_connections(app, concurrency)
+    initialize_redis(app)
+    print(f"Worker {os.getpid()}: pools de base de datos y Redis recreados")
+
+# Conexiones Redis que necesita un worker a la vez: una por hilo de petición (el volcado de
+# métricas va en la propia petición), una fija por listener pub/sub (identidades y, si está
+# activa, la L1), una por hilo de trabajos locales y la del sondeo del circuit breaker
+def redis_connections(app, concurrency):
+    listeners = 1 + bool(app.config.get('CACHE_L1_ENABLED'))
+    return concurrency + listeners + app.config.get('JOBS_THREADS', 2) + 1
+
+# Dejar listas las cachés del worker antes de su primera petición (hook post_worker_init):
+# se vacían las copias heredadas y se suscriben ya los listeners de invalidación
+def seed_worker_caches(app):
+    
+    identidades.limpiar()
+    identidades.suscribir()
+    if app.cache_manager and app.cache_manager.l1:
+        app.cache_manager.l1.limpiar()
+        app.cache_manager.l1.suscribir()
+    print(f"Worker {os.getpid()}: cachés locales listas")
+
+# Hacer en el master, antes del fork (hook when_ready), el trabajo perezoso que cada worker
+# repetiría en su primera petición; los workers lo heredan ya hecho y compartido por copy-on-write
+def warm_up(app):
+    
+    from sqlalchemy.orm import configure_mappers
+    from app import schemas
+    from app.models import User, Producto
+    
+    # Mappers de SQLAlchemy
+    configure_mappers()
+    
+    # Compilar todas las plantillas Jinja (quedan en la caché del entorno)
+    for nombre in app.jinja_env.list_templates():
+        app.jinja_env.get_template(nombre)
+    
+    # Especificación de Swagger (flasgger la guarda fuera de modo debug)
+    with app.test_request_context():
+        for spec in app.swag.config['specs']:
+            app.swag.get_apispecs(spec['endpoint'])
+    
+    # Esquemas de marshmallow: serializar y validar una vez cada uno
+    for schema, modelo in ((schemas.user_schema, User), (schemas.producto_schema, Producto)):
+        schema.dump(modelo())
+        schemas.schema_para(type(schema), many=True).dump([modelo()])
+    for schema in (schemas.user_schema, schemas.user_update_schema, schemas.producto_schema,
+                   schemas.stock_delta_schema, schemas.stock_batch_schema):
+        schema.validate({})
+    
+    print(f"Master {os.getpid()}: mappers, plantillas, Swagger y esquemas precalentados")
 
 # Configurar Swagger para documentación automática de la API REST
 def configure_swagger(app):
@@ -149,10 +240,12 @@ def register_blueprints(app):
     #  BLUEPRINTS API REST  
     from app.blueprints.usuarios import bp as usuarios_bp
     from app.blueprints.productos import bp as productos_bp
+    from app.blueprints.trabajos import bp as trabajos_bp
     
     # Exentar APIs de CSRF (usan JWT en su lugar)
     csrf.exempt(usuarios_bp)
     csrf.exempt(productos_bp)
+    csrf.exempt(trabajos_bp)
     
     app.register_blueprint(usuarios_bp, url_prefix='/api')
     print("Blueprint API 'usuarios' registrado en /api")
@@ -160,6 +253,9 @@ def register_blueprints(app):
     app.register_blueprint(productos_bp, url_prefix='/api')
     print("Blueprint API 'productos' registrado en /api")
     
+    app.register_blueprint(trabajos_bp, url_prefix='/api')
+    print("Blueprint API 'trabajos' registrado en /api")
+    
     print("-" * 60)
     print("Todos los Blueprints registrados correctamente\n")
 
@@ -1,6 +1,7 @@
 #---- Controladores principales de la aplicación -----
 
 from flask import render_template, request, redirect, make_response, session, current_app
+from app.identidad import identidades
 from app.models import User
 from app.utils import get_real_scheme
 
@@ -66,11 +67,11 @@ class MainController:
     def usuario_protegido():
     
         username = request.user
-        user = User.query.filter_by(username=username).first()
+        user = identidades.resolver(username) # Sin consulta a la BD si ya está en caché
         
         if user:
             return render_template("usuario_protegido.html", 
-                                 username=user.username, role=user.role)
+                                 username=username, role=user.role)
         else:
             return render_template("usuario_protegido.html", 
                                  username="Desconocido", role="N/A")
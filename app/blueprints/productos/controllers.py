@@ -1,9 +1,53 @@
 # ----- Controladores para la gestión de productos -----
 
-from flask import request, jsonify
+import json
+from datetime import datetime, timezone
+from flask import request, jsonify, current_app, abort, Response, stream_with_context
 from marshmallow import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from app.identidad import identidades
 from app.models import db, User, Producto
-from app.schemas import producto_schema, productos_schema
+from app.models.busqueda import buscar_productos, rank_productos
+from app.models.estadisticas import ProductoStats, STATS_GLOBAL, contribucion, registrar_cambio
+from app.pagination import parse_paginacion, paginar_keyset
+from app.utils import etag_version, no_modificado, respuesta_304
+from app.schemas import (producto_schema, productos_schema, ProductoSchema,
+                         stock_delta_schema, stock_batch_schema,
+                         parse_fields, schema_para, columnas_para)
+
+# Orden estable para la paginación keyset de productos
+ORDEN_PRODUCTOS = (Producto.created_at, Producto.id)
+TIPOS_CURSOR_PRODUCTOS = (datetime.fromisoformat, int)
+CAMPOS_CURSOR_PRODUCTOS = ('created_at', 'id')
+
+# Clave de caché de cada producto (los listados no se cachean)
+CACHE_PRODUCTO = "producto:{id}"
+
+# Interpretar una fecha ISO como UTC sin zona (igual que created_at)
+def _parse_fecha(valor):
+    fecha = datetime.fromisoformat(valor)
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+# Filtros admitidos en /api/productos: parámetro -> (conversor, condición, orden indexado)
+# El orden indexado es la ordenación por defecto cuando llega el filtro sin ?sort=,
+# así SQLite busca por el índice del filtro en lugar de recorrer el de created_at
+FILTROS_PRODUCTOS = {
+    'precio_min': (float, lambda v: Producto.precio >= v, 'precio'),
+    'precio_max': (float, lambda v: Producto.precio <= v, 'precio'),
+    'stock_gt': (int, lambda v: Producto.stock > v, 'stock'),
+    'user_id': (int, lambda v: Producto.user_id == v, 'created_at'),
+    'created_after': (_parse_fecha, lambda v: Producto.created_at > v, 'created_at'),
+}
+
+# Ordenaciones admitidas en ?sort=: nombre -> (columna, conversor del cursor)
+ORDENES_PRODUCTOS = {
+    'created_at': (Producto.created_at, datetime.fromisoformat),
+    'precio': (Producto.precio, float),
+    'stock': (Producto.stock, int),
+}
 
 
 class ProductoController:
@@ -19,7 +63,7 @@ class ProductoController:
             return jsonify({"errors": err.messages}), 400
         
         # Obtener el usuario actual (viene del decorador @token_requerido)
-        user = User.query.filter_by(username=request.user).first()
+        user = identidades.resolver(request.user)
         if not user:
             return jsonify({"error": "Usuario no encontrado"}), 404
         
@@ -32,8 +76,9 @@ class ProductoController:
             user_id=user.id
         )
         
-        # Guardar en la base de datos
+        # Guardar en la base de datos junto con los agregados
         db.session.add(producto)
+        registrar_cambio(user.id, **contribucion(producto.precio, producto.stock))
         db.session.commit()
         
         return jsonify({
@@ -41,20 +86,240 @@ class ProductoController:
             "producto": producto.to_dict()
         }), 201
     
-    # Listar todos los productos
+    # Crear muchos productos en una sola transacción
+    @staticmethod
+    def create_productos_bulk():
+        
+        items = request.get_json(silent=True)
+        maximo = current_app.config.get('BULK_MAX_ITEMS', 1000)
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Se esperaba una lista no vacía de productos"}), 400
+        if len(items) > maximo:
+            return jsonify({"error": f"Máximo {maximo} productos por petición"}), 400
+        
+        # Validar todos los elementos de una vez; los errores vienen indexados por posición
+        try:
+            data = productos_schema.load(items)
+            errores = {}
+        except ValidationError as err:
+            data = err.valid_data
+            errores = err.messages
+        
+        user = identidades.resolver(request.user)
+        if not user:
+            return jsonify({"error": "Usuario no encontrado"}), 404
+        
+        validos = [i for i in range(len(items)) if i not in errores]
+        filas = [{
+            'nombre': data[i]['nombre'],
+            'descripcion': data[i].get('descripcion'),
+            'precio': data[i]['precio'],
+            'stock': data[i].get('stock', 0),
+            'user_id': user.id
+        } for i in validos]
+        
+        # Un único executemany y un único commit para todo el lote
+        ids = []
+        if filas:
+            ids = db.session.scalars(
+                insert(Producto).returning(Producto.id, sort_by_parameter_order=True),
+                filas
+            ).all()
+            
+            # Sumar el lote completo a los agregados con un solo UPSERT
+            aportes = [contribucion(f['precio'], f['stock']) for f in filas]
+            registrar_cambio(user.id, **{k: sum(a[k] for a in aportes) for k in aportes[0]})
+            db.session.commit()
+        
+        resultados = [{"index": i, "status": 400, "errors": errores[i]} for i in errores]
+        resultados += [{"index": i, "status": 201, "id": id_} for i, id_ in zip(validos, ids)]
+        resultados.sort(key=lambda r: r['index'])
+        
+        if not filas:
+            status = 400
+        elif errores:
+            status = 207
+        else:
+            status = 201
+        
+        return jsonify({
+            "created": len(ids),
+            "failed": len(errores),
+            "results": resultados
+        }), status
+    
+    # Listar productos paginados por cursor
     @staticmethod
     def get_productos():
         
-        productos = Producto.query.all()
-        result = productos_schema.dump(productos)
-        return jsonify(result), 200
+        # Modo streaming para descargar el catálogo completo
+        if ProductoController._quiere_stream():
+            return ProductoController.stream_productos()
+        
+        try:
+            campos = parse_fields(request.args.get('fields'), ProductoSchema)
+            limit, cursor = parse_paginacion()
+            columnas, tipos, descendente = ProductoController._parse_orden(request.args)
+            query = ProductoController._aplicar_filtros(Producto.query, request.args)
+            productos, next_cursor = paginar_keyset(
+                ProductoController._query_campos(campos, query, [c.key for c in columnas]),
+                columnas, tipos, limit, cursor, descendente=descendente
+            )
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+        
+        return jsonify({
+            "productos": schema_para(ProductoSchema, campos, many=True).dump(productos),
+            "limit": limit,
+            "next_cursor": next_cursor
+        }), 200
+    
+    # Consulta de productos que solo lee las columnas pedidas en ?fields=
+    @staticmethod
+    def _query_campos(campos, query=None, extra=CAMPOS_CURSOR_PRODUCTOS):
+        
+        query = Producto.query if query is None else query
+        if campos is None:
+            return query
+        # Las columnas del cursor se leen siempre para poder construir next_cursor
+        return query.options(columnas_para(Producto, campos, extra))
+    
+    # Aplicar los filtros de FILTROS_PRODUCTOS presentes en la query string
+    @staticmethod
+    def _aplicar_filtros(query, args):
+        
+        for nombre, (conversor, condicion, _) in FILTROS_PRODUCTOS.items():
+            valor = args.get(nombre)
+            if valor is None:
+                continue
+            try:
+                query = query.filter(condicion(conversor(valor)))
+            except ValueError:
+                raise ValueError(f"Valor inválido para {nombre}: {valor}")
+        return query
+    
+    # Ordenación que aprovecha el índice del primer filtro de rango presente
+    @staticmethod
+    def _orden_por_defecto(args):
+        
+        for nombre, (_, _, orden) in FILTROS_PRODUCTOS.items():
+            if nombre in args:
+                return orden
+        return 'created_at'
+    
+    # Columnas de orden keyset según ?sort= (prefijo '-' para descendente)
+    @staticmethod
+    def _parse_orden(args):
+        
+        sort = args.get('sort') or ProductoController._orden_por_defecto(args)
+        descendente = sort.startswith('-')
+        nombre = sort.lstrip('-')
+        
+        if nombre not in ORDENES_PRODUCTOS:
+            raise ValueError(f"Ordenación no permitida: {nombre}. Use: {', '.join(ORDENES_PRODUCTOS)}")
+        
+        columna, conversor = ORDENES_PRODUCTOS[nombre]
+        if columna is Producto.created_at:
+            return ORDEN_PRODUCTOS, TIPOS_CURSOR_PRODUCTOS, descendente
+        return (columna, Producto.id), (conversor, int), descendente
+    
+    # Detectar si el cliente pide NDJSON (Accept o ?stream=1)
+    @staticmethod
+    def _quiere_stream():
+        
+        if request.args.get('stream') in ('1', 'true'):
+            return True
+        return request.accept_mimetypes.best == 'application/x-ndjson'
     
-    # Obtener un producto por id
+    # Emitir todos los productos como NDJSON leyendo la tabla por lotes
+    @staticmethod
+    def stream_productos():
+        
+        try:
+            campos = parse_fields(request.args.get('fields'), ProductoSchema)
+            query = ProductoController._aplicar_filtros(Producto.query, request.args)
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+        
+        batch = current_app.config.get('STREAM_BATCH_SIZE', 1000)
+        query = ProductoController._query_campos(campos, query).order_by(*ORDEN_PRODUCTOS).yield_per(batch)
+        schema = schema_para(ProductoSchema, campos)
+        
+        def generar():
+            for producto in query:
+                yield json.dumps(schema.dump(producto), ensure_ascii=False) + "\n"
+        
+        return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+    
+    # Gestor de caché de la app (None si Redis no está disponible)
+    @staticmethod
+    def _cache():
+        return getattr(current_app, 'cache_manager', None)
+    
+    # Write-through tras un commit: refrescar el producto o borrar las claves de los ids
+    @staticmethod
+    def _invalidar_cache(ids=(), producto=None):
+        
+        cache = ProductoController._cache()
+        if not cache:
+            return
+        
+        if producto is not None:
+            cache.set(CACHE_PRODUCTO.format(id=producto.id), producto.to_dict(),
+                      ttl=current_app.config.get('PRODUCTO_CACHE_TTL', 300))
+        if ids:
+            cache.delete_many(CACHE_PRODUCTO.format(id=id) for id in ids)
+    
+    # Obtener un producto por id (read-through sobre producto:<id>)
     @staticmethod
     def get_producto(id):
      
-        producto = Producto.query.get_or_404(id)
-        return jsonify(producto.to_dict()), 200
+        try:
+            campos = parse_fields(request.args.get('fields'), ProductoSchema)
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+        
+        cache = ProductoController._cache()
+        cache_key = CACHE_PRODUCTO.format(id=id)
+        cached = cache.get(cache_key) if cache else None
+        
+        # Resolver If-None-Match antes de leer la fila completa o serializar
+        if cached is not None and 'version' in cached:
+            version = cached['version']
+        elif request.if_none_match:
+            version = db.session.query(Producto.version).filter_by(id=id).scalar() # Solo la columna version
+            if version is None:
+                abort(404)
+        else:
+            version = None
+        
+        if version is not None:
+            etag = etag_version(id, version, campos)
+            if no_modificado(etag):
+                return respuesta_304(etag)
+        
+        if cached is not None:
+            data = cached if campos is None else {c: cached[c] for c in campos}
+            version = cached.get('version')
+        elif campos is None:
+            producto = Producto.query.get_or_404(id)
+            data = producto.to_dict()
+            version = producto.version
+            if cache:
+                cache.set(cache_key, data, ttl=current_app.config.get('PRODUCTO_CACHE_TTL', 300))
+        else:
+            # Con ?fields= solo se leen las columnas pedidas y no se rellena la caché
+            producto = Producto.query.options(
+                columnas_para(Producto, campos, ('id', 'version'))
+            ).get_or_404(id)
+            data = schema_para(ProductoSchema, campos).dump(producto)
+            version = producto.version
+        
+        response = jsonify(data)
+        if version is not None:
+            response.set_etag(etag_version(id, version, campos))
+        return response, 200
     
     # Actualizar un producto por id
     @staticmethod
@@ -63,8 +328,8 @@ class ProductoController:
         producto = Producto.query.get_or_404(id)
         
         # Verificar que el usuario sea el dueño o admin
-        user = User.query.filter_by(username=request.user).first()
-        if producto.user_id != user.id and request.role != 'admin':
+        user = identidades.resolver(request.user)
+        if (not user or producto.user_id != user.id) and request.role != 'admin':
             return jsonify({
                 "error": "No tienes permiso para modificar este producto"
             }), 403
@@ -75,6 +340,9 @@ class ProductoController:
         except ValidationError as err:
             return jsonify({"errors": err.messages}), 400
         
+        # Restar la contribución anterior a los agregados antes de modificar
+        antes = contribucion(producto.precio, producto.stock, -1)
+        
         # Actualizar solo los campos proporcionados
         if 'nombre' in data:
             producto.nombre = data['nombre']
@@ -85,7 +353,16 @@ class ProductoController:
         if 'stock' in data:
             producto.stock = data['stock']
         
-        db.session.commit()
+        despues = contribucion(producto.precio, producto.stock)
+        registrar_cambio(producto.user_id, **{k: antes[k] + despues[k] for k in despues})
+        try:
+            db.session.commit()
+        except StaleDataError: # Otra escritura (p. ej. POST /stock) cambió la versión entre la lectura y el flush
+            db.session.rollback()
+            return jsonify({
+                "error": "El producto ha cambiado mientras se actualizaba; vuelve a leerlo y reintenta"
+            }), 409
+        ProductoController._invalidar_cache(producto=producto)
         
         return jsonify({
             "message": "Producto actualizado",
@@ -99,17 +376,162 @@ class ProductoController:
         producto = Producto.query.get_or_404(id)
         
         # Verificar que el usuario sea el dueño o admin
-        user = User.query.filter_by(username=request.user).first()
-        if producto.user_id != user.id and request.role != 'admin':
+        user = identidades.resolver(request.user)
+        if (not user or producto.user_id != user.id) and request.role != 'admin':
             return jsonify({
                 "error": "No tienes permiso para eliminar este producto"
             }), 403
         
         db.session.delete(producto)
-        db.session.commit()
+        registrar_cambio(producto.user_id, **contribucion(producto.precio, producto.stock, -1))
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            return jsonify({
+                "error": "El producto ha cambiado mientras se eliminaba; vuelve a leerlo y reintenta"
+            }), 409
+        ProductoController._invalidar_cache(ids=[id])
         
         return jsonify({"message": "Producto eliminado"}), 200
     
+    # Búsqueda de texto completo ordenada por relevancia (bm25)
+    @staticmethod
+    def search_productos():
+        
+        texto = (request.args.get('q') or '').strip()
+        if not texto:
+            return jsonify({"error": "El parámetro q es obligatorio"}), 400
+        
+        try:
+            campos = parse_fields(request.args.get('fields'), ProductoSchema)
+            limit, cursor = parse_paginacion()
+            query = buscar_productos(texto)
+            if campos is not None:
+                query = query.options(columnas_para(Producto, campos, ('id',)))
+            filas, next_cursor = paginar_keyset(
+                query, (rank_productos, Producto.id), (float, int), limit, cursor,
+                clave=lambda fila: (fila.rank, fila.Producto.id)
+            )
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+        
+        productos = [fila.Producto for fila in filas]
+        return jsonify({
+            "productos": schema_para(ProductoSchema, campos, many=True).dump(productos),
+            "limit": limit,
+            "next_cursor": next_cursor
+        }), 200
+    
+    # Sumar delta al stock con un único UPDATE condicional (sin leer la fila antes)
+    @staticmethod
+    def _aplicar_delta(id, delta, user_id):
+        
+        stock = func.coalesce(Producto.stock, 0)
+        condiciones = [Producto.id == id, stock + delta >= 0]
+        
+        # Reponer stock solo lo puede hacer el dueño o un admin
+        if delta > 0 and request.role != 'admin':
+            condiciones.append(Producto.user_id == user_id)
+        
+        stmt = (
+            update(Producto)
+            .where(*condiciones)
+            .values(stock=stock + delta, version=Producto.version + 1) # Mantener el ETag coherente
+            .returning(Producto.stock, Producto.precio, Producto.user_id)
+        )
+        fila = db.session.execute(stmt, execution_options={'synchronize_session': False}).one_or_none()
+        
+        # El UPDATE devuelve precio y dueño: los agregados se ajustan sin leer la fila
+        if fila is not None:
+            registrar_cambio(fila.user_id, total_stock=delta, valor_stock=fila.precio * delta)
+            return fila.stock
+        return None
+    
+    # Explicar por qué no se aplicó un delta (solo se consulta en el camino de error)
+    @staticmethod
+    def _fallo_delta(id, delta, user_id):
+        
+        producto = db.session.get(Producto, id)
+        if producto is None:
+            return {"error": "Producto no encontrado", "id": id}, 404
+        if delta > 0 and request.role != 'admin' and producto.user_id != user_id:
+            return {"error": "No tienes permiso para reponer este producto", "id": id}, 403
+        return {"error": "Stock insuficiente", "id": id, "stock": producto.stock or 0}, 409
+    
+    # Id del usuario actual, solo necesario para reponer stock
+    @staticmethod
+    def _user_id_si_repone(deltas):
+        
+        if request.role == 'admin' or all(d < 0 for d in deltas):
+            return None
+        user = identidades.resolver(request.user)
+        return user.id if user else None
+    
+    # Reservar o reponer stock de un producto
+    @staticmethod
+    def update_stock(id):
+        
+        try:
+            data = stock_delta_schema.load(request.json or {})
+        except ValidationError as err:
+            return jsonify({"errors": err.messages}), 400
+        
+        delta = data['delta']
+        user_id = ProductoController._user_id_si_repone([delta])
+        nuevo = ProductoController._aplicar_delta(id, delta, user_id)
+        
+        if nuevo is None:
+            db.session.rollback()
+            body, status = ProductoController._fallo_delta(id, delta, user_id)
+            return jsonify(body), status
+        
+        db.session.commit()
+        ProductoController._invalidar_cache(ids=[id])
+        return jsonify({"message": "Stock actualizado", "id": id, "stock": nuevo}), 200
+    
+    # Reservar stock de varios productos en una transacción (todo o nada)
+    @staticmethod
+    def update_stock_batch():
+        
+        try:
+            data = stock_batch_schema.load(request.json or {})
+        except ValidationError as err:
+            return jsonify({"errors": err.messages}), 400
+        
+        items = data['items']
+        user_id = ProductoController._user_id_si_repone([i['delta'] for i in items])
+        
+        resultados = []
+        for item in items:
+            nuevo = ProductoController._aplicar_delta(item['id'], item['delta'], user_id)
+            if nuevo is None:
+                db.session.rollback() # Deshacer las reservas anteriores del lote
+                body, status = ProductoController._fallo_delta(item['id'], item['delta'], user_id)
+                return jsonify(body), status
+            resultados.append({"id": item['id'], "stock": nuevo})
+        
+        db.session.commit()
+        ProductoController._invalidar_cache(ids=[item['id'] for item in resultados])
+        return jsonify({"message": "Stock actualizado", "productos": resultados}), 200
+    
+    # Agregados de productos servidos desde la tabla resumen
+    @staticmethod
+    def get_stats():
+        
+        user_id = request.args.get('user_id', type=int)
+        vacio = ProductoStats(total_productos=0, total_stock=0, valor_stock=0.0, suma_precios=0.0)
+        
+        ids = [STATS_GLOBAL] if user_id is None else [STATS_GLOBAL, user_id]
+        filas = {f.user_id: f for f in ProductoStats.query.filter(ProductoStats.user_id.in_(ids))}
+        
+        result = {"global": filas.get(STATS_GLOBAL, vacio).to_dict()}
+        if user_id is not None:
+            result["user_id"] = user_id
+            result["usuario"] = filas.get(user_id, vacio).to_dict()
+        
+        return jsonify(result), 200
+    
     # PRODUCTOS POR USUARIO
     @staticmethod
     def get_productos_usuario(user_id):
@@ -117,12 +539,29 @@ class ProductoController:
         # Verificar que el usuario existe
         user = User.query.get_or_404(user_id)
         
-        # Obtener productos del usuario
-        productos = Producto.query.filter_by(user_id=user_id).all()
-        result = productos_schema.dump(productos)
+        # Obtener una página de productos del usuario
+        try:
+            campos = parse_fields(request.args.get('fields'), ProductoSchema)
+            limit, cursor = parse_paginacion()
+            productos, next_cursor = paginar_keyset(
+                ProductoController._query_campos(campos, Producto.query.filter_by(user_id=user_id)),
+                ORDEN_PRODUCTOS, TIPOS_CURSOR_PRODUCTOS, limit, cursor
+            )
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+        
+        result = schema_para(ProductoSchema, campos, many=True).dump(productos)
+        
+        # Total del usuario (no de la página) desde su fila de agregados; sin fila, un COUNT indexado
+        stats = db.session.get(ProductoStats, user_id)
+        total = stats.total_productos if stats else db.session.scalar(
+            select(func.count()).select_from(Producto).where(Producto.user_id == user_id)
+        )
         
         return jsonify({
             "user": user.username,
             "productos": result,
-            "total": len(result)
+            "total": total,
+            "limit": limit,
+            "next_cursor": next_cursor
         }), 200
@@ -52,31 +52,163 @@ def create_producto():
     return ProductoController.create_producto()
 
 
+#  CREAR PRODUCTOS EN LOTE 
+@bp.route('/productos/bulk', methods=['POST'])
+@token_requerido
+
+@swag_from({
+    'tags': ['Productos'],
+    'summary': 'Crear varios productos en una sola transacción',
+    'security': [{'Bearer': []}],
+    'parameters': [{
+        'name': 'body',
+        'in': 'body',
+        'required': True,
+        'schema': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['nombre', 'precio'],
+                'properties': {
+                    'nombre': {'type': 'string', 'example': 'Laptop HP'},
+                    'descripcion': {'type': 'string', 'example': 'Laptop gaming 16GB RAM'},
+                    'precio': {'type': 'number', 'example': 899.99},
+                    'stock': {'type': 'integer', 'example': 10}
+                }
+            }
+        }
+    }],
+
+    'responses': {
+        201: {
+            'description': 'Todos los productos creados',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'created': {'type': 'integer'},
+                    'failed': {'type': 'integer'},
+                    'results': {'type': 'array', 'items': {'type': 'object'}}
+                }
+            }
+        },
+
+        207: {'description': 'Algunos productos creados y otros con errores de validación'},
+        400: {'description': 'Ningún producto válido o lote demasiado grande'},
+        401: {'description': 'No autenticado'},
+        404: {'description': 'Usuario no encontrado'}
+    }
+})
+def create_productos_bulk():
+    return ProductoController.create_productos_bulk()
+
+
 #  LISTAR PRODUCTOS 
 @bp.route('/productos', methods=['GET'])
 
 @swag_from({
     'tags': ['Productos'],
-    'summary': 'Listar todos los productos',
+    'summary': 'Listar productos filtrados y paginados por cursor',
+    'parameters': [
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Número máximo de productos por página'
+        },
+        {
+            'name': 'cursor',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Cursor opaco devuelto en next_cursor'
+        },
+        {
+            'name': 'stream',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Con stream=1 (o Accept: application/x-ndjson) devuelve el catálogo completo en NDJSON'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Campos a devolver separados por comas (ej. id,nombre,precio)'
+        },
+        {
+            'name': 'precio_min',
+            'in': 'query',
+            'type': 'number',
+            'required': False,
+            'description': 'Precio mínimo (incluido)'
+        },
+        {
+            'name': 'precio_max',
+            'in': 'query',
+            'type': 'number',
+            'required': False,
+            'description': 'Precio máximo (incluido)'
+        },
+        {
+            'name': 'stock_gt',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Solo productos con stock mayor que este valor'
+        },
+        {
+            'name': 'user_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Solo productos de este usuario'
+        },
+        {
+            'name': 'created_after',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Solo productos creados después de esta fecha ISO 8601'
+        },
+        {
+            'name': 'sort',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Ordenación: created_at, precio o stock (prefijo - para descendente). Por defecto la del filtro de rango usado'
+        }
+    ],
+    'produces': ['application/json', 'application/x-ndjson'],
     'responses': {
         200: {
-            'description': 'Lista de productos',
+            'description': 'Página de productos',
             'schema': {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer'},
-                        'nombre': {'type': 'string'},
-                        'descripcion': {'type': 'string'},
-                        'precio': {'type': 'number'},
-                        'stock': {'type': 'integer'},
-                        'user_id': {'type': 'integer'},
-                        'created_at': {'type': 'string'}
-                    }
+                'type': 'object',
+                'properties': {
+                    'productos': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id': {'type': 'integer'},
+                                'nombre': {'type': 'string'},
+                                'descripcion': {'type': 'string'},
+                                'precio': {'type': 'number'},
+                                'stock': {'type': 'integer'},
+                                'user_id': {'type': 'integer'},
+                                'created_at': {'type': 'string'}
+                            }
+                        }
+                    },
+                    'limit': {'type': 'integer'},
+                    'next_cursor': {'type': 'string'}
                 }
             }
-        }
+        },
+
+        400: {'description': 'Parámetros de paginación, filtro u ordenación inválidos'}
     }
 })
 
@@ -84,20 +216,127 @@ def get_productos():
     return ProductoController.get_productos()
 
 
-#  OBTENER PRODUCTO POR ID 
-@bp.route('/productos/<int:id>', methods=['GET'])
+#  BUSCAR PRODUCTOS 
+@bp.route('/productos/search', methods=['GET'])
 
 @swag_from({
     'tags': ['Productos'],
-    'summary': 'Obtener un producto por ID',
+    'summary': 'Buscar productos por nombre y descripción (texto completo)',
+    'parameters': [
+        {
+            'name': 'q',
+            'in': 'query',
+            'type': 'string',
+            'required': True,
+            'description': 'Términos a buscar (todos deben aparecer)'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Número máximo de productos por página'
+        },
+        {
+            'name': 'cursor',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Cursor opaco devuelto en next_cursor'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Campos a devolver separados por comas (ej. id,nombre,precio)'
+        }
+    ],
+
+    'responses': {
+        200: {
+            'description': 'Productos ordenados por relevancia',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'productos': {'type': 'array', 'items': {'type': 'object'}},
+                    'limit': {'type': 'integer'},
+                    'next_cursor': {'type': 'string'}
+                }
+            }
+        },
+
+        400: {'description': 'Falta q o parámetros inválidos'}
+    }
+})
+
+def search_productos():
+    return ProductoController.search_productos()
+
+
+#  ESTADÍSTICAS DE PRODUCTOS 
+@bp.route('/productos/stats', methods=['GET'])
+
+@swag_from({
+    'tags': ['Productos'],
+    'summary': 'Totales de productos, valor del stock y precio medio',
     'parameters': [{
-        'name': 'id',
-        'in': 'path',
+        'name': 'user_id',
+        'in': 'query',
         'type': 'integer',
-        'required': True,
-        'description': 'ID del producto'
+        'required': False,
+        'description': 'Incluir también los agregados de este usuario'
     }],
 
+    'responses': {
+        200: {
+            'description': 'Agregados globales (y del usuario si se indica)',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'global': {
+                        'type': 'object',
+                        'properties': {
+                            'total_productos': {'type': 'integer'},
+                            'total_stock': {'type': 'integer'},
+                            'valor_stock': {'type': 'number'},
+                            'precio_medio': {'type': 'number'}
+                        }
+                    },
+                    'usuario': {'type': 'object'}
+                }
+            }
+        }
+    }
+})
+
+def get_stats():
+    return ProductoController.get_stats()
+
+
+#  OBTENER PRODUCTO POR ID 
+@bp.route('/productos/<int:id>', methods=['GET'])
+
+@swag_from({
+    'tags': ['Productos'],
+    'summary': 'Obtener un producto por ID',
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID del producto'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Campos a devolver separados por comas (ej. id,nombre,precio)'
+        }
+    ],
+
     'responses': {
         200: {
             'description': 'Producto encontrado',
@@ -115,6 +354,7 @@ def get_productos():
             }
         },
 
+        304: {'description': 'No modificado (If-None-Match coincide con el ETag)'},
         404: {'description': 'Producto no encontrado'}
     }
 })
@@ -170,7 +410,8 @@ def get_producto(id):
         400: {'description': 'Error de validación'},
         401: {'description': 'No autenticado'},
         403: {'description': 'No tienes permiso'},
-        404: {'description': 'Producto no encontrado'}
+        404: {'description': 'Producto no encontrado'},
+        409: {'description': 'El producto cambió durante la actualización (escritura concurrente)'}
     }
 })
 
@@ -207,7 +448,8 @@ def update_producto(id):
 
         401: {'description': 'No autenticado'},
         403: {'description': 'No tienes permiso'},
-        404: {'description': 'Producto no encontrado'}
+        404: {'description': 'Producto no encontrado'},
+        409: {'description': 'El producto cambió durante la eliminación (escritura concurrente)'}
     }
 })
 
@@ -215,20 +457,142 @@ def delete_producto(id):
     return ProductoController.delete_producto(id)
 
 
-#  PRODUCTOS POR USUARIO 
-@bp.route('/productos/usuario/<int:user_id>', methods=['GET'])
+#  RESERVAR / REPONER STOCK 
+@bp.route('/productos/<int:id>/stock', methods=['POST'])
+@token_requerido
 
 @swag_from({
     'tags': ['Productos'],
-    'summary': 'Obtener productos de un usuario específico',
+    'summary': 'Sumar o restar stock de forma atómica',
+    'security': [{'Bearer': []}],
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID del producto'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'required': ['delta'],
+                'properties': {
+                    'delta': {'type': 'integer', 'example': -3}
+                }
+            }
+        }
+    ],
+
+    'responses': {
+        200: {
+            'description': 'Stock actualizado',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'id': {'type': 'integer'},
+                    'stock': {'type': 'integer'}
+                }
+            }
+        },
+
+        400: {'description': 'Error de validación'},
+        401: {'description': 'No autenticado'},
+        403: {'description': 'Solo el dueño o un admin pueden reponer stock'},
+        404: {'description': 'Producto no encontrado'},
+        409: {'description': 'Stock insuficiente'}
+    }
+})
+
+def update_stock(id):
+    return ProductoController.update_stock(id)
+
+
+#  RESERVAR STOCK DE VARIOS PRODUCTOS 
+@bp.route('/productos/stock', methods=['POST'])
+@token_requerido
+
+@swag_from({
+    'tags': ['Productos'],
+    'summary': 'Reservar stock de varios productos en una transacción (todo o nada)',
+    'security': [{'Bearer': []}],
     'parameters': [{
-        'name': 'user_id',
-        'in': 'path',
-        'type': 'integer',
+        'name': 'body',
+        'in': 'body',
         'required': True,
-        'description': 'ID del usuario'
+        'schema': {
+            'type': 'object',
+            'required': ['items'],
+            'properties': {
+                'items': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'id': {'type': 'integer', 'example': 1},
+                            'delta': {'type': 'integer', 'example': -2}
+                        }
+                    }
+                }
+            }
+        }
     }],
 
+    'responses': {
+        200: {'description': 'Stock actualizado en todos los productos'},
+        400: {'description': 'Error de validación'},
+        401: {'description': 'No autenticado'},
+        403: {'description': 'Solo el dueño o un admin pueden reponer stock'},
+        404: {'description': 'Producto no encontrado'},
+        409: {'description': 'Stock insuficiente en algún producto; no se aplica ningún cambio'}
+    }
+})
+
+def update_stock_batch():
+    return ProductoController.update_stock_batch()
+
+
+#  PRODUCTOS POR USUARIO 
+@bp.route('/productos/usuario/<int:user_id>', methods=['GET'])
+
+@swag_from({
+    'tags': ['Productos'],
+    'summary': 'Obtener productos de un usuario específico',
+    'parameters': [
+        {
+            'name': 'user_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID del usuario'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Número máximo de productos por página'
+        },
+        {
+            'name': 'cursor',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Cursor opaco devuelto en next_cursor'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Campos a devolver separados por comas (ej. id,nombre,precio)'
+        }
+    ],
+
     'responses': {
         200: {
             'description': 'Productos del usuario',
@@ -252,11 +616,14 @@ def delete_producto(id):
                         }
                     },
 
-                    'total': {'type': 'integer'}
+                    'total': {'type': 'integer', 'description': 'Productos del usuario (todas las páginas)'},
+                    'limit': {'type': 'integer'},
+                    'next_cursor': {'type': 'string'}
                 }
             }
         },
 
+        400: {'description': 'Parámetros de paginación inválidos'},
         404: {'description': 'Usuario no encontrado'}
     }
 })
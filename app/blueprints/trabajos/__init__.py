@@ -0,0 +1,9 @@
+# Inicializar las rutas del blueprint de trabajos en segundo plano
+
+from flask import Blueprint
+
+# Crear el blueprint
+bp = Blueprint('trabajos', __name__)
+
+# Importar las rutas (esto registra automáticamente todas las rutas)
+from . import routes
@@ -0,0 +1,20 @@
+# ---- Controlador de trabajos en segundo plano ----
+
+from flask import request, jsonify
+from app.trabajos import trabajos
+
+
+class TrabajoController:
+
+    # Estado de un trabajo: visible para los admins y para quien lo creó
+    @staticmethod
+    def get_trabajo(id):
+        
+        estado = trabajos.estado(id)
+        if estado is None:
+            return jsonify({"error": "Trabajo no encontrado"}), 404
+        
+        if request.role != 'admin' and request.user != estado['creado_por']:
+            return jsonify({"error": "No tienes permiso"}), 403
+        
+        return jsonify(estado), 200
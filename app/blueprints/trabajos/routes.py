@@ -0,0 +1,33 @@
+# ---- Rutas de trabajos en segundo plano ----
+
+from flasgger import swag_from
+from . import bp
+from .controllers import TrabajoController
+from app.utils import token_requerido
+
+# Estado de un trabajo
+@bp.route('/jobs/<string:id>', methods=['GET'])
+@token_requerido
+
+@swag_from({
+    'tags': ['Trabajos'],
+    'summary': 'Estado de un trabajo en segundo plano',
+    'description': 'Estados: en_cola, en_curso, reintentando, completado, fallido',
+    'security': [{'Bearer': []}],
+    'parameters': [{
+        'name': 'id',
+        'in': 'path',
+        'type': 'string',
+        'required': True,
+        'description': 'ID del trabajo devuelto al encolarlo'
+    }],
+
+    'responses': {
+        200: {'description': 'Estado, intentos y resultado o error del trabajo'},
+        403: {'description': 'Acceso denegado'},
+        404: {'description': 'Trabajo no encontrado o caducado'}
+    }
+})
+
+def get_trabajo(id):
+    return TrabajoController.get_trabajo(id)
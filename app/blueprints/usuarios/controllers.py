@@ -1,12 +1,19 @@
 # ---- Controlador de usuarios ----
 
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, abort, url_for
 from marshmallow import ValidationError
+from sqlalchemy.orm.exc import StaleDataError
 from app.models import db, User
-from app.schemas import user_schema, users_schema, user_update_schema
-from app.utils import generar_jwt
-from app.cache import invalidate_cache
-import json
+from app.models.estadisticas import eliminar_usuario_stats
+from app.models.purga import borrar_lote_productos, excede_lote
+from app.schemas import (user_schema, user_update_schema, UserSchema,
+                         parse_fields, schema_para, columnas_para)
+from app.utils import generar_jwt, etag_version, no_modificado, respuesta_304
+from app.cache import invalidate_namespace
+from app.identidad import identidades
+from app.metricas import metricas, resumen_peticiones
+from app.trabajos import tarea, trabajos
+from app.blueprints.productos.controllers import ProductoController
 
 
 class UsuarioController:
@@ -72,33 +79,17 @@ class UsuarioController:
     # Listar todos los usuarios (requiere admin)
     @staticmethod
     def get_usuarios():
-      
-        from app import redis_client
-        cache_key = "usuarios:all"
         
-        # Intentar obtener de caché
-        if redis_client:
-            try: # Leer desde Redis
-                cached = redis_client.get(cache_key)
-
-                if cached:
-                    print("✅ Datos obtenidos desde caché Redis")
-                    return jsonify(json.loads(cached)), 200
-                
-            except Exception as e: # Manejar errores de Redis
-                print(f"Error al leer de Redis: {e}")
-        
-        # Si no hay caché, consultar BD
-        users = User.query.all()
-        result = users_schema.dump(users)
-        
-        # Guardar en caché por 5 minutos
-        if redis_client:
-            try:
-                redis_client.setex(cache_key, 300, json.dumps(result))
-                print("✅ Datos guardados en caché Redis")
-            except Exception as e: # Manejar errores de Redis
-                print(f"Error al escribir en Redis: {e}")
+        # La respuesta ya codificada la cachea @cache_result en la ruta (clave con la query string)
+        try:
+            campos = parse_fields(request.args.get('fields'), UserSchema)
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+        
+        query = User.query
+        if campos is not None:
+            query = query.options(columnas_para(User, campos))
+        result = schema_para(UserSchema, campos, many=True).dump(query.all())
         
         return jsonify(result), 200
     
@@ -106,8 +97,31 @@ class UsuarioController:
     @staticmethod
     def get_usuario(id):
        
-        user = User.query.get_or_404(id) # Obtener usuario o 404
-        return jsonify(user.to_dict()), 200
+        try:
+            campos = parse_fields(request.args.get('fields'), UserSchema)
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+        
+        # Con If-None-Match se compara solo la columna version antes de cargar el usuario
+        if request.if_none_match:
+            version = db.session.query(User.version).filter_by(id=id).scalar()
+            if version is None:
+                abort(404)
+            etag = etag_version(id, version, campos)
+            if no_modificado(etag):
+                return respuesta_304(etag)
+        
+        if campos is None:
+            user = User.query.get_or_404(id) # Obtener usuario o 404
+            data = user.to_dict()
+        else:
+            # Leer solo las columnas pedidas
+            user = User.query.options(columnas_para(User, campos, ('id', 'version'))).get_or_404(id)
+            data = schema_para(UserSchema, campos).dump(user)
+        
+        response = jsonify(data)
+        response.set_etag(etag_version(id, user.version, campos))
+        return response, 200
     
     # Actualizar usuario
     @staticmethod
@@ -126,6 +140,7 @@ class UsuarioController:
             return jsonify({"errors": err.messages}), 400
         
         # Actualizar campos
+        username_anterior = user.username
         if 'username' in data:
             user.username = data['username']
         if 'email' in data:
@@ -133,10 +148,17 @@ class UsuarioController:
         if 'password' in data:
             user.set_password(data['password'])
         
-        db.session.commit()
-        
-        # Invalidar caché (write-through)
-        invalidate_cache("usuarios:*")
+        try:
+            db.session.commit()
+        except StaleDataError: # Otra petición actualizó el usuario entre la lectura y el flush
+            db.session.rollback()
+            return jsonify({
+                "error": "El usuario ha cambiado mientras se actualizaba; vuelve a leerlo y reintenta"
+            }), 409
+        
+        # Invalidar caché (write-through) e identidad en todos los workers
+        invalidate_namespace("usuarios")
+        identidades.invalidar(*{username_anterior, user.username})
         print(f"✅ Usuario {id} actualizado, caché invalidado")
         
         return jsonify({
@@ -144,18 +166,21 @@ class UsuarioController:
             "user": user.to_dict()
         }), 200
     
-    # Eliminar usuario
+    # Eliminar usuario: con más de un lote de productos el borrado sigue en segundo plano
     @staticmethod
     def delete_usuario(id):
       
         user = User.query.get_or_404(id)
-        db.session.delete(user)
-        db.session.commit()
-        
-        # Invalidar caché (write-through)
-        invalidate_cache("usuarios:*")
-        print(f"✅ Usuario {id} eliminado, caché invalidado")
-        
+        if excede_lote(id, current_app.config.get('USER_PURGE_BATCH', 1000)):
+            job_id = trabajos.encolar('purgar_usuario', creado_por=request.user, user_id=id, username=user.username)
+            print(f"⏳ Usuario {id}: borrado por lotes en segundo plano (trabajo {job_id})")
+            return jsonify({
+                "message": "Eliminación en curso",
+                "job_id": job_id,
+                "status_url": url_for('trabajos.get_trabajo', id=job_id)
+            }), 202
+        
+        purgar_usuario(id, user.username)
         return jsonify({"message": "Usuario eliminado"}), 200
     
     # Endpoint privado de prueba
@@ -174,6 +199,10 @@ class UsuarioController:
       
         if hasattr(current_app, 'cache_manager'): # Verificar manager
             stats = current_app.cache_manager.get_stats() # Obtener estadísticas
+            stats['request_stats'] = { # Peticiones de todos los workers por endpoint
+                endpoint: resumen_peticiones(campos)
+                for endpoint, campos in metricas.leer('peticiones').items()
+            }
             return jsonify(stats), 200
         else: # Manejar ausencia de manager
             return jsonify({"error": "Cache manager no disponible"}), 503
@@ -181,5 +210,33 @@ class UsuarioController:
     # Limpiar caché
     @staticmethod
     def clear_cache():
-        invalidate_cache("*")
-        return jsonify({"message": "Caché completamente limpiado"}), 200
\ No newline at end of file
+        
+        # Solo las claves de caché: la cola de trabajos y las métricas comparten el mismo Redis
+        deleted = current_app.cache_manager.clear_all()
+        if deleted is None:
+            return jsonify({"error": "Redis no disponible"}), 503
+        return jsonify({"message": "Caché completamente limpiado", "deleted": deleted}), 200
+
+
+# Tarea: borrar los productos del usuario lote a lote (una transacción acotada por lote) y después
+# el usuario; lo que se cree mientras tanto lo borra la BD con ON DELETE CASCADE
+@tarea('purgar_usuario')
+def purgar_usuario(user_id, username):
+
+    lote = current_app.config.get('USER_PURGE_BATCH', 1000)
+    borrados = 0
+    while (ids := borrar_lote_productos(user_id, lote)):
+        borrados += len(ids)
+        ProductoController._invalidar_cache(ids)
+    
+    user = db.session.get(User, user_id)
+    if user is not None:
+        db.session.delete(user) # passive_deletes: no carga los productos
+        eliminar_usuario_stats(user_id)
+        db.session.commit()
+    
+    # Invalidar caché (write-through) e identidad en todos los workers
+    invalidate_namespace("usuarios")
+    identidades.invalidar(username)
+    print(f"✅ Usuario {user_id} eliminado ({borrados} productos), caché invalidado")
+    return {'user_id': user_id, 'productos_borrados': borrados}
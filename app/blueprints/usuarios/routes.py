@@ -87,6 +87,15 @@ def login_api():
     'tags': ['Usuarios'],
     'summary': 'Listar todos los usuarios (requiere admin)',
     'security': [{'Bearer': []}],
+    'parameters': [
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Campos a devolver separados por comas (ej. id,username)'
+        }
+    ],
     'responses': {
         200: {'description': 'Lista de usuarios'},
         403: {'description': 'Acceso denegado'}
@@ -105,16 +114,26 @@ def get_usuarios():
     'tags': ['Usuarios'],
     'summary': 'Obtener un usuario por ID',
     'security': [{'Bearer': []}],
-    'parameters': [{
-        'name': 'id',
-        'in': 'path',
-        'type': 'integer',
-        'required': True,
-        'description': 'ID del usuario'
-    }],
+    'parameters': [
+        {
+            'name': 'id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID del usuario'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Campos a devolver separados por comas (ej. id,username)'
+        }
+    ],
 
     'responses': {
         200: {'description': 'Usuario encontrado'},
+        304: {'description': 'No modificado (If-None-Match coincide con el ETag)'},
         404: {'description': 'Usuario no encontrado'}
     }
 })
@@ -155,7 +174,8 @@ def get_usuario(id):
     'responses': {
         200: {'description': 'Usuario actualizado'},
         403: {'description': 'No tienes permiso'},
-        404: {'description': 'Usuario no encontrado'}
+        404: {'description': 'Usuario no encontrado'},
+        409: {'description': 'El usuario cambió durante la actualización (escritura concurrente)'}
     }
 })
 
@@ -170,6 +190,7 @@ def update_usuario(id):
 @swag_from({
     'tags': ['Usuarios'],
     'summary': 'Eliminar un usuario (requiere admin)',
+    'description': 'Si el usuario tiene más de USER_PURGE_BATCH productos, se borran por lotes en segundo plano y se devuelve el id del trabajo',
     'security': [{'Bearer': []}],
     'parameters': [{
         'name': 'id',
@@ -181,6 +202,7 @@ def update_usuario(id):
 
     'responses': {
         200: {'description': 'Usuario eliminado'},
+        202: {'description': 'Eliminación en curso (devuelve job_id)'},
         403: {'description': 'Acceso denegado'},
         404: {'description': 'Usuario no encontrado'}
     }
@@ -226,8 +248,12 @@ def privado():
                 'type': 'object',
                 'properties': {
 
-                    'application_stats': {'type': 'object'},
+                    'application_stats': {'type': 'object', 'description': 'Totales de todos los workers'},
+                    'by_prefix': {'type': 'object', 'description': 'Hits, misses, latencia y tamaño por prefijo de clave'},
+                    'worker_stats': {'type': 'object', 'description': 'Contadores del worker que responde'},
+                    'request_stats': {'type': 'object', 'description': 'Peticiones y latencia por endpoint'},
                     'redis_stats': {'type': 'object'},
+                    'generations': {'type': 'object', 'description': 'Generación actual de cada espacio de nombres'},
                     'timestamp': {'type': 'string'}
                 }
             }
@@ -248,7 +274,7 @@ def cache_stats():
     'summary': 'Limpiar toda la caché (admin) - Usar con precaución',
     'security': [{'Bearer': []}],
     'responses': {
-        200: {'description': 'Caché limpiado'},
+        200: {'description': 'Caché limpiado (la cola de trabajos y las métricas se conservan)'},
         503: {'description': 'Redis no disponible'}
     }
 })
@@ -1,38 +1,286 @@
 # ------- Sistema de caché con Redis (Anexo A.2) -------
 
+import fnmatch
 import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from functools import wraps
-from flask import request, jsonify
+from flask import request, current_app, make_response
 from datetime import datetime
+from app.metricas import registrar_cache, metricas, resumen_cache
 
-# Clase para gestionar el sistema de write-through cache
+BATCH_UNLINK = 500 # Claves por comando UNLINK (evita comandos enormes en Redis)
+
+# Espacios de nombres con datos de caché. El mismo Redis guarda la cola de trabajos (trabajos:*,
+# trabajo:*) y las métricas (metricas:*): limpiar la caché borra solo estas claves, nunca FLUSHDB
+CACHE_NAMESPACES = ("usuarios", "producto")
+
+# Eliminar claves por lotes con UNLINK (la memoria se libera en segundo plano)
+def unlink_por_lotes(redis_client, keys):
+
+    total = 0
+    lote = []
+    for key in keys:
+        lote.append(key)
+        if len(lote) >= BATCH_UNLINK:
+            total += redis_client.unlink(*lote)
+            lote = []
+    if lote:
+        total += redis_client.unlink(*lote)
+    return total
+
+# Claves generacionales: cada espacio de nombres tiene un contador gen:<nombre> en Redis
+# y sus claves llevan la generación (usuarios:all -> usuarios:g17:all)
+GEN_PREFIX = "gen:"
+
+# Leer la generación actual de un espacio de nombres (0 si nunca se invalidó)
+def generacion(redis_client, namespace):
+    valor = redis_client.get(GEN_PREFIX + namespace)
+    return int(valor) if valor else 0
+
+# Insertar la generación tras el espacio de nombres de la clave
+def clave_generacional(key, gen):
+    namespace, _, resto = key.partition(':')
+    return f"{namespace}:g{gen}:{resto}" if resto else f"{namespace}:g{gen}"
+
+# Invalidar un espacio de nombres con un único INCR: las claves de generaciones anteriores
+# dejan de leerse y expiran solas por TTL
+def avanzar_generacion(redis_client, namespace):
+    return redis_client.incr(GEN_PREFIX + namespace)
+
+# Generación actual de cada espacio de nombres invalidado alguna vez
+def generaciones(redis_client):
+    keys = list(redis_client.scan_iter(match=GEN_PREFIX + '*', count=1000))
+    valores = redis_client.mget(keys) if keys else []
+    return {key[len(GEN_PREFIX):]: int(valor) for key, valor in zip(keys, valores) if valor}
+
+# Protección contra estampidas: lock single-flight en Redis + refresco anticipado (XFetch)
+LOCK_PREFIX = "lock:"
+
+# Tomar el lock de recálculo de una clave; devuelve el token o None si otro worker lo tiene
+def adquirir_lock(redis_client, key, ttl):
+    token = uuid.uuid4().hex
+    return token if redis_client.set(LOCK_PREFIX + key, token, nx=True, px=int(ttl * 1000)) else None
+
+# Liberar el lock solo si sigue siendo nuestro (si expiró, otro worker puede tenerlo ya)
+def liberar_lock(redis_client, key, token):
+    actual = redis_client.get(LOCK_PREFIX + key)
+    if actual is not None and (actual.decode() if isinstance(actual, bytes) else actual) == token:
+        redis_client.delete(LOCK_PREFIX + key)
+
+# Esperar a que el worker con el lock publique el valor (None si se agota la espera)
+def esperar_valor(redis_client, key, espera, intervalo=0.05):
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        time.sleep(intervalo)
+        value = redis_client.get(key)
+        if value is not None:
+            return value
+    return None
+
+# XFetch: adelantar el recálculo con probabilidad creciente al acercarse la expiración,
+# más pronto cuanto más caro (delta, en segundos) fue calcular el valor
+def refresco_anticipado(delta, expira, beta=1.0):
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expira
+
+# Invalidar por patrón recorriendo el keyspace con SCAN incremental (no bloquea Redis como KEYS)
+def borrar_patron(redis_client, pattern):
+    return unlink_por_lotes(redis_client, redis_client.scan_iter(match=pattern, count=1000))
+
+_AUSENTE = object() # Distingue un miss de un valor cacheado que sea None
+
+# L1: LRU en memoria de cada worker, acotado en entradas y en bytes, con TTL corto.
+# Las invalidaciones se propagan al resto de workers por un canal pub/sub de Redis.
+# Los valores se comparten entre peticiones del worker: no deben modificarse.
+class CacheLocal:
+
+    def __init__(self, maxsize=1024, max_bytes=8 * 1024 * 1024, ttl=5, canal='cache:invalidar'):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.canal = canal
+        self.redis = None
+        self._datos = OrderedDict() # key -> (valor, bytes, expira)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pid = None # Proceso en el que corre el hilo de pub/sub
+        self._origen = None # Identifica los mensajes propios de este proceso
+        self._hilo = None
+
+    # Configurar desde la app y guardar el cliente Redis para pub/sub
+    def init_app(self, app, redis_client=None):
+
+        self.maxsize = app.config.get('CACHE_L1_SIZE', self.maxsize)
+        self.max_bytes = app.config.get('CACHE_L1_MAX_BYTES', self.max_bytes)
+        self.ttl = app.config.get('CACHE_L1_TTL', self.ttl)
+        self.canal = app.config.get('CACHE_L1_CHANNEL', self.canal)
+        self.redis = redis_client
+        self.limpiar()
+
+    # Arrancar el listener en este proceso (tras un fork el hilo del padre no existe)
+    def _asegurar_listener(self):
+
+        if not self.redis or (self._pid == os.getpid() and self._hilo is not None):
+            return
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._origen = uuid.uuid4().hex
+            self.limpiar() # Lo heredado del master puede estar obsoleto
+
+        try:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.canal: self._on_mensaje})
+            self._hilo = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self._on_error)
+        except Exception as e: # Se reintenta en la siguiente llamada; mientras, solo queda el TTL
+            print(f"Error suscribiendo a {self.canal}: {e}")
+            self._hilo = None
+
+    # Suscribirse ya al canal de invalidación (por defecto se hace en el primer uso)
+    def suscribir(self):
+        self._asegurar_listener()
+
+    # Redis cayó: se pueden haber perdido invalidaciones, así que se vacía la caché local.
+    # El hilo sigue vivo y PubSub se reconecta y resuscribe en la siguiente lectura
+    def _on_error(self, error, pubsub, hilo):
+        print(f"Error en pub/sub de {self.canal}: {error}")
+        self.limpiar()
+        time.sleep(1)
+
+    # Mensajes "origen|tipo|valor"; los publicados por este proceso ya se aplicaron
+    def _on_mensaje(self, mensaje):
+
+        data = mensaje['data']
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        origen, tipo, valor = data.split('|', 2)
+        if origen != self._origen:
+            self._invalidar_local(tipo, valor)
+
+    def get(self, key):
+
+        self._asegurar_listener()
+        with self._lock:
+            entrada = self._datos.get(key)
+            if entrada is None:
+                return _AUSENTE
+            if entrada[2] <= time.monotonic():
+                self._descartar(key)
+                return _AUSENTE
+            self._datos.move_to_end(key)
+            return entrada[0]
+
+    # Guardar un valor; tamaño es la longitud de su JSON (lo que ocupaba en Redis)
+    def set(self, key, valor, tamaño):
+
+        self._asegurar_listener()
+        if tamaño > self.max_bytes:
+            return
+        with self._lock:
+            self._descartar(key)
+            self._datos[key] = (valor, tamaño, time.monotonic() + self.ttl)
+            self._bytes += tamaño
+            while len(self._datos) > self.maxsize or self._bytes > self.max_bytes:
+                self._descartar(next(iter(self._datos))) # El menos usado recientemente
+
+    # Requiere el lock
+    def _descartar(self, key):
+        entrada = self._datos.pop(key, None)
+        if entrada is not None:
+            self._bytes -= entrada[1]
+
+    # tipo: "key" (una clave), "keys" (varias separadas por saltos de línea), "ns" (espacio de nombres),
+    # "patron" (glob) o "todo"
+    def _invalidar_local(self, tipo, valor=''):
+
+        with self._lock:
+            if tipo in ('key', 'keys'):
+                for key in valor.split('\n') if tipo == 'keys' else (valor,):
+                    self._descartar(key)
+                return
+            if tipo == 'ns':
+                keys = [k for k in self._datos if k.startswith(valor + ':')]
+            elif tipo == 'patron':
+                keys = [k for k in self._datos if fnmatch.fnmatchcase(k, valor)]
+            else:
+                keys = list(self._datos)
+            for key in keys:
+                self._descartar(key)
+
+    # Invalidar en este worker y avisar al resto por Redis
+    def invalidar(self, tipo, valor=''):
+
+        self._asegurar_listener()
+        self._invalidar_local(tipo, valor)
+        if self.redis:
+            try:
+                self.redis.publish(self.canal, f"{self._origen}|{tipo}|{valor}")
+            except Exception as e:
+                print(f"Error publicando invalidación de caché: {e}")
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return {'entries': len(self._datos), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+# Clase para gestionar el sistema de write-through cache (L1 opcional por worker + Redis como L2)
 class CacheManager:
 
-    # Inicializar con cliente Redis
-    def __init__(self, redis_client):
+    # Inicializar con cliente Redis y, opcionalmente, una CacheLocal
+    def __init__(self, redis_client, l1=None):
         self.redis = redis_client
+        self.l1 = l1
         self.stats = {
             'hits': 0,
+            'l1_hits': 0,
+            'l2_hits': 0,
             'misses': 0,
             'writes': 0,
             'invalidations': 0
         }
     
+    # Contar eventos en este worker y en las métricas compartidas del clúster
+    def _contar(self, key, latencia=None, tamaño=None, **eventos):
+
+        for evento, n in eventos.items():
+            self.stats[evento] += n
+        registrar_cache(key, latencia, tamaño, **eventos)
+    
     # Leer los valores de caché
     def get(self, key):
 
         if not self.redis: # En el caso que no haya conexión a Redis
             return None
         
+        inicio = time.perf_counter()
+        
+        # L1: sin round-trip a Redis ni json.loads
+        if self.l1:
+            value = self.l1.get(key)
+            if value is not _AUSENTE:
+                self._contar(key, time.perf_counter() - inicio, hits=1, l1_hits=1)
+                return value
+        
         try: 
             value = self.redis.get(key) # Intentar obtener el valor
 
             if value: # Si hay valores 
-                self.stats['hits'] += 1
                 print(f" Cache HIT: {key}")
-                return json.loads(value)
+                data = json.loads(value)
+                self._contar(key, time.perf_counter() - inicio, len(value), hits=1, l2_hits=1)
+                if self.l1:
+                    self.l1.set(key, data, len(value))
+                return data
             else: # Si no hay valores en la caché 
-                self.stats['misses'] += 1 # Contar miss
+                self._contar(key, time.perf_counter() - inicio, misses=1) # Contar miss
                 print(f" Cache MISS: {key}")
                 return None
             
@@ -47,8 +295,12 @@ class CacheManager:
             return False
         
         try: 
-            self.redis.setex(key, ttl, json.dumps(value)) # Guardar valor con TTL
-            self.stats['writes'] += 1 # Contar escritura
+            raw = json.dumps(value)
+            self.redis.setex(key, ttl, raw) # Guardar valor con TTL
+            if self.l1: # Los demás workers descartan su copia; este guarda la nueva
+                self.l1.invalidar('key', key)
+                self.l1.set(key, value, len(raw))
+            self._contar(key, tamaño=len(raw), writes=1) # Contar escritura
             print(f"Cache WRITE: {key} (TTL: {ttl}s)") # Indicar escritura
             return True
          
@@ -62,11 +314,14 @@ class CacheManager:
         if not self.redis:
             return False
         
+        if self.l1:
+            self.l1.invalidar('key', key)
+        
         try:
             deleted = self.redis.delete(key) # Eliminar clave
 
             if deleted: # Si se eliminó
-                self.stats['invalidations'] += 1 # Contar invalidación
+                self._contar(key, invalidations=1) # Contar invalidación
                 print(f"Cache INVALIDATED: {key}")
             return deleted > 0
         
@@ -74,35 +329,79 @@ class CacheManager:
             print(f"Error invalidando caché: {e}")
             return False
     
+    # Eliminar varias claves conocidas con UNLINK por lotes (un round-trip por lote, no por clave)
+    def delete_many(self, keys):
+
+        keys = list(keys)
+        if not self.redis or not keys:
+            return 0
+        
+        if self.l1: # Un único mensaje de pub/sub para todo el lote
+            self.l1.invalidar('keys', '\n'.join(keys))
+        
+        try:
+            deleted = unlink_por_lotes(self.redis, keys)
+            if deleted:
+                self._contar(keys[0], invalidations=deleted)
+                print(f"Cache INVALIDATED: {deleted} claves ({keys[0]}...)")
+            return deleted
+        
+        except Exception as e:
+            print(f"Error invalidando caché: {e}")
+            return 0
+    
     # Función para eliminar múltiples claves por patrón
     def delete_pattern(self, pattern):
     
         if not self.redis: # En el caso que no haya conexión a Redis se sale
             return 0
         
+        if self.l1:
+            self.l1.invalidar('patron', pattern)
+        
         try:
+            deleted = borrar_patron(self.redis, pattern) # SCAN + UNLINK por lotes
 
-            keys = self.redis.keys(pattern) # Buscar claves por patrón
-
-            if keys: # Si hay claves que eliminar
-                deleted = self.redis.delete(*keys) # Eliminar claves
-                self.stats['invalidations'] += deleted # Contar invalidaciones
+            if deleted: # Si se eliminaron claves
+                self._contar(pattern, invalidations=deleted) # Contar invalidaciones
                 print(f" Cache INVALIDATED: {deleted} claves ({pattern})")
-                return deleted
-            return 0
+            return deleted
         
         except Exception as e: # Manejo de errores en la invalidación por patrón
             print(f"Error invalidando patrón: {e}")
             return 0
     
-    # Función para obtener estadísticas de caché
+    # Función para invalidar un espacio de nombres completo (un único INCR)
+    def invalidate_namespace(self, namespace):
+    
+        if not self.redis:
+            return 0
+        
+        if self.l1:
+            self.l1.invalidar('ns', namespace)
+        
+        try:
+            gen = avanzar_generacion(self.redis, namespace)
+            self._contar(namespace, invalidations=1)
+            print(f" Cache INVALIDATED: {namespace} (generación {gen})")
+            return gen
+        
+        except Exception as e: # Manejo de errores en la invalidación por espacio de nombres
+            print(f"Error invalidando espacio de nombres: {e}")
+            return 0
+    
+    # Estadísticas del clúster (todos los workers, por prefijo de clave) y de este worker
     def get_stats(self):
 
-        total_requests = self.stats['hits'] + self.stats['misses'] # Total de solicitudes
-        hit_rate = (self.stats['hits'] / total_requests * 100) if total_requests > 0 else 0 # Tasa de aciertos
+        por_prefijo = metricas.leer('cache')
+        totales = {}
+        for campos in por_prefijo.values():
+            for campo, valor in campos.items():
+                totales[campo] = totales.get(campo, 0) + valor
         
         # Estadísticas de Redis
         redis_info = {}
+        generations = {}
         if self.redis:
 
             try:
@@ -117,93 +416,142 @@ class CacheManager:
                 }
             except:
                 pass
+            
+            try:
+                generations = generaciones(self.redis) # Generación de cada espacio de nombres
+            except Exception:
+                pass
         
         return { # Devolver estadísticas de la aplicación y de Redis
-            'application_stats': {
-                'hits': self.stats['hits'],
-                'misses': self.stats['misses'],
-                'writes': self.stats['writes'],
-                'invalidations': self.stats['invalidations'],
-                'hit_rate': round(hit_rate, 2),
-                'total_requests': total_requests
-            },
+            'application_stats': resumen_cache(totales),
+            'by_prefix': {prefijo: resumen_cache(campos) for prefijo, campos in por_prefijo.items()},
+            'worker_stats': resumen_cache(self.stats),
+            'l1_stats': self.l1.info() if self.l1 else None,
             'redis_stats': redis_info,
+            'generations': generations,
             'timestamp': datetime.utcnow().isoformat()
         }
     
-    # Función para limpiar toda la caché
+    # Función para limpiar toda la caché (SCAN + UNLINK de sus espacios de nombres).
+    # Devuelve las claves borradas o None si Redis no está disponible
     def clear_all(self):
 
         if not self.redis:
-            return False
+            return None
+        
+        if self.l1:
+            self.l1.invalidar('todo')
         
         try:
-            self.redis.flushdb() # Limpiar toda la base de datos de Redis
-            print("Toda la caché fue limpiada")
-            return True
+            deleted = sum(borrar_patron(self.redis, f"{ns}:*") for ns in CACHE_NAMESPACES)
+            print(f"Toda la caché fue limpiada ({deleted} claves)")
+            return deleted
         
         except Exception as e: # Manejo de errores al limpiar la caché
             print(f" Error limpiando caché: {e}")
-            return False
+            return None
+
+# Serializar una respuesta como "status\ncontent-type\ndelta\nexpira\n" + cuerpo ya codificado
+# (delta: segundos que costó generarla; expira: expiración lógica en tiempo unix)
+def empaquetar_respuesta(status, content_type, body, delta=0.0, expira=0.0):
+    return b"%d\n%s\n%r\n%r\n" % (status, content_type.encode('latin-1'), delta, expira) + body
 
-# Decorador para cachear resultados de endpoints
+# Recuperar (status, content-type, delta, expira, cuerpo) sin decodificar el JSON
+def desempaquetar_respuesta(raw):
+    status, content_type, delta, expira, body = raw.split(b"\n", 4)
+    return int(status), content_type.decode('latin-1'), float(delta), float(expira), body
+
+# Decorador para cachear respuestas ya codificadas (bytes) de endpoints
+# La clave lleva la generación de su espacio de nombres (ej. "usuarios:g17:all:..."),
+# así que invalidate_namespace("usuarios") la invalida sin borrarla.
+# Al expirar solo un worker recalcula (lock); el resto espera o sirve el valor anterior
 def cache_result(key_prefix, ttl=300):
    
+    namespace = key_prefix.split(':')[0]
+   
     def decorator(f):
         @wraps(f)
 
         # Decorador que maneja la caché
         def wrapper(*args, **kwargs):
-            from app import redis_client # Importar el cliente Redis
+            from app import redis_raw_client # Cliente Redis sin decode_responses (devuelve bytes)
             
-            if not redis_client: # Si no hay conexión a Redis, ejecutar función directamente
+            if not redis_raw_client: # Si no hay conexión a Redis, ejecutar función directamente
                 return f(*args, **kwargs)
             
-            # Construir clave única
-            cache_key = f"{key_prefix}:{request.path}:{request.query_string.decode()}"
+            # Construir clave única en la generación actual
+            try:
+                gen = generacion(redis_raw_client, namespace)
+            except Exception as e:
+                print(f"Error leyendo caché: {e}")
+                return f(*args, **kwargs)
+            cache_key = clave_generacional(f"{key_prefix}:{request.path}:{request.query_string.decode()}", gen)
+            config = current_app.config
+            lock_ttl = config.get('CACHE_LOCK_TTL', 10)
+            token = None
+            cached = None
+            inicio = time.perf_counter()
             
-            # Intentar obtener de caché (READ)
+            # Intentar obtener de caché (READ): los bytes se devuelven tal cual
             try:
-                cached = redis_client.get(cache_key)
-                if cached:
-                    print(f"Cache HIT: {cache_key}")
-                    data = json.loads(cached)
-                    return jsonify(data), 200
+                cached = redis_raw_client.get(cache_key)
+                if cached is None:
+                    # Miss: un solo worker recalcula; el resto espera a que aparezca el valor
+                    token = adquirir_lock(redis_raw_client, cache_key, lock_ttl)
+                    if token is None:
+                        cached = esperar_valor(redis_raw_client, cache_key, config.get('CACHE_LOCK_WAIT', 2.0))
+                
+                if cached is not None:
+                    status, content_type, delta, expira, body = desempaquetar_respuesta(cached)
+                    # Refresco anticipado: quien consigue el lock recalcula, el resto sirve este valor
+                    if (not refresco_anticipado(delta, expira, config.get('CACHE_XFETCH_BETA', 1.0))
+                            or not (token := adquirir_lock(redis_raw_client, cache_key, lock_ttl))):
+                        print(f"Cache HIT: {cache_key}")
+                        registrar_cache(cache_key, time.perf_counter() - inicio, len(cached), hits=1, l2_hits=1)
+                        return current_app.response_class(body, status=status, content_type=content_type)
                 
             except Exception as e:
                 print(f"Error leyendo caché: {e}")
             
-            # Cache MISS: ejecutar función
-            print(f"Cache MISS: {cache_key}")
-            result = f(*args, **kwargs)
-            
-            # Guardar en caché (WRITE-THROUGH)
+            # Refresco anticipado: la clave estaba en caché, así que cuenta como hit (y como refresco)
+            if cached is not None and token:
+                print(f"Cache REFRESH: {cache_key}")
+                registrar_cache(cache_key, time.perf_counter() - inicio, len(cached), hits=1, l2_hits=1, refreshes=1)
+            else: # Cache MISS: ejecutar función midiendo lo que cuesta recalcular
+                print(f"Cache MISS: {cache_key}")
+                registrar_cache(cache_key, time.perf_counter() - inicio, misses=1)
             try:
-                if isinstance(result, tuple):
-                    data, status = result
-                else:
-                    data, status = result, 200
+                inicio = time.perf_counter()
+                response = make_response(f(*args, **kwargs))
+                delta = time.perf_counter() - inicio
                 
-                # Extraer JSON del objeto Response si es necesario
-                if hasattr(data, 'get_json'):
-                    json_data = data.get_json()
-                elif isinstance(data, dict):
-                    json_data = data
-                else:
-                    json_data = data
+                # Guardar en caché (WRITE-THROUGH) solo respuestas 200 completas
+                if response.status_code != 200 or response.is_streamed:
+                    return response
                 
-                redis_client.setex(cache_key, ttl, json.dumps(json_data))
-                print(f"Guardado en caché: {cache_key} (TTL: {ttl}s)")
+                try:
+                    raw = empaquetar_respuesta(response.status_code, response.content_type,
+                                               response.get_data(), delta, time.time() + ttl)
+                    # La clave sobrevive a su expiración lógica para poder servirla mientras se recalcula
+                    redis_raw_client.setex(cache_key, ttl + config.get('CACHE_STALE_TTL', 30), raw)
+                    registrar_cache(cache_key, tamaño=len(raw), writes=1)
+                    print(f"Guardado en caché: {cache_key} (TTL: {ttl}s)")
+                except Exception as e:
+                    print(f"Error guardando en caché: {e}")
                 
-                return jsonify(json_data), status
-            except Exception as e:
-                print(f"Error guardando en caché: {e}")
-                return result
+                return response
+            
+            finally:
+                if token:
+                    try:
+                        liberar_lock(redis_raw_client, cache_key, token)
+                    except Exception as e:
+                        print(f"Error liberando lock: {e}")
         
         return wrapper
     return decorator
 
-# Función para invalidar caché por patrón
+# Función para invalidar caché por patrón (SCAN incremental + UNLINK)
 def invalidate_cache(pattern):
    
     from app import redis_client # Importar el cliente Redis
@@ -212,14 +560,31 @@ def invalidate_cache(pattern):
         return 0
     
     try:
-        keys = redis_client.keys(pattern) # Buscar claves por patrón
-
-        if keys: # Si hay claves que eliminar
-            deleted = redis_client.delete(*keys) # Eliminar claves
+        deleted = borrar_patron(redis_client, pattern)
+        if deleted: # Si se eliminaron claves
+            registrar_cache(pattern, invalidations=deleted)
             print(f"Cache invalidado: {deleted} claves ({pattern})") 
-            return deleted
+        return deleted
+    
+    except Exception as e: # Manejo de errores en la invalidación de caché
+        print(f"Error invalidando caché: {e}")
         return 0
+
+# Función para invalidar uno o varios espacios de nombres (un INCR por espacio)
+def invalidate_namespace(*namespaces):
+   
+    from app import redis_client # Importar el cliente Redis
+    
+    if not redis_client: # Si no hay conexión a Redis, salir
+        return {}
+    
+    try:
+        gens = {ns: avanzar_generacion(redis_client, ns) for ns in namespaces}
+        for ns in namespaces:
+            registrar_cache(ns, invalidations=1)
+        print(f"Cache invalidado: {', '.join(f'{ns} -> g{gen}' for ns, gen in gens.items())}")
+        return gens
     
     except Exception as e: # Manejo de errores en la invalidación de caché
         print(f"Error invalidando caché: {e}")
-        return 0
\ No newline at end of file
+        return {}
@@ -19,8 +19,74 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False   
 
+    # Perfil SQLite: pragmas ejecutados en cada conexión y pool mode=ro para las peticiones GET
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)), # ms esperando un lock antes de "database is locked"
+        'foreign_keys': 'ON' # SQLite no aplica las claves foráneas (ni ON DELETE CASCADE) sin este pragma
+    }
+    SQLITE_READ_POOL = os.environ.get("SQLITE_READ_POOL", "false").lower() == "true"
+
+    # Réplica de lectura (otra BD o una instantánea SQLite): tiene prioridad sobre SQLITE_READ_POOL
+    SQLALCHEMY_READ_URI = os.environ.get("SQLALCHEMY_READ_URI")
+
+    # Paginación por cursor
+    PAGINATION_DEFAULT_LIMIT = int(os.environ.get("PAGINATION_DEFAULT_LIMIT", 50))
+    PAGINATION_MAX_LIMIT = int(os.environ.get("PAGINATION_MAX_LIMIT", 200))
+
+    # Streaming NDJSON (filas leídas por lote)
+    STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 1000))
+
+    # Alta masiva de productos
+    BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", 1000))
+
+    # Borrado de usuarios: productos por transacción; por encima de un lote se purgan en segundo plano
+    USER_PURGE_BATCH = int(os.environ.get("USER_PURGE_BATCH", 1000))
+
+    # Trabajos en segundo plano: cola en Redis (python worker.py); sin Redis, hilos en cada worker web
+    JOBS_THREADS = int(os.environ.get("JOBS_THREADS", 2))
+    JOBS_VISIBILITY_TIMEOUT = float(os.environ.get("JOBS_VISIBILITY_TIMEOUT", 60)) # s sin latido antes de reintentarlo
+    JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", 5))
+    JOBS_BACKOFF_BASE = float(os.environ.get("JOBS_BACKOFF_BASE", 2)) # s; se duplica en cada reintento
+    JOBS_BACKOFF_MAX = float(os.environ.get("JOBS_BACKOFF_MAX", 300))
+    JOBS_RESULT_TTL = int(os.environ.get("JOBS_RESULT_TTL", 86400)) # s que se conserva el estado final
+    JOBS_POLL_INTERVAL = float(os.environ.get("JOBS_POLL_INTERVAL", 0.5))
+
     # Redis
     REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    PRODUCTO_CACHE_TTL = int(os.environ.get("PRODUCTO_CACHE_TTL", 300))
+
+    # Resiliencia de Redis: timeouts en segundos, pool acotado y circuit breaker
+    REDIS_CONNECT_TIMEOUT = float(os.environ.get("REDIS_CONNECT_TIMEOUT", 0.25))
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 0.25))
+    REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 20))
+    REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", 0.5))
+    REDIS_BREAKER_THRESHOLD = int(os.environ.get("REDIS_BREAKER_THRESHOLD", 3))
+    REDIS_PROBE_INTERVAL = float(os.environ.get("REDIS_PROBE_INTERVAL", 1.0))
+
+    # Protección contra estampidas en cache_result: lock de recálculo y refresco anticipado
+    CACHE_LOCK_TTL = float(os.environ.get("CACHE_LOCK_TTL", 10))
+    CACHE_LOCK_WAIT = float(os.environ.get("CACHE_LOCK_WAIT", 2.0))
+    CACHE_STALE_TTL = int(os.environ.get("CACHE_STALE_TTL", 30))
+    CACHE_XFETCH_BETA = float(os.environ.get("CACHE_XFETCH_BETA", 1.0))
+
+    # L1 opcional por worker delante de Redis (invalidada por pub/sub)
+    CACHE_L1_ENABLED = os.environ.get("CACHE_L1_ENABLED", "false").lower() == "true"
+    CACHE_L1_SIZE = int(os.environ.get("CACHE_L1_SIZE", 1024))
+    CACHE_L1_MAX_BYTES = int(os.environ.get("CACHE_L1_MAX_BYTES", 8 * 1024 * 1024))
+    CACHE_L1_TTL = float(os.environ.get("CACHE_L1_TTL", 5))
+    CACHE_L1_CHANNEL = "cache:invalidar"
+
+    # Métricas compartidas: cada worker vuelca sus contadores a Redis por lotes
+    METRICS_FLUSH_EVERY = int(os.environ.get("METRICS_FLUSH_EVERY", 100))
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5.0))
+
+    # Caché de identidades por worker (username -> id, rol)
+    IDENTITY_CACHE_SIZE = int(os.environ.get("IDENTITY_CACHE_SIZE", 1024))
+    IDENTITY_CACHE_TTL = int(os.environ.get("IDENTITY_CACHE_TTL", 60))
+    IDENTITY_CACHE_CHANNEL = "identidad:invalidar"
+
+    # Precalentar la app en el master y congelar el GC antes del fork (gunicorn con preload_app)
+    PREFORK_WARMUP = os.environ.get("PREFORK_WARMUP", "true").lower() == "true"
 
     # Sesiones
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
@@ -43,6 +109,18 @@ class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
 
+    # WAL: los lectores no bloquean al escritor ni al revés; con WAL, synchronous=NORMAL
+    # solo puede perder las últimas transacciones ante un corte de luz, nunca corromper
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+        'mmap_size': int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        'cache_size': -int(os.environ.get("SQLITE_CACHE_KB", 64 * 1024)), # Negativo: tamaño en KiB
+        'foreign_keys': 'ON'
+    }
+    SQLITE_READ_POOL = os.environ.get("SQLITE_READ_POOL", "true").lower() == "true"
+
 
 config = {
     'development': DevelopmentConfig,
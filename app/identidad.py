@@ -0,0 +1,116 @@
+# ------- Caché por worker de identidades (username -> id, rol) -------
+
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+Identidad = namedtuple('Identidad', ['id', 'role'])
+
+# LRU con TTL en cada proceso, invalidado entre workers por pub/sub de Redis
+class IdentityCache:
+
+    def __init__(self, maxsize=1024, ttl=60, canal='identidad:invalidar'):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.canal = canal
+        self.redis = None
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = None # Proceso en el que corre el hilo de pub/sub
+        self._hilo = None
+
+    # Configurar desde la app y guardar el cliente Redis para pub/sub
+    def init_app(self, app, redis_client=None):
+
+        self.maxsize = app.config.get('IDENTITY_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', self.ttl)
+        self.canal = app.config.get('IDENTITY_CACHE_CHANNEL', self.canal)
+        self._detener_listener() # Con un cliente nuevo hay que volver a suscribirse
+        self.redis = redis_client
+        self.limpiar()
+
+    # Parar el listener de este proceso (el heredado del master no existe en un worker)
+    def _detener_listener(self):
+        if self._hilo is not None and self._pid == os.getpid():
+            self._hilo.stop()
+        self._hilo = None
+
+    # Arrancar el listener en este proceso (tras un fork el hilo del padre no existe)
+    def _asegurar_listener(self):
+
+        if not self.redis or (self._pid == os.getpid() and self._hilo is not None):
+            return
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self.limpiar() # Lo heredado del master puede estar obsoleto
+
+        try:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.canal: self._on_mensaje})
+            self._hilo = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self._on_error)
+        except Exception as e: # Se reintenta en la siguiente llamada; mientras, solo queda el TTL
+            print(f"Error suscribiendo a {self.canal}: {e}")
+            self._hilo = None
+
+    # Suscribirse ya al canal de invalidación (por defecto se hace en el primer uso)
+    def suscribir(self):
+        self._asegurar_listener()
+
+    # Redis cayó: se pueden haber perdido invalidaciones, así que se vacía la caché local.
+    # El hilo sigue vivo y PubSub se reconecta y resuscribe en la siguiente lectura
+    def _on_error(self, error, pubsub, hilo):
+        print(f"Error en pub/sub de {self.canal}: {error}")
+        self.limpiar()
+        time.sleep(1)
+
+    def _on_mensaje(self, mensaje):
+        self._invalidar_local(mensaje['data'])
+
+    # Resolver un username a (id, rol); solo consulta la BD en un miss
+    def resolver(self, username):
+
+        self._asegurar_listener()
+        ahora = time.monotonic()
+
+        with self._lock:
+            entrada = self._datos.get(username)
+            if entrada and entrada[1] > ahora:
+                self._datos.move_to_end(username)
+                return entrada[0]
+
+        # Del primario: una réplica atrasada rechazaría a un usuario recién registrado
+        from app.models import db, User, use_primary
+        with use_primary():
+            fila = db.session.query(User.id, User.role).filter_by(username=username).first()
+        if fila is None:
+            return None
+
+        identidad = Identidad(fila.id, fila.role)
+        with self._lock:
+            self._datos[username] = (identidad, ahora + self.ttl)
+            self._datos.move_to_end(username)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+        return identidad
+
+    def _invalidar_local(self, username):
+        with self._lock:
+            self._datos.pop(username, None)
+
+    # Invalidar en este worker y avisar al resto por Redis
+    def invalidar(self, *usernames):
+
+        for username in usernames:
+            self._invalidar_local(username)
+            if self.redis:
+                try:
+                    self.redis.publish(self.canal, username)
+                except Exception as e:
+                    print(f"Error publicando invalidación de identidad: {e}")
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+identidades = IdentityCache()
@@ -0,0 +1,185 @@
+# ------- Métricas agregadas entre workers (contadores HINCRBY en Redis) -------
+
+import atexit
+import os
+import threading
+import time
+from collections import defaultdict
+from flask import request, g
+
+# Cada worker acumula contadores en memoria y los vuelca por lotes con un pipeline de HINCRBY.
+# Redis guarda un hash por grupo y nombre (metricas:cache:usuarios) y un set con los nombres
+# de cada grupo, así que cualquier worker puede leer los totales del clúster.
+class Metricas:
+
+    def __init__(self, flush_cada=100, intervalo=5.0, prefijo='metricas'):
+        self.flush_cada = flush_cada
+        self.intervalo = intervalo
+        self.prefijo = prefijo
+        self.redis = None
+        self._pendientes = defaultdict(lambda: defaultdict(int)) # (grupo, nombre) -> campo -> valor
+        self._eventos = 0
+        self._ultimo_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        atexit.register(self.flush_al_salir) # No perder lo acumulado al reciclar el worker (max_requests)
+
+    # Configurar desde la app y medir cada petición
+    def init_app(self, app, redis_client=None):
+
+        self.flush_cada = app.config.get('METRICS_FLUSH_EVERY', self.flush_cada)
+        self.intervalo = app.config.get('METRICS_FLUSH_INTERVAL', self.intervalo)
+        self.redis = redis_client
+
+        if 'metricas' in app.extensions: # Reinicialización (ej. tras el fork): hooks ya registrados
+            return
+        app.extensions['metricas'] = self
+
+        @app.before_request
+        def _inicio_peticion():
+            g._inicio_peticion = time.perf_counter()
+
+        @app.after_request
+        def _fin_peticion(response):
+            inicio = g.pop('_inicio_peticion', None)
+            if inicio is not None:
+                campos = {'requests': 1, 'latency_us': int((time.perf_counter() - inicio) * 1e6)}
+                if response.status_code >= 500:
+                    campos['errors'] = 1
+                self.registrar('peticiones', request.endpoint or 'desconocido', **campos)
+            return response
+
+    def _hash(self, grupo, nombre):
+        return f"{self.prefijo}:{grupo}:{nombre}"
+
+    # Sumar campos enteros a un contador; se vuelca cada flush_cada eventos o cada intervalo segundos
+    def registrar(self, grupo, nombre, **campos):
+
+        if not self.redis:
+            return
+
+        with self._lock:
+            if self._pid != os.getpid(): # Lo heredado del master no es de este worker
+                self._pid = os.getpid()
+                self._pendientes.clear()
+                self._eventos = 0
+            contador = self._pendientes[(grupo, nombre)]
+            for campo, valor in campos.items():
+                contador[campo] += valor
+            self._eventos += 1
+            volcar = (self._eventos >= self.flush_cada
+                      or time.monotonic() - self._ultimo_flush >= self.intervalo)
+
+        if volcar:
+            self.flush()
+
+    # Volcar lo acumulado en un único pipeline
+    def flush(self):
+
+        with self._lock:
+            pendientes = self._pendientes
+            self._pendientes = defaultdict(lambda: defaultdict(int))
+            self._eventos = 0
+            self._ultimo_flush = time.monotonic()
+
+        if not pendientes or not self.redis:
+            return
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for (grupo, nombre), campos in pendientes.items():
+                pipe.sadd(f"{self.prefijo}:{grupo}", nombre)
+                for campo, valor in campos.items():
+                    pipe.hincrby(self._hash(grupo, nombre), campo, valor)
+            pipe.execute()
+        except Exception as e: # Las métricas nunca deben romper una petición
+            print(f"Error volcando métricas: {e}")
+
+    # Volcado al terminar el proceso: solo si hay un cliente y el circuito de Redis está cerrado
+    # (con Redis caído no hay nada que hacer y cada proceso acabaría imprimiendo un error)
+    def flush_al_salir(self):
+
+        breaker = getattr(self.redis, 'breaker', None)
+        if self.redis and not (breaker and breaker.abierto):
+            self.flush()
+
+    # Totales del clúster de un grupo: {nombre: {campo: valor}}
+    def leer(self, grupo):
+
+        if not self.redis:
+            return {}
+
+        self.flush() # Incluir lo pendiente de este worker
+        try:
+            nombres = sorted(self.redis.smembers(f"{self.prefijo}:{grupo}"))
+            pipe = self.redis.pipeline(transaction=False)
+            for nombre in nombres:
+                pipe.hgetall(self._hash(grupo, nombre))
+            valores = pipe.execute()
+        except Exception as e:
+            print(f"Error leyendo métricas: {e}")
+            return {}
+
+        return {nombre: {campo: int(valor) for campo, valor in campos.items()}
+                for nombre, campos in zip(nombres, valores)}
+
+    # Borrar los contadores de un grupo en Redis
+    def reiniciar(self, grupo):
+
+        if not self.redis:
+            return
+        try:
+            nombres = self.redis.smembers(f"{self.prefijo}:{grupo}")
+            self.redis.delete(f"{self.prefijo}:{grupo}", *[self._hash(grupo, n) for n in nombres])
+        except Exception as e:
+            print(f"Error reiniciando métricas: {e}")
+
+metricas = Metricas()
+
+# Registrar eventos de caché bajo el prefijo de su clave (producto:1 -> producto)
+def registrar_cache(key, latencia=None, tamaño=None, **eventos):
+
+    campos = dict(eventos)
+    if latencia is not None:
+        campos['reads'] = 1
+        campos['latency_us'] = int(latencia * 1e6)
+    if tamaño is not None:
+        campos['values'] = 1
+        campos['bytes'] = tamaño
+    metricas.registrar('cache', key.split(':')[0], **campos)
+
+def _tasa(parte, total):
+    return round(parte / total * 100, 2) if total > 0 else 0
+
+# Derivar tasas y medias de los contadores de caché
+def resumen_cache(campos):
+
+    hits, misses = campos.get('hits', 0), campos.get('misses', 0)
+    total = hits + misses
+    l1_hits, l2_hits = campos.get('l1_hits', 0), campos.get('l2_hits', 0)
+    reads, values = campos.get('reads', 0), campos.get('values', 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'writes': campos.get('writes', 0),
+        'invalidations': campos.get('invalidations', 0),
+        'refreshes': campos.get('refreshes', 0), # Hits que además recalcularon el valor (XFetch)
+        'hit_rate': _tasa(hits, total),
+        'l1_hits': l1_hits,
+        'l2_hits': l2_hits,
+        'l1_hit_rate': _tasa(l1_hits, total),
+        'l2_hit_rate': _tasa(l2_hits, total - l1_hits), # Sobre las lecturas que llegaron a Redis
+        'total_requests': total,
+        'avg_latency_ms': round(campos.get('latency_us', 0) / reads / 1000, 3) if reads else 0,
+        'avg_value_bytes': round(campos.get('bytes', 0) / values) if values else 0
+    }
+
+# Derivar medias de los contadores de peticiones
+def resumen_peticiones(campos):
+
+    requests = campos.get('requests', 0)
+    return {
+        'requests': requests,
+        'errors': campos.get('errors', 0),
+        'avg_latency_ms': round(campos.get('latency_us', 0) / requests / 1000, 3) if requests else 0
+    }
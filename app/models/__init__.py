@@ -1,10 +1,13 @@
 # ---- Inicilación del módulo de modelos ----
 
 from flask_sqlalchemy import SQLAlchemy
+from .enrutado import SesionEnrutada, use_primary
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 from .user import User
 from .producto import Producto
+from . import busqueda  # Registra el índice FTS5 de productos
+from .estadisticas import ProductoStats
 
-__all__ = ['db', 'User', 'Producto']
\ No newline at end of file
+__all__ = ['db', 'use_primary', 'User', 'Producto', 'ProductoStats']
\ No newline at end of file
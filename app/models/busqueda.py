@@ -0,0 +1,68 @@
+# ---- Índice de búsqueda de texto completo (SQLite FTS5) ----
+
+from sqlalchemy import DDL, column, event, func, literal_column, table, text
+from . import db
+from .producto import Producto
+
+# Tabla virtual FTS5 con contenido externo: solo guarda el índice, el texto vive en productos
+FTS_PRODUCTOS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+        nombre, descripcion, content='productos', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+    END""",
+    # Solo se reindexa cuando cambia el texto, no en cada cambio de stock o precio
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, descripcion ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+        INSERT INTO productos_fts(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END""",
+]
+
+FTS_PRODUCTOS_DROP = [
+    "DROP TRIGGER IF EXISTS productos_fts_au",
+    "DROP TRIGGER IF EXISTS productos_fts_ad",
+    "DROP TRIGGER IF EXISTS productos_fts_ai",
+    "DROP TABLE IF EXISTS productos_fts",
+]
+
+# Crear/eliminar el índice junto a la tabla productos en db.create_all()/drop_all()
+for sentencia in FTS_PRODUCTOS_DDL:
+    event.listen(Producto.__table__, 'after_create', DDL(sentencia).execute_if(dialect='sqlite'))
+for sentencia in FTS_PRODUCTOS_DROP:
+    event.listen(Producto.__table__, 'before_drop', DDL(sentencia).execute_if(dialect='sqlite'))
+
+# Referencias a la tabla virtual y ranking bm25 (nombre pesa más que descripción)
+tabla_fts = table('productos_fts', column('rowid'))
+productos_fts = literal_column('productos_fts')
+rank_productos = func.bm25(productos_fts, 10.0, 1.0)
+
+# Convertir el texto del usuario en una consulta FTS5 segura (términos entre comillas, AND implícito)
+def consulta_fts(texto):
+
+    terminos = [t.replace('"', '""') for t in texto.split()]
+    return ' '.join(f'"{t}"' for t in terminos if t)
+
+# Consulta (Producto, rank) de los productos que coinciden con el texto
+def buscar_productos(texto):
+
+    return (
+        db.session.query(Producto, rank_productos.label('rank'))
+        .join(tabla_fts, tabla_fts.c.rowid == Producto.id)
+        .filter(productos_fts.match(consulta_fts(texto)))
+    )
+
+# Reconstruir el índice completo desde la tabla productos
+def rebuild_fts_productos():
+
+    for sentencia in FTS_PRODUCTOS_DDL:
+        db.session.execute(text(sentencia))
+    db.session.execute(text("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')"))
+    db.session.commit()
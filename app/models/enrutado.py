@@ -0,0 +1,73 @@
+# ------- Enrutado lectura/escritura: SELECT de las peticiones GET a un engine de lectura -------
+
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from .sqlite import registrar_pragmas, resolver_ruta, url_solo_lectura
+
+# Engine de lectura en app.extensions y no en SQLALCHEMY_BINDS: db.metadatas es global y el bind
+# quedaría registrado para todas las apps creadas después
+EXTENSION_LECTURA = 'db_lectura'
+METODOS_LECTURA = {'GET', 'HEAD'}
+
+# Después de db.init_app: crear el engine de lectura. SQLALCHEMY_READ_URI apunta a una réplica
+# (otra BD o una instantánea SQLite refrescada); si no, SQLITE_READ_POOL abre el fichero principal mode=ro
+def configurar_lectura(app, db):
+
+    app.extensions.pop(EXTENSION_LECTURA, None)
+    url = app.config.get('SQLALCHEMY_READ_URI')
+    if not url and app.config.get('SQLITE_READ_POOL'):
+        with app.app_context():
+            url = url_solo_lectura(db.engine.url) # Ruta ya resuelta, no la cadena de la configuración
+    if not url:
+        return
+
+    url = resolver_ruta(url, app.instance_path) # Una réplica "sqlite:///replica.db" vive en instance/
+    engine = create_engine(url, **(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}))
+    if engine.dialect.name == 'sqlite':
+        registrar_pragmas(engine, app.config.get('SQLITE_PRAGMAS') or {}, solo_lectura=True)
+    app.extensions[EXTENSION_LECTURA] = engine
+
+# Engine de lectura de la app (None si no hay ninguno configurado)
+def engine_lectura(app):
+    return app.extensions.get(EXTENSION_LECTURA)
+
+# Forzar el engine principal dentro del bloque (o de la función decorada con @use_primary())
+@contextmanager
+def use_primary():
+
+    if not has_app_context():
+        yield
+        return
+    g._usar_primario = g.get('_usar_primario', 0) + 1
+    try:
+        yield
+    finally:
+        g._usar_primario -= 1
+
+def _leer_del_primario():
+    return g.get('_usar_primario', 0) > 0 or g.get('_escritura_en_peticion', False)
+
+# Sesión que envía las SELECT de las peticiones GET/HEAD al engine de lectura. Las escrituras,
+# lo que ocurre durante un flush y todo lo que sigue a una escritura en la misma petición
+# (leer lo que se acaba de escribir) van al engine principal
+class SesionEnrutada(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing or not getattr(clause, 'is_select', False):
+            return engine
+        if not (has_request_context() and request.method in METODOS_LECTURA) or _leer_del_primario():
+            return engine
+
+        lectura = engine_lectura(current_app)
+        if lectura is not None and engine is self._db.engine:
+            return lectura
+        return engine
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _marcar_escritura(session, flush_context):
+    if has_request_context():
+        g._escritura_en_peticion = True
@@ -0,0 +1,98 @@
+# ---- Agregados de productos mantenidos de forma incremental ----
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import db
+from .producto import Producto
+
+# Fila con user_id = 0: agregados globales de todo el catálogo
+STATS_GLOBAL = 0
+
+# Tabla resumen: una fila por usuario más la global
+class ProductoStats(db.Model):
+    """Totales de productos por usuario, actualizados en cada escritura"""
+    __tablename__ = 'productos_stats'
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    total_productos = db.Column(db.Integer, nullable=False, default=0)
+    total_stock = db.Column(db.Integer, nullable=False, default=0)
+    valor_stock = db.Column(db.Float, nullable=False, default=0.0) # Suma de precio * stock
+    suma_precios = db.Column(db.Float, nullable=False, default=0.0) # Para el precio medio
+
+    def to_dict(self):
+        """Serializar agregados a diccionario"""
+        return {
+            'total_productos': self.total_productos,
+            'total_stock': self.total_stock,
+            'valor_stock': round(self.valor_stock, 2),
+            'precio_medio': round(self.suma_precios / self.total_productos, 2) if self.total_productos else None
+        }
+
+# Contribución de un producto a los agregados (signo -1 para restarla)
+def contribucion(precio, stock, signo=1):
+
+    stock = stock or 0
+    return {
+        'total_productos': signo,
+        'total_stock': signo * stock,
+        'valor_stock': signo * precio * stock,
+        'suma_precios': signo * precio
+    }
+
+# Sumar deltas a la fila del usuario y a la global con un UPSERT (misma transacción que la escritura)
+# Con user_id=None solo se modifica la fila global
+def registrar_cambio(user_id, total_productos=0, total_stock=0, valor_stock=0.0, suma_precios=0.0):
+
+    delta = {
+        'total_productos': total_productos,
+        'total_stock': total_stock,
+        'valor_stock': valor_stock,
+        'suma_precios': suma_precios
+    }
+    if not any(delta.values()):
+        return
+
+    ids = [STATS_GLOBAL] if user_id is None else [user_id, STATS_GLOBAL]
+    stmt = sqlite_insert(ProductoStats).values([{'user_id': i, **delta} for i in ids])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={col: getattr(ProductoStats, col) + getattr(stmt.excluded, col) for col in delta}
+    )
+    db.session.execute(stmt)
+
+# Quitar de los agregados todos los productos de un usuario que se elimina
+def eliminar_usuario_stats(user_id):
+
+    fila = db.session.get(ProductoStats, user_id)
+    if fila is None:
+        return
+
+    registrar_cambio(
+        None,
+        total_productos=-fila.total_productos,
+        total_stock=-fila.total_stock,
+        valor_stock=-fila.valor_stock,
+        suma_precios=-fila.suma_precios
+    )
+    db.session.delete(fila)
+
+# Recalcular la tabla resumen desde cero para reparar desviaciones
+def recalcular_stats():
+
+    stock = func.coalesce(Producto.stock, 0)
+    columnas = [
+        func.count(Producto.id),
+        func.coalesce(func.sum(stock), 0),
+        func.coalesce(func.sum(Producto.precio * stock), 0.0),
+        func.coalesce(func.sum(Producto.precio), 0.0)
+    ]
+    destino = ['user_id', 'total_productos', 'total_stock', 'valor_stock', 'suma_precios']
+
+    db.session.query(ProductoStats).delete()
+    db.session.execute(ProductoStats.__table__.insert().from_select(
+        destino, select(Producto.user_id, *columnas).group_by(Producto.user_id)
+    ))
+    db.session.execute(ProductoStats.__table__.insert().from_select(
+        destino, select(func.cast(STATS_GLOBAL, db.Integer), *columnas)
+    ))
+    db.session.commit()
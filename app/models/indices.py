@@ -0,0 +1,143 @@
+# ------- Asesor de índices: EXPLAIN QUERY PLAN sobre las consultas reales de la aplicación -------
+
+import re
+from dataclasses import dataclass, field
+from sqlalchemy import event, inspect
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy.sql.schema import Column
+from . import db, User, Producto, use_primary
+from .enrutado import engine_lectura
+
+# Rutas GET públicas que se ejecutan con el cliente de pruebas ({user_id} y {producto_id} se rellenan)
+RUTAS_ASESOR = [
+    '/api/productos',
+    '/api/productos?precio_min=10',
+    '/api/productos?precio_max=30',
+    '/api/productos?stock_gt=2',
+    '/api/productos?user_id={user_id}',
+    '/api/productos?created_after=2024-01-01T00:00:00',
+    '/api/productos/usuario/{user_id}',
+    '/api/productos/{producto_id}',
+    '/api/productos/search?q=producto',
+    '/api/productos/stats',
+]
+
+# Consultas que no pasan por una ruta pública: mismas expresiones que el código que las lanza
+CONSULTAS_ASESOR = {
+    'login por username': lambda ids: User.query.filter_by(username='asesor').first(),
+    'filtro de admins (run.py)': lambda ids: User.query.filter_by(role='admin').all(),
+    'cascada User.productos': lambda ids: db.session.get(User, ids['user_id']).productos if ids['user_id'] else None,
+}
+
+RECORRIDO_COMPLETO = re.compile(r'^SCAN (\w+)(?: AS \w+)?$') # SCAN sin USING INDEX
+
+@dataclass
+class Hallazgo:
+    origen: str
+    sql: str
+    tabla: str
+    columnas: tuple = ()
+    sugerencia: tuple = None # Columnas del índice propuesto (None si no hay filtro que indexar)
+    plan: list = field(default_factory=list)
+
+# Ejecutar las consultas de la app capturando cada SELECT junto con su sentencia SQLAlchemy
+def _capturar(app):
+
+    capturadas = {}
+    origen = ['']
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and statement not in capturadas:
+            compilada = getattr(context, 'compiled', None)
+            capturadas[statement] = (origen[0], parameters, getattr(compilada, 'statement', None))
+
+    engines = [e for e in (db.engine, engine_lectura(app)) if e is not None]
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        with use_primary():
+            ids = {
+                'user_id': db.session.query(Producto.user_id).limit(1).scalar() or db.session.query(User.id).limit(1).scalar(),
+                'producto_id': db.session.query(Producto.id).limit(1).scalar() or 1,
+            }
+        cliente = app.test_client()
+        for ruta in RUTAS_ASESOR:
+            origen[0] = 'GET ' + ruta.split('?')[0].format(**ids)
+            cliente.get(ruta.format(**ids))
+        for nombre, consulta in CONSULTAS_ASESOR.items():
+            origen[0] = nombre
+            consulta(ids)
+        db.session.rollback()
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', capturar)
+    return capturadas
+
+# Columnas de la tabla usadas en el WHERE: primero las de igualdad, después las de rango
+def _columnas_filtro(sentencia, tabla):
+
+    where = getattr(sentencia, 'whereclause', None)
+    if where is None:
+        return ()
+    igualdad, rango = [], []
+    for elemento in visitors.iterate(where):
+        if not isinstance(elemento, BinaryExpression):
+            continue
+        for lado in (elemento.left, elemento.right):
+            if isinstance(lado, Column) and getattr(lado.table, 'name', None) == tabla:
+                destino = igualdad if elemento.operator in (operators.eq, operators.in_op) else rango
+                if lado.name not in igualdad + rango:
+                    destino.append(lado.name)
+    return tuple(igualdad + rango)
+
+# ¿Algún índice existente (o restricción UNIQUE) empieza por esas columnas?
+def _cubierto(inspector, tabla, columnas):
+
+    indices = [i['column_names'] for i in inspector.get_indexes(tabla)]
+    indices += [u['column_names'] for u in inspector.get_unique_constraints(tabla)]
+    indices.append(inspector.get_pk_constraint(tabla)['constrained_columns'])
+    return any(tuple(cols[:len(columnas)]) == tuple(columnas) for cols in indices)
+
+# Ejecutar las consultas reales y devolver los recorridos completos de tabla encontrados
+def asesorar(app):
+
+    hallazgos = []
+    inspector = inspect(db.engine)
+    tablas = set(inspector.get_table_names())
+    with db.engine.connect() as conn:
+        for statement, (origen, parameters, sentencia) in _capturar(app).items():
+            plan = [fila[-1] for fila in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()]
+            for detalle in plan:
+                recorrido = RECORRIDO_COMPLETO.match(detalle)
+                if not recorrido or recorrido.group(1) not in tablas:
+                    continue
+                tabla = recorrido.group(1)
+                columnas = _columnas_filtro(sentencia, tabla)
+                sugerencia = columnas if columnas and not _cubierto(inspector, tabla, columnas) else None
+                hallazgos.append(Hallazgo(origen, statement, tabla, columnas, sugerencia, plan))
+    return hallazgos
+
+# Índices propuestos sin repetir: {(tabla, columnas): nombre}
+def indices_sugeridos(hallazgos):
+    return {(h.tabla, h.sugerencia): f"ix_{h.tabla}_{'_'.join(h.sugerencia)}" for h in hallazgos if h.sugerencia}
+
+# Crear una revisión de Alembic con los índices propuestos
+def generar_revision(app, hallazgos, mensaje):
+
+    from alembic import command
+    from alembic.operations import ops
+
+    sugeridos = indices_sugeridos(hallazgos)
+    if not sugeridos:
+        return None
+
+    def añadir_indices(context, revision, directives):
+        script = directives[0]
+        for (tabla, columnas), nombre in sugeridos.items():
+            script.upgrade_ops.ops.append(ops.CreateIndexOp(nombre, tabla, list(columnas)))
+            script.downgrade_ops.ops.insert(0, ops.DropIndexOp(nombre, tabla))
+
+    config = app.extensions['migrate'].migrate.get_config()
+    config.set_main_option('revision_environment', 'true') # Sin env.py no se aplican las directivas
+    return command.revision(config, message=mensaje, process_revision_directives=añadir_indices)
@@ -5,14 +5,27 @@ from datetime import datetime
 class Producto(db.Model):
     """Modelo de Producto - Gestiona la información de productos"""
     __tablename__ = 'productos'
+    __table_args__ = (
+        # Índice para la paginación keyset ordenada por (created_at, id)
+        db.Index('ix_productos_created_at_id', 'created_at', 'id'),
+        # Índices para los filtros y ordenaciones de /api/productos
+        db.Index('ix_productos_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_productos_precio', 'precio'),
+        db.Index('ix_productos_stock', 'stock'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
     descripcion = db.Column(db.Text, nullable=True)
     precio = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, default=0)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # ON DELETE CASCADE: la BD borra los productos que queden al eliminar el usuario
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Versión de la fila: SQLAlchemy la incrementa en cada UPDATE del ORM (ETag)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {'version_id_col': version}
     
     def to_dict(self):
         """Serializar modelo a diccionario"""
@@ -23,5 +36,6 @@ class Producto(db.Model):
             'precio': self.precio,
             'stock': self.stock,
             'user_id': self.user_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'version': self.version
         }
\ No newline at end of file
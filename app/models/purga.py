@@ -0,0 +1,33 @@
+# ---- Borrado por lotes de los productos de un usuario ----
+
+from sqlalchemy import delete, func, select
+from . import db
+from .producto import Producto
+from .estadisticas import registrar_cambio
+
+# Borrar un lote de productos del usuario y restar su contribución a los agregados (una transacción)
+# Devuelve los ids borrados (lista vacía cuando ya no quedan)
+def borrar_lote_productos(user_id, lote):
+
+    ids = db.session.scalars(
+        select(Producto.id).where(Producto.user_id == user_id).limit(lote) # ix_productos_user_id_created_at
+    ).all()
+    if not ids:
+        return ids
+
+    total, stock, valor, precios = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(Producto.stock), 0),
+               func.coalesce(func.sum(Producto.precio * func.coalesce(Producto.stock, 0)), 0.0),
+               func.coalesce(func.sum(Producto.precio), 0.0))
+        .where(Producto.id.in_(ids))
+    ).one()
+    registrar_cambio(user_id, total_productos=-total, total_stock=-stock, valor_stock=-valor, suma_precios=-precios)
+    db.session.execute(delete(Producto).where(Producto.id.in_(ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+    return ids
+
+# ¿Tiene el usuario más de `lote` productos? (sin contar todos)
+def excede_lote(user_id, lote):
+    return db.session.scalar(
+        select(Producto.id).where(Producto.user_id == user_id).offset(lote).limit(1)
+    ) is not None
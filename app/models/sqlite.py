@@ -0,0 +1,50 @@
+# ------- Perfil SQLite: pragmas por conexión y URL de solo lectura -------
+
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PRAGMAS_ESCRITURA = {'journal_mode', 'synchronous'} # No aplican a una conexión de solo lectura
+
+# URL del mismo fichero abierto en modo solo lectura (None si no es un fichero SQLite).
+# Recibe la URL ya resuelta del engine: Flask-SQLAlchemy lleva "sqlite:///users.db" a instance/users.db
+def url_solo_lectura(url):
+
+    url = make_url(url)
+    if not url.drivername.startswith('sqlite') or url.database in (None, '', ':memory:'):
+        return None
+    database = url.database if url.query.get('uri') else f"file:{url.database}"
+    return url.set(database=database, query={**url.query, 'mode': 'ro', 'uri': 'true'}).render_as_string(hide_password=False)
+
+# Rutas SQLite relativas a la carpeta instance/, igual que hace Flask-SQLAlchemy con la URI principal
+def resolver_ruta(url, instance_path):
+
+    url = make_url(url)
+    if (not url.drivername.startswith('sqlite') or url.database in (None, '', ':memory:')
+            or url.query.get('uri') or os.path.isabs(url.database)):
+        return url
+    return url.set(database=os.path.join(instance_path, url.database))
+
+# Ejecutar los pragmas del perfil en cada conexión nueva del engine
+def registrar_pragmas(engine, pragmas, solo_lectura=False):
+
+    def aplicar(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        for nombre, valor in pragmas.items():
+            if solo_lectura and nombre in PRAGMAS_ESCRITURA:
+                continue
+            cursor.execute(f"PRAGMA {nombre}={valor}")
+        if solo_lectura:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    event.listen(engine, 'connect', aplicar)
+
+# Después de db.init_app: aplicar el perfil a los engines SQLite (aún sin conexiones abiertas)
+def configurar_sqlite(app, db):
+
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                registrar_pragmas(engine, pragmas)
@@ -7,6 +7,10 @@ from werkzeug.security import generate_password_hash, check_password_hash
 class User(db.Model):
 
     __tablename__ = 'users'
+    __table_args__ = (
+        # Índice para el filtro de administradores (run.py); propuesto por migrate.py advise
+        db.Index('ix_users_role', 'role'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -14,9 +18,14 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(50), default='user')
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1') # Versión para ETag
 
-    # Relación con productos
-    productos = db.relationship('Producto', backref='owner', lazy=True, cascade='all, delete-orphan')
+    __mapper_args__ = {'version_id_col': version}
+
+    # Relación con productos: passive_deletes evita cargarlos todos al borrar el usuario
+    # (la BD los borra con ON DELETE CASCADE; los inventarios grandes se purgan por lotes)
+    productos = db.relationship('Producto', backref='owner', lazy=True, cascade='all, delete-orphan',
+                                passive_deletes=True)
 
     def set_password(self, password): # Contraseña segura
         self.password_hash = generate_password_hash(password)
@@ -30,5 +39,6 @@ class User(db.Model):
             'username': self.username,
             'email': self.email,
             'role': self.role,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'version': self.version
         }
\ No newline at end of file
@@ -0,0 +1,72 @@
+# ------- Paginación por cursor (keyset) -------
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import request, current_app
+from sqlalchemy import tuple_
+
+# Codificar los valores de la última fila en un cursor opaco
+def encode_cursor(valores):
+
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+# Decodificar un cursor opaco aplicando un conversor por cada valor
+def decode_cursor(cursor, tipos):
+
+    try:
+        padding = '=' * (-len(cursor) % 4) # Restaurar el relleno base64
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+    if not isinstance(payload, list) or len(payload) != len(tipos):
+        raise ValueError("Cursor inválido")
+
+    try:
+        return [conversor(valor) for conversor, valor in zip(tipos, payload)]
+    except (TypeError, ValueError):
+        raise ValueError("Cursor inválido")
+
+# Leer limit y cursor de la query string
+def parse_paginacion():
+
+    default = current_app.config.get('PAGINATION_DEFAULT_LIMIT', 50)
+    maximo = current_app.config.get('PAGINATION_MAX_LIMIT', 200)
+
+    limit = request.args.get('limit', default, type=int)
+    if limit < 1:
+        raise ValueError("El parámetro limit debe ser mayor que 0")
+
+    return min(limit, maximo), request.args.get('cursor')
+
+# Aplicar paginación keyset a una consulta ordenada por las columnas indicadas
+def paginar_keyset(query, columnas, tipos, limit, cursor=None, descendente=False, clave=None):
+
+    # Continuar justo después de la última fila de la página anterior
+    if cursor:
+        valores = decode_cursor(cursor, tipos)
+        if descendente:
+            query = query.filter(tuple_(*columnas) < tuple_(*valores))
+        else:
+            query = query.filter(tuple_(*columnas) > tuple_(*valores))
+
+    orden = [c.desc() for c in columnas] if descendente else list(columnas)
+    filas = query.order_by(*orden).limit(limit + 1).all() # Una fila extra indica si hay más páginas
+
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+
+    next_cursor = None
+    if hay_mas and filas:
+        ultima = filas[-1]
+        if clave is None:
+            valores = [getattr(ultima, c.key) for c in columnas]
+        else:
+            valores = clave(ultima)
+        next_cursor = encode_cursor(valores)
+
+    return filas, next_cursor
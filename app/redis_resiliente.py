@@ -0,0 +1,200 @@
+# ------- Cliente Redis resiliente: timeouts, pool acotado y circuit breaker -------
+
+import os
+import threading
+import time
+from functools import wraps
+import redis
+
+# Error al llamar a Redis con el circuito abierto; hereda de ConnectionError para que los
+# manejadores existentes (except Exception / ConnectionError) lo traten como una caída
+class RedisNoDisponible(redis.exceptions.ConnectionError):
+    pass
+
+# Pool local sin conexiones libres tras REDIS_POOL_TIMEOUT: Redis puede estar sano, así que
+# la llamada cae al camino sin Redis pero no cuenta como fallo para el breaker
+class PoolAgotado(redis.exceptions.ConnectionError):
+    pass
+
+# Errores que cuentan como fallo de Redis (no los de comando, como WRONGTYPE, ni PoolAgotado)
+FALLOS_REDIS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+
+# Circuit breaker: tras `umbral` fallos seguidos se abre y las llamadas fallan al instante.
+# Un hilo de sondeo (uno por proceso, se arranca bajo demanda) lo cierra cuando Redis responde.
+class CircuitBreaker:
+
+    def __init__(self, umbral=3, intervalo=1.0, sonda=None):
+        self.umbral = umbral
+        self.intervalo = intervalo
+        self.sonda = sonda # Llamada que lanza una excepción si Redis no responde (ej. ping)
+        self._fallos = 0
+        self._abierto = False
+        self._lock = threading.Lock()
+        self._pid_sonda = None # Proceso en el que corre el hilo de sondeo
+
+    @property
+    def abierto(self):
+        return self._abierto
+
+    # Indicar si se puede llamar a Redis; con el circuito abierto asegura que haya sondeo
+    def permitir(self):
+
+        if not self._abierto:
+            return True
+        self._asegurar_sonda()
+        return False
+
+    def exito(self):
+        self._fallos = 0
+
+    def fallo(self):
+
+        with self._lock:
+            self._fallos += 1
+            if self._fallos < self.umbral or self._abierto:
+                return
+        self.abrir()
+
+    def abrir(self):
+
+        with self._lock:
+            if self._abierto:
+                return
+            self._abierto = True
+        print("Circuito de Redis ABIERTO: caché desactivada hasta que Redis responda")
+        self._asegurar_sonda()
+
+    def cerrar(self):
+
+        with self._lock:
+            self._abierto = False
+            self._fallos = 0
+            self._pid_sonda = None
+        print("Circuito de Redis CERRADO: caché reactivada")
+
+    # Tras un fork el hilo del padre no existe: cada proceso arranca el suyo
+    def _asegurar_sonda(self):
+
+        with self._lock:
+            if not self.sonda or self._pid_sonda == os.getpid():
+                return
+            self._pid_sonda = os.getpid()
+        threading.Thread(target=self._sondear, daemon=True).start()
+
+    def _sondear(self):
+
+        while self._abierto and self._pid_sonda == os.getpid():
+            time.sleep(self.intervalo)
+            try:
+                self.sonda()
+            except Exception:
+                continue
+            self.cerrar()
+
+# Envoltorio de un cliente redis.Redis: cada comando pasa por el circuit breaker.
+# Es siempre "verdadero", así que los `if not redis_client` del código siguen funcionando
+class RedisResiliente:
+
+    def __init__(self, cliente, breaker):
+        self.cliente = cliente
+        self.breaker = breaker
+
+    def _ejecutar(self, funcion, *args, **kwargs):
+
+        if not self.breaker.permitir():
+            raise RedisNoDisponible("Circuito abierto: Redis no disponible")
+        try:
+            resultado = funcion(*args, **kwargs)
+        except PoolAgotado:
+            raise
+        except FALLOS_REDIS:
+            self.breaker.fallo()
+            raise
+        self.breaker.exito()
+        return resultado
+
+    def __getattr__(self, nombre):
+
+        atributo = getattr(self.cliente, nombre)
+        if not callable(atributo):
+            return atributo
+
+        @wraps(atributo)
+        def comando(*args, **kwargs):
+            return self._ejecutar(atributo, *args, **kwargs)
+        return comando
+
+    # Los *_iter devuelven generadores: los fallos aparecen al iterar, no al llamar
+    def _iterar(self, funcion, *args, **kwargs):
+
+        if not self.breaker.permitir():
+            raise RedisNoDisponible("Circuito abierto: Redis no disponible")
+        try:
+            yield from funcion(*args, **kwargs)
+        except PoolAgotado:
+            raise
+        except FALLOS_REDIS:
+            self.breaker.fallo()
+            raise
+        self.breaker.exito()
+
+    def scan_iter(self, *args, **kwargs):
+        return self._iterar(self.cliente.scan_iter, *args, **kwargs)
+
+    def sscan_iter(self, *args, **kwargs):
+        return self._iterar(self.cliente.sscan_iter, *args, **kwargs)
+
+    def pipeline(self, transaction=True):
+        return PipelineResiliente(self, self.cliente.pipeline(transaction=transaction))
+
+    def pubsub(self, **kwargs):
+
+        if not self.breaker.permitir():
+            raise RedisNoDisponible("Circuito abierto: Redis no disponible")
+        return self.cliente.pubsub(**kwargs)
+
+# Pipeline que solo pasa por el breaker al ejecutarse (encolar no toca la red)
+class PipelineResiliente:
+
+    def __init__(self, redis_resiliente, pipe):
+        self.redis = redis_resiliente
+        self.pipe = pipe
+
+    def __getattr__(self, nombre):
+        return getattr(self.pipe, nombre)
+
+    def execute(self):
+        return self.redis._ejecutar(self.pipe.execute)
+
+# BlockingConnectionPool lanza el mismo ConnectionError al agotar la espera que al fallar la red
+class PoolBloqueante(redis.BlockingConnectionPool):
+
+    def get_connection(self, *args, **kwargs):
+        try:
+            return super().get_connection(*args, **kwargs)
+        except redis.exceptions.ConnectionError as e:
+            if str(e) == "No connection available.":
+                raise PoolAgotado(str(e)) from e
+            raise
+
+# Crear un cliente con timeouts explícitos y un pool acotado (espera un hueco en vez de
+# abrir conexiones sin límite); los clientes del mismo servidor pueden compartir breaker
+def crear_cliente(url, config, decode_responses=False, breaker=None):
+
+    pool = PoolBloqueante.from_url(
+        url,
+        max_connections=config.get('REDIS_MAX_CONNECTIONS', 20),
+        timeout=config.get('REDIS_POOL_TIMEOUT', 0.5),
+        socket_connect_timeout=config.get('REDIS_CONNECT_TIMEOUT', 0.25),
+        socket_timeout=config.get('REDIS_SOCKET_TIMEOUT', 0.25),
+        decode_responses=decode_responses
+    )
+    cliente = redis.Redis(connection_pool=pool)
+
+    if breaker is None:
+        breaker = CircuitBreaker(
+            umbral=config.get('REDIS_BREAKER_THRESHOLD', 3),
+            intervalo=config.get('REDIS_PROBE_INTERVAL', 1.0),
+            sonda=cliente.ping
+        )
+    return RedisResiliente(cliente, breaker)
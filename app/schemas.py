@@ -1,6 +1,8 @@
 # ------- Esquemas de validación y serialización -------
 
+from functools import lru_cache
 from marshmallow import Schema, fields, validate
+from sqlalchemy.orm import load_only
 
 # Esquema para los usuarios
 class UserSchema(Schema):
@@ -10,6 +12,7 @@ class UserSchema(Schema):
     password = fields.Str(required=True, load_only=True, validate=validate.Length(min=4))
     role = fields.Str(dump_only=True)
     created_at = fields.DateTime(dump_only=True)
+    version = fields.Int(dump_only=True)
 
 # Esquema para las actualizaciones de usuario
 class UserUpdateSchema(Schema):
@@ -27,10 +30,50 @@ class ProductoSchema(Schema):
     stock = fields.Int(validate=validate.Range(min=0))
     user_id = fields.Int(dump_only=True)
     created_at = fields.DateTime(dump_only=True)
+    version = fields.Int(dump_only=True)
+
+# Esquema para modificar el stock de forma atómica
+class StockDeltaSchema(Schema):
+    delta = fields.Int(required=True, strict=True, validate=lambda d: d != 0)
+
+# Esquema para reservar stock de varios productos en una transacción
+class StockItemSchema(StockDeltaSchema):
+    id = fields.Int(required=True, strict=True)
+
+class StockBatchSchema(Schema):
+    items = fields.List(fields.Nested(StockItemSchema), required=True, validate=validate.Length(min=1))
 
 # Instancias de schemas
 user_schema = UserSchema()
 users_schema = UserSchema(many=True)
 user_update_schema = UserUpdateSchema()
 producto_schema = ProductoSchema()
-productos_schema = ProductoSchema(many=True)
\ No newline at end of file
+productos_schema = ProductoSchema(many=True)
+stock_delta_schema = StockDeltaSchema()
+stock_batch_schema = StockBatchSchema()
+
+# ------- Sparse fieldsets (?fields=) -------
+
+# Interpretar ?fields= validando contra los campos serializables del schema
+def parse_fields(raw, schema_cls):
+
+    if not raw:
+        return None
+
+    disponibles = {n for n, f in schema_cls._declared_fields.items() if not f.load_only}
+    campos = tuple(dict.fromkeys(c.strip() for c in raw.split(',') if c.strip()))
+
+    desconocidos = [c for c in campos if c not in disponibles]
+    if desconocidos or not campos:
+        raise ValueError(f"Campos no válidos en fields: {', '.join(desconocidos) or raw}")
+
+    return campos
+
+# Reutilizar una instancia de schema por combinación de campos
+@lru_cache(maxsize=128)
+def schema_para(schema_cls, only=None, many=False):
+    return schema_cls(only=only, many=many)
+
+# Opción de consulta que solo lee de disco las columnas pedidas (más las necesarias)
+def columnas_para(model, campos, extra=()):
+    return load_only(*[getattr(model, c) for c in dict.fromkeys(campos + tuple(extra))])
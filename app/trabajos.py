@@ -0,0 +1,265 @@
+# ------- Trabajos en segundo plano: cola en Redis consumida por worker.py -------
+#
+# Un sorted set hace de cola: la puntuación es el instante a partir del cual el trabajo es visible.
+# Encolar = visible ya; reintento = visible tras el backoff; reclamar = invisible durante el
+# visibility timeout (con un lease SET NX PX). Si el consumidor muere, el lease caduca y otro lo retoma
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+TAREAS = {} # nombre -> función
+
+COLA = "trabajos:cola"
+PREFIJO = "trabajo:"
+ESTADOS_FINALES = {'completado', 'fallido'}
+
+# Registrar una función como tarea que se puede encolar por su nombre (argumentos serializables a JSON)
+def tarea(nombre):
+
+    def decorador(f):
+        TAREAS[nombre] = f
+        return f
+    return decorador
+
+def _clave(id):
+    return f"{PREFIJO}{id}"
+
+# Cola en Redis; sin Redis los trabajos se ejecutan en hilos del propio worker web
+class Trabajos:
+
+    def __init__(self, hilos=2, max_estados=1000):
+        self.hilos = hilos
+        self.max_estados = max_estados
+        self.redis = None
+        self.visibilidad = 60.0
+        self.max_intentos = 5
+        self.backoff_base = 2.0
+        self.backoff_max = 300.0
+        self.ttl_resultado = 86400
+        self.intervalo = 0.5
+        self._estados = {} # Estados de los trabajos ejecutados en local
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None # El pool de hilos no sobrevive a un fork
+
+    def init_app(self, app, redis_client=None):
+
+        config = app.config
+        self.hilos = config.get('JOBS_THREADS', self.hilos)
+        self.visibilidad = config.get('JOBS_VISIBILITY_TIMEOUT', self.visibilidad)
+        self.max_intentos = config.get('JOBS_MAX_ATTEMPTS', self.max_intentos)
+        self.backoff_base = config.get('JOBS_BACKOFF_BASE', self.backoff_base)
+        self.backoff_max = config.get('JOBS_BACKOFF_MAX', self.backoff_max)
+        self.ttl_resultado = config.get('JOBS_RESULT_TTL', self.ttl_resultado)
+        self.intervalo = config.get('JOBS_POLL_INTERVAL', self.intervalo)
+        self.redis = redis_client
+        app.extensions['trabajos'] = self
+
+    # Encolar una tarea registrada; devuelve el id del trabajo
+    def encolar(self, nombre, creado_por=None, **argumentos):
+
+        if nombre not in TAREAS:
+            raise ValueError(f"Tarea desconocida: {nombre}")
+
+        id = uuid.uuid4().hex
+        ahora = time.time()
+        datos = {
+            'tarea': nombre,
+            'argumentos': json.dumps(argumentos),
+            'estado': 'en_cola',
+            'intentos': 0,
+            'max_intentos': self.max_intentos,
+            'creado_por': creado_por or '',
+            'creado': ahora,
+            'actualizado': ahora
+        }
+
+        if self.redis:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.hset(_clave(id), mapping=datos)
+                pipe.zadd(COLA, {id: ahora})
+                pipe.execute()
+                return id
+            except Exception as e:
+                print(f"Error encolando trabajo en Redis, se ejecuta en este worker: {e}")
+
+        self._guardar(id, **datos)
+        self._pool().submit(self._ejecutar_local, self._app(), id, nombre, argumentos)
+        return id
+
+    # Estado de un trabajo (None si no existe o ya caducó)
+    def estado(self, id):
+
+        if self.redis:
+            try:
+                datos = self.redis.hgetall(_clave(id))
+                if datos:
+                    return self._formatear(id, datos)
+            except Exception as e:
+                print(f"Error leyendo trabajo de Redis: {e}")
+
+        with self._lock:
+            datos = self._estados.get(id)
+            return self._formatear(id, dict(datos)) if datos else None
+
+    @staticmethod
+    def _formatear(id, datos):
+
+        estado = {
+            'id': id,
+            'tarea': datos.get('tarea'),
+            'estado': datos.get('estado'),
+            'intentos': int(datos.get('intentos', 0)),
+            'max_intentos': int(datos.get('max_intentos', 0)),
+            'creado_por': datos.get('creado_por') or None,
+            'creado': float(datos['creado']) if datos.get('creado') else None,
+            'actualizado': float(datos['actualizado']) if datos.get('actualizado') else None
+        }
+        for campo in ('error', 'siguiente_intento'):
+            if datos.get(campo):
+                estado[campo] = float(datos[campo]) if campo == 'siguiente_intento' else datos[campo]
+        if datos.get('resultado') is not None:
+            resultado = datos['resultado']
+            estado['resultado'] = json.loads(resultado) if isinstance(resultado, str) else resultado
+        return estado
+
+    # ------ Consumidor (worker.py) ------
+
+    # Reclamar el siguiente trabajo visible: lease exclusivo y oculto durante el visibility timeout
+    def reclamar(self):
+
+        ahora = time.time()
+        for id in self.redis.zrangebyscore(COLA, '-inf', ahora, start=0, num=10):
+            token = uuid.uuid4().hex
+            if self.redis.set(f"{_clave(id)}:lease", token, nx=True, px=int(self.visibilidad * 1000)):
+                self.redis.zadd(COLA, {id: ahora + self.visibilidad})
+                return id, token
+        return None
+
+    # Renovar el lease mientras la tarea se ejecuta (trabajos más largos que el visibility timeout)
+    def _latido(self, id, token, parar):
+
+        while not parar.wait(self.visibilidad / 3):
+            try:
+                lease = f"{_clave(id)}:lease"
+                if self.redis.get(lease) != token: # Otro consumidor lo retomó: dejar de renovar
+                    return
+                self.redis.set(lease, token, px=int(self.visibilidad * 1000))
+                self.redis.zadd(COLA, {id: time.time() + self.visibilidad})
+            except Exception as e:
+                print(f"Error renovando el trabajo {id}: {e}")
+
+    # Segundos hasta el siguiente intento: exponencial con tope y algo de jitter
+    def espera_reintento(self, intentos):
+        return min(self.backoff_max, self.backoff_base * 2 ** (intentos - 1)) * random.uniform(0.8, 1.2)
+
+    # Procesar un trabajo de la cola; False si no había ninguno visible
+    def procesar_uno(self, app):
+
+        reclamado = self.reclamar()
+        if reclamado is None:
+            return False
+        id, token = reclamado
+        clave = _clave(id)
+
+        datos = self.redis.hgetall(clave)
+        if not datos or datos.get('estado') in ESTADOS_FINALES: # Caducado o ya terminado
+            self.redis.zrem(COLA, id)
+            self.redis.delete(f"{clave}:lease")
+            return True
+
+        intentos = int(datos.get('intentos', 0)) + 1
+        max_intentos = int(datos.get('max_intentos') or self.max_intentos)
+        self.redis.hset(clave, mapping={'estado': 'en_curso', 'intentos': intentos, 'actualizado': time.time()})
+
+        parar = threading.Event()
+        threading.Thread(target=self._latido, args=(id, token, parar), daemon=True).start()
+        try:
+            funcion = TAREAS.get(datos['tarea'])
+            if funcion is None:
+                raise LookupError(f"Tarea desconocida: {datos['tarea']}")
+            with app.app_context():
+                resultado = funcion(**json.loads(datos['argumentos']))
+
+        except Exception as e:
+            print(f"Error en el trabajo {datos['tarea']} ({id}), intento {intentos}/{max_intentos}: {e}")
+            ahora = time.time()
+            if intentos >= max_intentos or isinstance(e, LookupError):
+                self._terminar(id, estado='fallido', error=str(e))
+            else:
+                siguiente = ahora + self.espera_reintento(intentos)
+                self.redis.hset(clave, mapping={'estado': 'reintentando', 'error': str(e),
+                                                'siguiente_intento': siguiente, 'actualizado': ahora})
+                self.redis.zadd(COLA, {id: siguiente})
+
+        else:
+            self._terminar(id, estado='completado', resultado=json.dumps(resultado))
+
+        finally:
+            parar.set()
+            if self.redis.get(f"{clave}:lease") == token:
+                self.redis.delete(f"{clave}:lease")
+        return True
+
+    def _terminar(self, id, **campos):
+
+        pipe = self.redis.pipeline()
+        pipe.hset(_clave(id), mapping={**campos, 'actualizado': time.time()})
+        pipe.expire(_clave(id), self.ttl_resultado)
+        pipe.zrem(COLA, id)
+        pipe.execute()
+
+    # Bucle del consumidor: procesa trabajos hasta que se pide parar (entre trabajo y trabajo)
+    def trabajar(self, app, parar):
+
+        ultimo_error = None
+        while not parar.is_set():
+            try:
+                if not self.procesar_uno(app):
+                    parar.wait(self.intervalo)
+                ultimo_error = None
+            except Exception as e: # Redis caído: el circuit breaker decide cuándo volver a intentarlo
+                if str(e) != ultimo_error: # Un aviso por racha de errores, no uno por sondeo
+                    print(f"Error consumiendo la cola de trabajos: {e}")
+                ultimo_error = str(e)
+                parar.wait(self.intervalo)
+
+    # ------ Ejecución local (sin Redis) ------
+
+    @staticmethod
+    def _app():
+        from flask import current_app
+        return current_app._get_current_object()
+
+    def _pool(self):
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='trabajo')
+            self._pid = os.getpid()
+        return self._executor
+
+    def _guardar(self, id, **campos):
+        with self._lock:
+            estado = self._estados.setdefault(id, {})
+            estado.update(campos, actualizado=time.time())
+            while len(self._estados) > self.max_estados: # Olvidar los más antiguos
+                self._estados.pop(next(iter(self._estados)))
+
+    def _ejecutar_local(self, app, id, nombre, argumentos):
+
+        self._guardar(id, estado='en_curso', intentos=1)
+        with app.app_context():
+            try:
+                resultado = TAREAS[nombre](**argumentos)
+            except Exception as e:
+                print(f"Error en el trabajo {nombre} ({id}): {e}")
+                self._guardar(id, estado='fallido', error=str(e))
+            else:
+                self._guardar(id, estado='completado', resultado=resultado)
+
+trabajos = Trabajos()
@@ -1,5 +1,6 @@
 # ------- Utilidades para manejo de JWT y protección de rutas -------
 
+import hashlib
 import jwt
 from datetime import datetime, timedelta, timezone
 from functools import wraps
@@ -105,4 +106,24 @@ def admin_requerido(f):
     return decorador
 
 def get_real_scheme(): # Obtener el esquema real (http o https) considerando proxies
-    return request.headers.get("X-Forwarded-Proto", request.scheme).lower()
\ No newline at end of file
+    return request.headers.get("X-Forwarded-Proto", request.scheme).lower()
+
+# ETag fuerte a partir del id y la versión de la fila (y de los campos pedidos)
+def etag_version(id, version, campos=None):
+
+    etag = f"{id}-{version}"
+    if campos:
+        etag += "-" + hashlib.sha1(",".join(campos).encode()).hexdigest()[:8]
+    return etag
+
+# Comprobar si el If-None-Match del cliente coincide con el ETag actual
+def no_modificado(etag):
+    return request.if_none_match.star_tag or request.if_none_match.contains(etag)
+
+# Respuesta 304 sin cuerpo
+def respuesta_304(etag):
+
+    from flask import current_app
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
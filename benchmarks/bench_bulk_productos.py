@@ -0,0 +1,72 @@
+# ------ Benchmark: alta de productos uno a uno vs. POST /api/productos/bulk ------
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Base de datos SQLite temporal en disco (los fsync del commit son lo que se mide)
+DB_DIR = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import User, Producto
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+# Crear la app, las tablas y un usuario con token
+def preparar():
+
+    app = create_app('default')
+    app.config.update({"TESTING": True, "WTF_CSRF_ENABLED": False})
+
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@test.com")
+        user.set_password("benchpass")
+        db.session.add(user)
+        db.session.commit()
+
+    client = app.test_client()
+    response = client.post('/api/usuarios/login',
+                           data=json.dumps({'username': 'bench', 'password': 'benchpass'}),
+                           content_type='application/json')
+    headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+    return app, client, headers
+
+def items(n, prefijo):
+    return [{'nombre': f'{prefijo} {i}', 'descripcion': 'Producto de prueba', 'precio': 10.0 + i, 'stock': i % 7}
+            for i in range(n)]
+
+def main():
+
+    app, client, headers = preparar()
+
+    # Camino actual: una petición (JWT + lookup de usuario + commit) por producto
+    inicio = time.perf_counter()
+    for item in items(N, 'Individual'):
+        client.post('/api/productos', headers=headers, data=json.dumps(item), content_type='application/json')
+    individual = time.perf_counter() - inicio
+
+    # Camino bulk: una petición, un executemany y un commit
+    inicio = time.perf_counter()
+    response = client.post('/api/productos/bulk', headers=headers,
+                           data=json.dumps(items(N, 'Bulk')), content_type='application/json')
+    bulk = time.perf_counter() - inicio
+    assert response.status_code == 201, response.json
+
+    with app.app_context():
+        assert Producto.query.count() == 2 * N
+
+    print("\n" + "=" * 60)
+    print(f"Productos por modo: {N}")
+    print(f"  Individual: {individual:.3f}s  ({N / individual:,.0f} productos/s)")
+    print(f"  Bulk:       {bulk:.3f}s  ({N / bulk:,.0f} productos/s)")
+    print(f"  Aceleración: x{individual / bulk:.1f}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
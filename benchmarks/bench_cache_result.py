@@ -0,0 +1,62 @@
+# ------ Benchmark: coste de CPU por HIT de cache_result (re-jsonify vs. bytes) ------
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+from app import create_app
+from app.cache import empaquetar_respuesta, desempaquetar_respuesta
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+USUARIOS = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+# Listado parecido al de /api/usuarios
+def listado(n):
+    return [{'id': i, 'username': f'usuario{i}', 'email': f'usuario{i}@ejemplo.com', 'role': 'user',
+             'created_at': '2026-01-01T10:00:00+00:00', 'version': 1} for i in range(n)]
+
+# Camino anterior: json.loads del valor cacheado y jsonify para reconstruir la respuesta
+def hit_anterior(cached):
+    data = json.loads(cached)
+    response = jsonify(data)
+    return response.get_data()
+
+# Camino nuevo: separar cabecera y devolver los bytes tal cual
+def hit_bytes(app, cached):
+    status, content_type, _, _, body = desempaquetar_respuesta(cached)
+    response = app.response_class(body, status=status, content_type=content_type)
+    return response.get_data()
+
+def medir(funcion, *args):
+    inicio = time.process_time()
+    for _ in range(N):
+        funcion(*args)
+    return (time.process_time() - inicio) / N * 1e6 # microsegundos de CPU por hit
+
+def main():
+
+    app = create_app('default')
+    data = listado(USUARIOS)
+
+    with app.test_request_context('/api/usuarios'):
+        # Valores tal y como quedan guardados en Redis con cada implementación
+        cached_json = json.dumps(data)
+        body = jsonify(data).get_data()
+        cached_bytes = empaquetar_respuesta(200, 'application/json', body)
+
+        anterior = medir(hit_anterior, cached_json)
+        nuevo = medir(hit_bytes, app, cached_bytes)
+
+    print("\n" + "=" * 60)
+    print(f"Hits por modo: {N}  |  usuarios en el listado: {USUARIOS}  |  cuerpo: {len(body):,} bytes")
+    print(f"  json.loads + jsonify: {anterior:8.1f} µs CPU/hit")
+    print(f"  bytes pre-serializados: {nuevo:6.1f} µs CPU/hit")
+    print(f"  Reducción: x{anterior / nuevo:.1f}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# ------ Benchmark: invalidación con KEYS vs. SCAN + UNLINK vs. generaciones ------
+#
+# Necesita un Redis real. Usa la base de datos 15 por defecto y la VACÍA al empezar y al terminar:
+#   REDIS_BENCH_URL=redis://localhost:6379/15 python benchmarks/bench_invalidacion.py [claves_ajenas]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis
+from app.cache import avanzar_generacion, borrar_patron
+
+URL = os.environ.get("REDIS_BENCH_URL", "redis://localhost:6379/15")
+AJENAS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+AFECTADAS = 100 # Claves usuarios:* que invalida una escritura de usuario
+
+# Llenar Redis con claves que no tienen nada que ver con usuarios
+def poblar_ajenas(r):
+
+    pipe = r.pipeline(transaction=False)
+    for i in range(AJENAS):
+        pipe.set(f"otra:{i}", "x")
+        if i % 10_000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+# Crear las claves de usuarios
+def poblar_usuarios(r):
+
+    pipe = r.pipeline(transaction=False)
+    for i in range(AFECTADAS):
+        pipe.setex(f"usuarios:all:/api/usuarios:page={i}", 300, "[]")
+    pipe.execute()
+
+# Implementación anterior: KEYS bloquea Redis recorriendo todo el keyspace
+def invalidar_keys(r):
+    keys = r.keys("usuarios:*")
+    return r.delete(*keys) if keys else 0
+
+def medir(r, nombre, funcion):
+
+    poblar_usuarios(r)
+    inicio = time.perf_counter()
+    borradas = funcion(r)
+    ms = (time.perf_counter() - inicio) * 1000
+    assert borradas == AFECTADAS, (nombre, borradas)
+    print(f"  {nombre:<22} {ms:10.2f} ms  ({borradas} claves)")
+    return ms
+
+def main():
+
+    r = redis.from_url(URL)
+    try:
+        r.ping()
+    except redis.exceptions.ConnectionError as e:
+        print(f"Redis no disponible en {URL}: {e}")
+        sys.exit(1)
+
+    r.flushdb()
+    print(f"Poblando {AJENAS:,} claves ajenas...")
+    poblar_ajenas(r)
+
+    print("\n" + "=" * 60)
+    print(f"Invalidación de {AFECTADAS} claves con {AJENAS:,} claves ajenas en Redis")
+    medir(r, "KEYS + DEL", invalidar_keys)
+    medir(r, "SCAN + UNLINK", lambda c: borrar_patron(c, "usuarios:*"))
+
+    # Generacional: un INCR, sin tocar las claves (expiran por TTL)
+    inicio = time.perf_counter()
+    gen = avanzar_generacion(r, "usuarios")
+    ms = (time.perf_counter() - inicio) * 1000
+    print(f"  {'INCR generación':<22} {ms:10.2f} ms  (usuarios -> g{gen})")
+    print("=" * 60)
+    print("KEYS es un único comando O(N) que bloquea a todos los workers mientras dura;")
+    print("SCAN reparte el recorrido en comandos cortos; la generación no toca ninguna clave.")
+
+    r.flushdb()
+
+if __name__ == "__main__":
+    main()
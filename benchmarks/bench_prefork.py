@@ -0,0 +1,101 @@
+# ------ Benchmark: precalentamiento + gc.freeze antes del fork ------
+#
+# Simula el master de gunicorn con preload_app: crea la app, opcionalmente la precalienta
+# y congela el GC, y hace fork de varios "workers". Cada worker mide la latencia de su
+# primera petición a varias rutas y su memoria privada (USS) y proporcional (PSS).
+#   python benchmarks/bench_prefork.py [workers]
+
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench_prefork.db')
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 4
+RUTAS = ['/login', '/apispec_1.json', '/api/productos?limit=20']
+
+# Memoria del proceso en kB según /proc/self/smaps_rollup
+def memoria():
+    campos = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for linea in f:
+            partes = linea.split()
+            if len(partes) == 3 and partes[2] == 'kB':
+                campos[partes[0].rstrip(':')] = int(partes[1])
+    return {'uss': campos['Private_Clean'] + campos['Private_Dirty'], 'pss': campos['Pss']}
+
+def worker(app, escritura):
+    cliente = app.test_client()
+    latencias = {}
+    for ruta in RUTAS:
+        inicio = time.perf_counter()
+        cliente.get(ruta)
+        latencias[ruta] = (time.perf_counter() - inicio) * 1000
+    gc.collect() # Una colección completa, como la que acabará ocurriendo en un worker real
+    os.write(escritura, (json.dumps({'latencias': latencias, **memoria()}) + '\n').encode())
+
+# Proceso "master" para un modo; imprime una línea JSON por worker
+def master(precalentar):
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
+    from app import create_app, warm_up, db
+
+    app = create_app('default')
+    with app.app_context():
+        db.create_all()
+    if precalentar:
+        warm_up(app)
+        gc.collect()
+        gc.freeze()
+
+    lectura, escritura = os.pipe()
+    hijos = []
+    for _ in range(WORKERS):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(lectura)
+                worker(app, escritura)
+            finally:
+                os._exit(0) # Nunca volver al código del master
+        hijos.append(pid)
+    os.close(escritura)
+    for pid in hijos:
+        os.waitpid(pid, 0)
+    with os.fdopen(lectura) as f:
+        sys.stdout.write('RESULTADOS ' + json.dumps([json.loads(l) for l in f]) + '\n')
+
+def ejecutar(modo):
+    salida = subprocess.run([sys.executable, __file__, '--master', modo], capture_output=True, text=True).stdout
+    linea = next(l for l in salida.splitlines() if l.startswith('RESULTADOS '))
+    return json.loads(linea[len('RESULTADOS '):])
+
+def media(valores):
+    return sum(valores) / len(valores)
+
+def main():
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    resultados = {modo: ejecutar(modo) for modo in ('sin', 'con')}
+
+    print("\n" + "=" * 72)
+    print(f"Workers: {WORKERS}  (media por worker)")
+    print(f"{'':<34}{'sin warm-up':>18}{'warm-up + freeze':>20}")
+    for ruta in RUTAS:
+        valores = [media([w['latencias'][ruta] for w in resultados[m]]) for m in ('sin', 'con')]
+        print(f"  1ª petición {ruta:<22}{valores[0]:>15.2f} ms{valores[1]:>17.2f} ms")
+    for campo, nombre in (('uss', 'USS (memoria privada)'), ('pss', 'PSS')):
+        valores = [media([w[campo] for w in resultados[m]]) for m in ('sin', 'con')]
+        print(f"  {nombre:<32}{valores[0]:>15.0f} kB{valores[1]:>17.0f} kB")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--master':
+        master(sys.argv[2] == 'con')
+    else:
+        main()
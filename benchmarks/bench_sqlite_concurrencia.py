@@ -0,0 +1,102 @@
+# ------ Benchmark: lecturas y escrituras concurrentes en SQLite por perfil ------
+#
+# Varios procesos lectores (listado + agregado) y escritores (UPDATE de stock) atacan el mismo
+# fichero durante unos segundos, con el perfil por defecto (journal DELETE, sin pragmas) y con
+# el perfil de producción (WAL + pragmas, lectores por el pool mode=ro).
+#   python benchmarks/bench_sqlite_concurrencia.py [lectores] [escritores] [segundos]
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import OperationalError
+from app.config import ProductionConfig
+from app.models import db, User, Producto
+from app.models.sqlite import registrar_pragmas, url_solo_lectura
+
+LECTORES = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+ESCRITORES = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+SEGUNDOS = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+PRODUCTOS = 20_000
+
+PERFILES = {
+    'por defecto': {'pragmas': {}, 'solo_lectura': False},
+    'producción': {'pragmas': ProductionConfig.SQLITE_PRAGMAS, 'solo_lectura': True}
+}
+
+def crear_bd(url, pragmas):
+    engine = create_engine(url)
+    registrar_pragmas(engine, pragmas)
+    db.metadata.create_all(engine) # Incluye el índice FTS5 y sus triggers
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User).values(username='bench', password_hash='x', role='user')).inserted_primary_key[0]
+        conn.execute(insert(Producto), [
+            {'nombre': f'Producto {i}', 'precio': float(i % 500), 'stock': i % 50, 'user_id': user_id}
+            for i in range(PRODUCTOS)
+        ])
+    engine.dispose()
+
+def trabajador(tipo, url, pragmas, solo_lectura, cola):
+
+    engine = create_engine(url)
+    registrar_pragmas(engine, pragmas, solo_lectura)
+    operaciones = errores = 0
+    fin = time.monotonic() + SEGUNDOS
+    while time.monotonic() < fin:
+        try:
+            with engine.begin() as conn:
+                if tipo == 'lectura':
+                    conn.execute(text("SELECT id, nombre, precio FROM productos ORDER BY created_at, id LIMIT 50")).all()
+                    conn.execute(text("SELECT COUNT(*), SUM(stock * precio) FROM productos")).one()
+                else:
+                    conn.execute(text("UPDATE productos SET stock = stock + 1, version = version + 1 WHERE id = :id"),
+                                 {'id': random.randint(1, PRODUCTOS)})
+            operaciones += 1
+        except OperationalError: # "database is locked"
+            errores += 1
+    cola.put((tipo, operaciones, errores))
+
+def medir(nombre, perfil):
+
+    ruta = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    url = f"sqlite:///{ruta}"
+    crear_bd(url, perfil['pragmas'])
+    url_lectura = url_solo_lectura(url) if perfil['solo_lectura'] else url
+
+    cola = multiprocessing.Queue()
+    procesos = [multiprocessing.Process(target=trabajador, args=('lectura', url_lectura, perfil['pragmas'], perfil['solo_lectura'], cola))
+                for _ in range(LECTORES)]
+    procesos += [multiprocessing.Process(target=trabajador, args=('escritura', url, perfil['pragmas'], False, cola))
+                 for _ in range(ESCRITORES)]
+    for p in procesos:
+        p.start()
+    resultados = [cola.get() for _ in procesos]
+    for p in procesos:
+        p.join()
+
+    totales = {}
+    for tipo, operaciones, errores in resultados:
+        ops, errs = totales.get(tipo, (0, 0))
+        totales[tipo] = (ops + operaciones, errs + errores)
+    return totales
+
+def main():
+
+    print("\n" + "=" * 72)
+    print(f"{LECTORES} lectores + {ESCRITORES} escritores durante {SEGUNDOS:g} s  |  {PRODUCTOS:,} productos")
+    print(f"{'perfil':<14}{'lecturas/s':>14}{'escrituras/s':>16}{'errores lock':>16}")
+    for nombre, perfil in PERFILES.items():
+        totales = medir(nombre, perfil)
+        lecturas, errores_l = totales.get('lectura', (0, 0))
+        escrituras, errores_e = totales.get('escritura', (0, 0))
+        print(f"{nombre:<14}{lecturas / SEGUNDOS:>14.1f}{escrituras / SEGUNDOS:>16.1f}{errores_l + errores_e:>16}")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
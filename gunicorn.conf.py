@@ -1,3 +1,4 @@
+import gc
 import multiprocessing
 import os
 
@@ -39,4 +40,24 @@ group = None
 raw_env = [
     "FLASK_ENV=production",
     "SECRET_KEY=tu_clave_secreta_super_segura_aqui"
-]
\ No newline at end of file
+]
+# Hooks de ciclo de vida: con preload_app la app se crea en el master y los workers
+# heredarían sus conexiones a la base de datos y a Redis
+
+# Master, justo antes de crear los workers: precalentar y sacar del GC todo lo creado hasta ahora
+# (el GC no vuelve a escribir en esos objetos y sus páginas siguen compartidas entre workers)
+def when_ready(server):
+    app = server.app.wsgi()
+    if app.config.get('PREFORK_WARMUP'):
+        from app import warm_up
+        warm_up(app)
+        gc.collect()
+        gc.freeze()
+
+def post_fork(server, worker):
+    from app import reinit_worker
+    reinit_worker(server.app.wsgi(), concurrency=worker.cfg.threads)
+
+def post_worker_init(worker):
+    from app import seed_worker_caches
+    seed_worker_caches(worker.wsgi)
@@ -6,6 +6,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))) # Ruta raiz del p
 
 from flask_migrate import Migrate, migrate, upgrade, downgrade, history, current
 from app import create_app, db
+from app.models.busqueda import rebuild_fts_productos
+from app.models.estadisticas import recalcular_stats
+from app.models.indices import asesorar, indices_sugeridos, generar_revision
 
 app = create_app('development') # Crear app en modo desarrollo para migraciones
 migrate_obj = Migrate(app, db) # Inicializar objeto Migrate
@@ -14,7 +17,7 @@ def main():
 
     with app.app_context(): # Contexto de la aplicación
         if len(sys.argv) < 2: # Verificar argumentos
-            print("Uso: python migrate.py [migrate|upgrade|downgrade|history|current]")
+            print("Uso: python migrate.py [migrate|upgrade|downgrade|history|current|rebuild-fts|rebuild-stats|advise [--revision [mensaje]]]")
             sys.exit(1)
         
         comando = sys.argv[1] # Obtener comando
@@ -43,9 +46,36 @@ def main():
             print("Version actual:")
             current()
         
+        elif comando == "rebuild-fts": # Reconstruir el índice de búsqueda
+            print("Reconstruyendo indice FTS5 de productos...")
+            rebuild_fts_productos()
+            print("Indice de busqueda reconstruido")
+        
+        elif comando == "rebuild-stats": # Recalcular agregados de productos
+            print("Recalculando agregados de productos...")
+            recalcular_stats()
+            print("Agregados recalculados")
+        
+        elif comando == "advise": # Buscar recorridos completos en las consultas reales y proponer índices
+            print("Analizando consultas con EXPLAIN QUERY PLAN...")
+            hallazgos = asesorar(app)
+            for h in hallazgos:
+                propuesta = f"índice ({', '.join(h.sugerencia)})" if h.sugerencia else "sin propuesta (sin filtro indexable o ya cubierto)"
+                print(f"  SCAN {h.tabla} <- {h.origen}: {propuesta}")
+                print(f"      {' '.join(h.sql.split())}")
+            sugeridos = indices_sugeridos(hallazgos)
+            if not hallazgos:
+                print("Ninguna consulta recorre una tabla completa")
+            for (tabla, columnas), nombre in sugeridos.items():
+                print(f"Indice propuesto: {nombre} ON {tabla} ({', '.join(columnas)})")
+            if len(sys.argv) > 2 and sys.argv[2] == "--revision" and sugeridos:
+                mensaje = sys.argv[3] if len(sys.argv) > 3 else "Indices propuestos por el asesor"
+                script = generar_revision(app, hallazgos, mensaje)
+                print(f"Migracion creada: {script.path}")
+        
         else: # Comando desconocido
             print(f"Comando desconocido: {comando}")
-            print("Comandos disponibles: migrate, upgrade, downgrade, history, current")
+            print("Comandos disponibles: migrate, upgrade, downgrade, history, current, rebuild-fts, rebuild-stats, advise")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""Indice keyset para la paginacion de productos
+
+Revision ID: 3f1c9a7d2b60
+Revises: 78eb2bb4886a
+Create Date: 2026-01-12 10:14:22.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b60'
+down_revision = '78eb2bb4886a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('productos', schema=None) as batch_op:
+        batch_op.create_index('ix_productos_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('productos', schema=None) as batch_op:
+        batch_op.drop_index('ix_productos_created_at_id')
@@ -0,0 +1,24 @@
+"""Indice users.role para el filtro de admins
+
+Revision ID: 4d5c5492cf9f
+Revises: 5b8e2d91f4a6
+Create Date: 2026-10-17 18:32:21.928985
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d5c5492cf9f'
+down_revision = '5b8e2d91f4a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_users_role', 'users', ['role'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_role', table_name='users')
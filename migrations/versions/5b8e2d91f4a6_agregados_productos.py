@@ -0,0 +1,45 @@
+"""Tabla resumen de agregados de productos
+
+Revision ID: 5b8e2d91f4a6
+Revises: e19b3f6c0d85
+Create Date: 2026-02-11 16:55:12.904471
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2d91f4a6'
+down_revision = 'e19b3f6c0d85'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('productos_stats',
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('total_productos', sa.Integer(), nullable=False),
+        sa.Column('total_stock', sa.Integer(), nullable=False),
+        sa.Column('valor_stock', sa.Float(), nullable=False),
+        sa.Column('suma_precios', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Rellenar con los productos existentes: una fila por usuario y la global (user_id = 0)
+    op.execute("""
+        INSERT INTO productos_stats (user_id, total_productos, total_stock, valor_stock, suma_precios)
+        SELECT user_id, COUNT(id), COALESCE(SUM(COALESCE(stock, 0)), 0),
+               COALESCE(SUM(precio * COALESCE(stock, 0)), 0.0), COALESCE(SUM(precio), 0.0)
+        FROM productos GROUP BY user_id
+    """)
+    op.execute("""
+        INSERT INTO productos_stats (user_id, total_productos, total_stock, valor_stock, suma_precios)
+        SELECT 0, COUNT(id), COALESCE(SUM(COALESCE(stock, 0)), 0),
+               COALESCE(SUM(precio * COALESCE(stock, 0)), 0.0), COALESCE(SUM(precio), 0.0)
+        FROM productos
+    """)
+
+
+def downgrade():
+    op.drop_table('productos_stats')
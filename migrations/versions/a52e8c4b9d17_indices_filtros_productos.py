@@ -0,0 +1,30 @@
+"""Indices para filtros y ordenacion de productos
+
+Revision ID: a52e8c4b9d17
+Revises: 3f1c9a7d2b60
+Create Date: 2026-01-19 17:42:08.106734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a52e8c4b9d17'
+down_revision = '3f1c9a7d2b60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('productos', schema=None) as batch_op:
+        batch_op.create_index('ix_productos_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_productos_precio', ['precio'], unique=False)
+        batch_op.create_index('ix_productos_stock', ['stock'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('productos', schema=None) as batch_op:
+        batch_op.drop_index('ix_productos_stock')
+        batch_op.drop_index('ix_productos_precio')
+        batch_op.drop_index('ix_productos_user_id_created_at')
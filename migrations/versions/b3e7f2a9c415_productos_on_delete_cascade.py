@@ -0,0 +1,56 @@
+"""ON DELETE CASCADE en productos.user_id
+
+Revision ID: b3e7f2a9c415
+Revises: 4d5c5492cf9f
+Create Date: 2026-10-17 19:05:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e7f2a9c415'
+down_revision = '4d5c5492cf9f'
+branch_labels = None
+depends_on = None
+
+# La clave foránea original no tiene nombre: se le da uno al reflejar la tabla en modo batch
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+FK_PRODUCTOS_USER = 'fk_productos_user_id_users'
+
+# SQLite no permite cambiar una clave foránea: el modo batch recrea productos y, al borrar la
+# tabla original, se pierden los triggers del índice FTS5 (los ids se conservan, el índice sigue valiendo)
+TRIGGERS_FTS = [
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, descripcion ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+        INSERT INTO productos_fts(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END""",
+]
+
+
+def _recrear_fk(ondelete):
+    with op.batch_alter_table('productos', schema=None, recreate='always',
+                              naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(FK_PRODUCTOS_USER, type_='foreignkey')
+        batch_op.create_foreign_key(FK_PRODUCTOS_USER, 'users', ['user_id'], ['id'], ondelete=ondelete)
+    for trigger in TRIGGERS_FTS:
+        op.execute(trigger)
+
+
+def upgrade():
+    _recrear_fk('CASCADE')
+
+
+def downgrade():
+    _recrear_fk(None)
@@ -0,0 +1,53 @@
+"""Busqueda de texto completo FTS5 sobre productos
+
+Revision ID: c7d41e0f8a23
+Revises: a52e8c4b9d17
+Create Date: 2026-01-26 12:03:51.772940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d41e0f8a23'
+down_revision = 'a52e8c4b9d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE VIRTUAL TABLE productos_fts USING fts5(
+            nombre, descripcion, content='productos', content_rowid='id'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER productos_fts_ai AFTER INSERT ON productos BEGIN
+            INSERT INTO productos_fts(rowid, nombre, descripcion)
+            VALUES (new.id, new.nombre, new.descripcion);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER productos_fts_ad AFTER DELETE ON productos BEGIN
+            INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+            VALUES ('delete', old.id, old.nombre, old.descripcion);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER productos_fts_au AFTER UPDATE OF nombre, descripcion ON productos BEGIN
+            INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+            VALUES ('delete', old.id, old.nombre, old.descripcion);
+            INSERT INTO productos_fts(rowid, nombre, descripcion)
+            VALUES (new.id, new.nombre, new.descripcion);
+        END
+    """)
+    # Indexar los productos existentes
+    op.execute("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS productos_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS productos_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS productos_fts_ai")
+    op.execute("DROP TABLE IF EXISTS productos_fts")
@@ -0,0 +1,32 @@
+"""Columna version en users y productos para ETag
+
+Revision ID: e19b3f6c0d85
+Revises: c7d41e0f8a23
+Create Date: 2026-02-04 09:27:45.530118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e19b3f6c0d85'
+down_revision = 'c7d41e0f8a23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ADD COLUMN con valor por defecto: SQLite no necesita recrear las tablas
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('productos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    # DROP COLUMN nativo (SQLite >= 3.35): el modo batch recrearía productos
+    # y se perderían los triggers del índice FTS5
+    op.drop_column('productos', 'version')
+    op.drop_column('users', 'version')
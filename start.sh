@@ -0,0 +1,41 @@
+#!/bin/bash
+
+echo "🚀 Iniciando servicios..."
+
+cd ~/proyecto
+mkdir -p logs
+
+# Entorno virtual (si existe)
+if [ -f "venv/bin/activate" ]; then
+    source venv/bin/activate
+fi
+
+# Iniciar Gunicorn (configuración, logs y pidfile en gunicorn.conf.py)
+if [ -f "logs/gunicorn.pid" ] && kill -0 $(cat logs/gunicorn.pid) 2>/dev/null; then
+    echo "⚠️  Gunicorn ya estaba en marcha (PID $(cat logs/gunicorn.pid))"
+else
+    nohup gunicorn -c gunicorn.conf.py run:app > /dev/null 2>&1 &
+    echo "✅ Gunicorn iniciado"
+fi
+
+# Iniciar el worker de trabajos (consume la cola de Redis; sin él los trabajos se quedan en cola)
+if pgrep -f "python.*worker.py" > /dev/null; then
+    echo "⚠️  Worker de trabajos ya estaba en marcha"
+else
+    FLASK_ENV=production nohup python worker.py >> logs/worker.log 2>&1 &
+    echo "✅ Worker de trabajos iniciado (logs/worker.log)"
+fi
+
+# Iniciar NGINX
+if pgrep -x nginx > /dev/null; then
+    echo "⚠️  NGINX ya estaba en marcha"
+elif sudo nginx; then
+    echo "✅ NGINX iniciado"
+fi
+
+# Verificar
+sleep 2
+echo "🔍 Verificando..."
+ps aux | grep -E "(nginx|gunicorn|worker.py)" | grep -v grep
+
+echo "🏁 Inicio completado (detener con ./stop.sh)"
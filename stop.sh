@@ -29,14 +29,21 @@ else
     fi
 fi
 
+# Detener el worker de trabajos (SIGTERM: termina el trabajo en curso y sale)
+if pkill -TERM -f "python.*worker.py" 2>/dev/null; then
+    echo "✅ Worker de trabajos detenido"
+else
+    echo "⚠️  Worker de trabajos ya estaba detenido"
+fi
+
 # Verificar
 echo "🔍 Verificando..."
-PROCS=$(ps aux | grep -E "(nginx|gunicorn)" | grep -v grep | wc -l)
+PROCS=$(ps aux | grep -E "(nginx|gunicorn|worker.py)" | grep -v grep | wc -l)
 if [ $PROCS -eq 0 ]; then
     echo "✅ Todos los servicios detenidos"
 else
     echo "⚠️  Algunos procesos siguen activos:"
-    ps aux | grep -E "(nginx|gunicorn)" | grep -v grep
+    ps aux | grep -E "(nginx|gunicorn|worker.py)" | grep -v grep
 fi
 
 echo "🏁 Detención completada"
@@ -0,0 +1,9 @@
+import atexit
+import pytest
+from app.metricas import metricas
+
+# Los tests sustituyen el cliente Redis de las métricas: no volcar nada al terminar pytest
+@pytest.fixture(autouse=True, scope='session')
+def sin_flush_al_salir():
+    atexit.unregister(metricas.flush_al_salir)
+    yield
@@ -0,0 +1,181 @@
+# ------- Redis en memoria para las pruebas de caché -------
+
+import fnmatch
+import threading
+import time
+
+# Pipeline que acumula comandos y los ejecuta en orden
+class FakePipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.comandos = []
+
+    def __getattr__(self, nombre):
+        def encolar(*args, **kwargs):
+            self.comandos.append((nombre, args, kwargs))
+            return self
+        return encolar
+
+    def execute(self):
+        resultados = [getattr(self.redis, n)(*a, **k) for n, a, k in self.comandos]
+        self.comandos = []
+        return resultados
+
+# Pub/sub síncrono: publish entrega el mensaje a los manejadores suscritos
+class FakePubSub:
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def subscribe(self, **manejadores):
+        for canal, manejador in manejadores.items():
+            self.redis.suscriptores.setdefault(canal, []).append(manejador)
+
+    def run_in_thread(self, sleep_time=0, daemon=False, exception_handler=None):
+        return self
+
+    def stop(self):
+        pass
+
+# Implementa solo los comandos que usa app/cache.py, con TTL en segundos
+class FakeRedis:
+
+    def __init__(self):
+        self.data = {}
+        self.expira = {}
+        self.publicados = []
+        self.suscriptores = {}
+        self._lock = threading.Lock() # SET NX atómico entre hilos
+
+    def _vivo(self, key):
+        if key in self.expira and self.expira[key] <= time.time():
+            self.data.pop(key, None)
+            self.expira.pop(key, None)
+        return key in self.data
+
+    def get(self, key):
+        return self.data[key] if self._vivo(key) else None
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and self._vivo(key):
+                return None
+            self.data[key] = value
+            self.expira.pop(key, None)
+            if ex:
+                self.expira[key] = time.time() + ex
+            if px:
+                self.expira[key] = time.time() + px / 1000
+            return True
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value, ex=ttl)
+
+    def incr(self, key):
+        valor = int(self.get(key) or 0) + 1
+        self.data[key] = str(valor)
+        return valor
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def expire(self, key, ttl):
+        if not self._vivo(key):
+            return False
+        self.expira[key] = time.time() + ttl
+        return True
+
+    def sadd(self, key, *miembros):
+        self._vivo(key) # Descartar el set si ya expiró
+        conjunto = self.data.setdefault(key, set())
+        antes = len(conjunto)
+        conjunto.update(miembros)
+        return len(conjunto) - antes
+
+    def smembers(self, key):
+        return set(self.data.get(key, set())) if self._vivo(key) else set()
+
+    def hincrby(self, key, campo, valor=1):
+        self._vivo(key)
+        campos = self.data.setdefault(key, {})
+        campos[campo] = int(campos.get(campo, 0)) + valor
+        return campos[campo]
+
+    def hgetall(self, key):
+        return {c: str(v) for c, v in self.data.get(key, {}).items()} if self._vivo(key) else {}
+
+    def hset(self, key, campo=None, valor=None, mapping=None):
+        self._vivo(key)
+        campos = self.data.setdefault(key, {})
+        nuevos = dict(mapping or {})
+        if campo is not None:
+            nuevos[campo] = valor
+        añadidos = len(set(nuevos) - set(campos))
+        campos.update(nuevos)
+        return añadidos
+
+    # Sorted sets: {miembro: puntuación}
+    def zadd(self, key, mapping):
+        with self._lock:
+            self._vivo(key)
+            miembros = self.data.setdefault(key, {})
+            añadidos = len(set(mapping) - set(miembros))
+            miembros.update({m: float(p) for m, p in mapping.items()})
+            return añadidos
+
+    def zrangebyscore(self, key, minimo, maximo, start=None, num=None):
+        limite = lambda v, defecto: defecto if v in ('-inf', '+inf') else float(v)
+        minimo, maximo = limite(minimo, float('-inf')), limite(maximo, float('inf'))
+        miembros = self.data.get(key, {}) if self._vivo(key) else {}
+        ordenados = [m for m, p in sorted(miembros.items(), key=lambda x: (x[1], x[0])) if minimo <= p <= maximo]
+        return ordenados[start or 0:(start or 0) + num] if num is not None else ordenados
+
+    def zscore(self, key, miembro):
+        return self.data.get(key, {}).get(miembro) if self._vivo(key) else None
+
+    def zrem(self, key, *miembros):
+        conjunto = self.data.get(key, {}) if self._vivo(key) else {}
+        return sum(conjunto.pop(m, None) is not None for m in miembros)
+
+    def scan_iter(self, match='*', count=None):
+        return iter(self.keys(match))
+
+    def unlink(self, *keys):
+        return self.delete(*keys)
+
+    def delete(self, *keys):
+        borradas = 0
+        for key in keys:
+            if self._vivo(key):
+                del self.data[key]
+                self.expira.pop(key, None)
+                borradas += 1
+        return borradas
+
+    def keys(self, pattern='*'):
+        return [k for k in list(self.data) if self._vivo(k) and fnmatch.fnmatchcase(k, pattern)]
+
+    def flushdb(self, asynchronous=False):
+        self.data.clear()
+        self.expira.clear()
+        return True
+
+    def info(self, section=None):
+        return {}
+
+    def ping(self):
+        return True
+
+    def publish(self, canal, mensaje):
+        self.publicados.append((canal, mensaje))
+        manejadores = self.suscriptores.get(canal, [])
+        for manejador in manejadores:
+            manejador({'channel': canal, 'data': mensaje})
+        return len(manejadores)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
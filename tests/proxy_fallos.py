@@ -0,0 +1,117 @@
+# ------- Inyección de fallos: servidor RESP mínimo y proxy TCP con latencia o cortes -------
+
+import socket
+import socketserver
+import threading
+import time
+from tests.fake_redis import FakeRedis
+
+# Servidor que habla RESP para PING, GET y SET sobre un FakeRedis
+class ServidorResp(socketserver.ThreadingTCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ManejadorResp)
+        self.datos = FakeRedis()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def puerto(self):
+        return self.server_address[1]
+
+class ManejadorResp(socketserver.StreamRequestHandler):
+
+    def _leer_comando(self):
+        linea = self.rfile.readline()
+        if not linea:
+            return None
+        argumentos = []
+        for _ in range(int(linea[1:])):
+            longitud = int(self.rfile.readline()[1:])
+            argumentos.append(self.rfile.read(longitud + 2)[:-2])
+        return argumentos
+
+    def handle(self):
+        datos = self.server.datos
+        while True:
+            comando = self._leer_comando()
+            if comando is None:
+                return
+            nombre = comando[0].upper()
+            if nombre == b'PING':
+                respuesta = b'+PONG\r\n'
+            elif nombre == b'GET':
+                valor = datos.get(comando[1])
+                respuesta = b'$-1\r\n' if valor is None else b'$%d\r\n%s\r\n' % (len(valor), valor)
+            elif nombre == b'SET':
+                datos.set(comando[1], comando[2])
+                respuesta = b'+OK\r\n'
+            else: # CLIENT SETINFO y demás: redis-py ignora el error
+                respuesta = b'-ERR comando no soportado\r\n'
+            self.wfile.write(respuesta)
+
+# Proxy TCP delante de un servidor: latencia añadida a cada respuesta o conexiones cortadas
+class ProxyFallos(socketserver.ThreadingTCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, puerto_destino):
+        super().__init__(('127.0.0.1', 0), ManejadorProxy)
+        self.puerto_destino = puerto_destino
+        self.latencia = 0.0
+        self.caido = False
+        self.conexiones = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    # Cortar las conexiones abiertas y rechazar las nuevas
+    def caer(self):
+        self.caido = True
+        for conexion in self.conexiones:
+            try:
+                conexion.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.conexiones = []
+
+    def levantar(self):
+        self.caido = False
+
+class ManejadorProxy(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        proxy = self.server
+        if proxy.caido:
+            return
+        destino = socket.create_connection(('127.0.0.1', proxy.puerto_destino))
+        proxy.conexiones += [self.request, destino]
+
+        def bombear(origen, hacia, retraso):
+            try:
+                while True:
+                    datos = origen.recv(65536)
+                    if not datos:
+                        break
+                    if retraso and proxy.latencia:
+                        time.sleep(proxy.latencia)
+                    hacia.sendall(datos)
+            except OSError:
+                pass
+            finally:
+                for s in (origen, hacia):
+                    try:
+                        s.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+
+        subida = threading.Thread(target=bombear, args=(self.request, destino, False), daemon=True)
+        subida.start()
+        bombear(destino, self.request, True) # La latencia se añade a las respuestas
+        subida.join()
+        destino.close()
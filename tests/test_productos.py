@@ -70,7 +70,7 @@ def test_crear_producto(client, auth_headers):
 def test_listar_productos(client):
     response = client.get('/api/productos')
     assert response.status_code == 200
-    assert isinstance(response.json, list)
+    assert isinstance(response.json['productos'], list)
 
 # Test para obtener un producto por ID
 def test_obtener_producto_por_id(client, auth_headers):
@@ -152,4 +152,575 @@ def test_productos_por_usuario(client, auth_headers):
     
     response = client.get(f'/api/productos/usuario/{user.id}')
     assert response.status_code == 200
-    assert response.json['total'] == 3
\ No newline at end of file
+    assert response.json['total'] == 3
+
+# Test para que total sea el del usuario (fila de agregados) y no el tamaño de la página
+def test_productos_por_usuario_total_paginado(client, auth_headers):
+
+    user = User.query.filter_by(username='testuser').first()
+    for i in range(5):
+        response = client.post('/api/productos', headers=auth_headers,
+                              data=json.dumps({'nombre': f'Producto {i}', 'precio': 10.0}),
+                              content_type='application/json')
+        assert response.status_code == 201
+
+    response = client.get(f'/api/productos/usuario/{user.id}?limit=2')
+    assert response.status_code == 200
+    assert len(response.json['productos']) == 2
+    assert response.json['total'] == 5
+
+# Test para recorrer los productos con paginación por cursor
+def test_paginacion_keyset_productos(client, auth_headers):
+
+    user = User.query.filter_by(username='testuser').first()
+    for i in range(5):
+        db.session.add(Producto(nombre=f'Producto {i}', precio=10.0 * i, user_id=user.id))
+    db.session.commit()
+
+    vistos = []
+    cursor = None
+    while True:
+        url = '/api/productos?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json['limit'] == 2
+        vistos.extend(p['id'] for p in response.json['productos'])
+        cursor = response.json['next_cursor']
+        if not cursor:
+            break
+
+    # Todas las filas aparecen una sola vez y en orden
+    assert len(vistos) == 5
+    assert vistos == sorted(set(vistos))
+
+# Test para rechazar un cursor mal formado
+def test_paginacion_cursor_invalido(client):
+    response = client.get('/api/productos?cursor=no-es-un-cursor')
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+# Test para descargar el catálogo completo en NDJSON
+def test_stream_productos_ndjson(client, auth_headers):
+
+    user = User.query.filter_by(username='testuser').first()
+    for i in range(3):
+        db.session.add(Producto(nombre=f'Producto {i}', precio=1.0 + i, user_id=user.id))
+    db.session.commit()
+
+    response = client.get('/api/productos', headers={'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    lineas = response.get_data(as_text=True).splitlines()
+    productos = [json.loads(linea) for linea in lineas]
+    assert [p['nombre'] for p in productos] == ['Producto 0', 'Producto 1', 'Producto 2']
+
+# Test para pedir solo algunos campos sin leer la descripción de disco
+def test_fields_productos(app, client, auth_headers):
+
+    from sqlalchemy import event
+
+    user = User.query.filter_by(username='testuser').first()
+    producto = Producto(nombre='Ligero', descripcion='x' * 1000, precio=5.0, user_id=user.id)
+    db.session.add(producto)
+    db.session.commit()
+    producto_id = producto.id
+    db.session.expunge_all()
+
+    sentencias = []
+    def capturar(conn, cursor, statement, *args):
+        sentencias.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        response = client.get('/api/productos?fields=id,nombre,precio')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    assert response.status_code == 200
+    assert response.json['productos'][0] == {'id': producto_id, 'nombre': 'Ligero', 'precio': 5.0}
+    assert not any('descripcion' in s for s in sentencias if 'FROM productos' in s)
+
+# Test para rechazar campos desconocidos en fields
+def test_fields_invalidos(client):
+    response = client.get('/api/productos?fields=id,no_existe')
+    assert response.status_code == 400
+
+# Test para filtrar y ordenar productos en el servidor
+def test_filtros_y_orden_productos(client, auth_headers):
+
+    user = User.query.filter_by(username='testuser').first()
+    for i, (precio, stock) in enumerate([(5.0, 0), (15.0, 3), (25.0, 10), (35.0, 1)]):
+        db.session.add(Producto(nombre=f'P{i}', precio=precio, stock=stock, user_id=user.id))
+    db.session.commit()
+
+    response = client.get('/api/productos?precio_min=10&precio_max=30')
+    assert [p['precio'] for p in response.json['productos']] == [15.0, 25.0]
+
+    response = client.get('/api/productos?stock_gt=0&sort=-stock')
+    assert [p['stock'] for p in response.json['productos']] == [10, 3, 1]
+
+    # Recorrer en orden descendente de precio con cursor
+    response = client.get('/api/productos?sort=-precio&limit=3')
+    segunda = client.get(f"/api/productos?sort=-precio&limit=3&cursor={response.json['next_cursor']}")
+    assert [p['precio'] for p in response.json['productos']] == [35.0, 25.0, 15.0]
+    assert [p['precio'] for p in segunda.json['productos']] == [5.0]
+
+    assert client.get('/api/productos?sort=descripcion').status_code == 400
+    assert client.get('/api/productos?precio_min=barato').status_code == 400
+
+# Test para comprobar con EXPLAIN QUERY PLAN que cada filtro usa un índice
+@pytest.mark.parametrize('filtro', [
+    'precio_min=10',
+    'precio_max=30',
+    'stock_gt=2',
+    'user_id=1',
+    'created_after=2024-01-01T00:00:00',
+])
+def test_filtros_usan_indice(client, filtro):
+
+    from sqlalchemy import event
+
+    consultas = []
+    def capturar(conn, cursor, statement, parameters, *args):
+        if 'FROM productos' in statement:
+            consultas.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        response = client.get(f'/api/productos?{filtro}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    assert response.status_code == 200
+    assert consultas
+
+    with db.engine.connect() as conn:
+        for statement, parameters in consultas:
+            plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            detalles = [fila[-1] for fila in plan]
+            assert any(d.startswith('SEARCH productos USING INDEX') for d in detalles), detalles
+            assert not any(d.startswith('SCAN productos') for d in detalles), detalles
+
+# Test para la búsqueda de texto completo con ranking y cursor
+def test_buscar_productos(client, auth_headers):
+
+    user = User.query.filter_by(username='testuser').first()
+    db.session.add_all([
+        Producto(nombre='Laptop HP', descripcion='Portátil para oficina', precio=500.0, user_id=user.id),
+        Producto(nombre='Ratón', descripcion='Compatible con cualquier laptop', precio=20.0, user_id=user.id),
+        Producto(nombre='Mesa', descripcion='Madera maciza', precio=150.0, user_id=user.id),
+    ])
+    db.session.commit()
+
+    response = client.get('/api/productos/search?q=laptop&limit=1')
+    assert response.status_code == 200
+    # La coincidencia en el nombre pesa más que en la descripción
+    assert response.json['productos'][0]['nombre'] == 'Laptop HP'
+
+    siguiente = client.get(f"/api/productos/search?q=laptop&limit=1&cursor={response.json['next_cursor']}")
+    assert [p['nombre'] for p in siguiente.json['productos']] == ['Ratón']
+    assert siguiente.json['next_cursor'] is None
+
+    # Los triggers mantienen el índice al actualizar
+    mesa = Producto.query.filter_by(nombre='Mesa').first()
+    mesa.descripcion = 'Mesa para laptop'
+    db.session.commit()
+    response = client.get('/api/productos/search?q=laptop')
+    assert len(response.json['productos']) == 3
+
+    assert client.get('/api/productos/search').status_code == 400
+
+# Test para el alta masiva con resultados por elemento
+def test_crear_productos_bulk(client, auth_headers):
+
+    response = client.post('/api/productos/bulk',
+                          headers=auth_headers,
+                          data=json.dumps([
+                              {'nombre': 'A', 'precio': 1.0, 'stock': 2},
+                              {'nombre': 'B'},
+                              {'nombre': 'C', 'precio': 3.0}
+                          ]),
+                          content_type='application/json')
+
+    assert response.status_code == 207
+    assert response.json['created'] == 2
+    assert response.json['failed'] == 1
+
+    resultados = response.json['results']
+    assert [r['status'] for r in resultados] == [201, 400, 201]
+    assert 'precio' in resultados[1]['errors']
+    assert db.session.get(Producto, resultados[2]['id']).nombre == 'C'
+
+# Test para reservar stock con un UPDATE condicional
+def test_reservar_stock(client, auth_headers):
+
+    user = User.query.filter_by(username='testuser').first()
+    producto = Producto(nombre='Silla', precio=30.0, stock=5, user_id=user.id)
+    db.session.add(producto)
+    db.session.commit()
+
+    response = client.post(f'/api/productos/{producto.id}/stock',
+                          headers=auth_headers,
+                          data=json.dumps({'delta': -3}),
+                          content_type='application/json')
+    assert response.status_code == 200
+    assert response.json['stock'] == 2
+
+    # No se puede dejar el stock en negativo
+    response = client.post(f'/api/productos/{producto.id}/stock',
+                          headers=auth_headers,
+                          data=json.dumps({'delta': -3}),
+                          content_type='application/json')
+    assert response.status_code == 409
+    assert response.json['stock'] == 2
+
+    response = client.post('/api/productos/9999/stock',
+                          headers=auth_headers,
+                          data=json.dumps({'delta': -1}),
+                          content_type='application/json')
+    assert response.status_code == 404
+
+# Test para reservar stock de varios productos (todo o nada)
+def test_reservar_stock_lote(client, auth_headers):
+
+    user = User.query.filter_by(username='testuser').first()
+    a = Producto(nombre='A', precio=1.0, stock=4, user_id=user.id)
+    b = Producto(nombre='B', precio=1.0, stock=1, user_id=user.id)
+    db.session.add_all([a, b])
+    db.session.commit()
+
+    response = client.post('/api/productos/stock',
+                          headers=auth_headers,
+                          data=json.dumps({'items': [{'id': a.id, 'delta': -2}, {'id': b.id, 'delta': -2}]}),
+                          content_type='application/json')
+    assert response.status_code == 409
+    assert response.json['id'] == b.id
+    assert db.session.get(Producto, a.id).stock == 4
+
+    response = client.post('/api/productos/stock',
+                          headers=auth_headers,
+                          data=json.dumps({'items': [{'id': a.id, 'delta': -2}, {'id': b.id, 'delta': -1}]}),
+                          content_type='application/json')
+    assert response.status_code == 200
+    assert response.json['productos'] == [{'id': a.id, 'stock': 2}, {'id': b.id, 'stock': 0}]
+
+# Test para la caché read-through de un producto y su refresco al actualizar
+def test_cache_producto(app, client, auth_headers):
+
+    from app.cache import CacheManager
+    from tests.fake_redis import FakeRedis
+
+    app.cache_manager = CacheManager(FakeRedis())
+
+    user = User.query.filter_by(username='testuser').first()
+    producto = Producto(nombre='Cacheado', precio=10.0, user_id=user.id)
+    db.session.add(producto)
+    db.session.commit()
+
+    assert client.get(f'/api/productos/{producto.id}').json['nombre'] == 'Cacheado'
+    assert client.get(f'/api/productos/{producto.id}').json['nombre'] == 'Cacheado'
+    assert app.cache_manager.stats['misses'] == 1
+    assert app.cache_manager.stats['hits'] == 1
+
+    # La actualización reescribe la entrada tras el commit
+    client.put(f'/api/productos/{producto.id}',
+              headers=auth_headers,
+              data=json.dumps({'nombre': 'Renombrado'}),
+              content_type='application/json')
+    assert client.get(f'/api/productos/{producto.id}').json['nombre'] == 'Renombrado'
+    assert app.cache_manager.stats['hits'] == 2
+
+    # El borrado elimina la entrada
+    client.delete(f'/api/productos/{producto.id}', headers=auth_headers)
+    assert client.get(f'/api/productos/{producto.id}').status_code == 404
+
+# Test para la L1 por worker delante de Redis y su invalidación entre workers
+def test_cache_dos_niveles(app, client, auth_headers):
+
+    from app.cache import CacheManager, CacheLocal
+    from tests.fake_redis import FakeRedis
+
+    redis_falso = FakeRedis()
+    otro_worker = CacheManager(redis_falso, CacheLocal())
+    otro_worker.l1.redis = redis_falso
+    app.cache_manager = CacheManager(redis_falso, CacheLocal())
+    app.cache_manager.l1.redis = redis_falso
+
+    user = User.query.filter_by(username='testuser').first()
+    producto = Producto(nombre='L1', precio=10.0, user_id=user.id)
+    db.session.add(producto)
+    db.session.commit()
+    clave = f'producto:{producto.id}'
+
+    for _ in range(3):
+        assert client.get(f'/api/productos/{producto.id}').json['nombre'] == 'L1'
+    assert otro_worker.get(clave)['nombre'] == 'L1'
+
+    stats = app.cache_manager.get_stats()['worker_stats']
+    assert (stats['misses'], stats['l2_hits'], stats['l1_hits']) == (1, 0, 2)
+    assert otro_worker.stats['l2_hits'] == 1
+
+    # La escritura en este worker invalida la copia L1 del otro por pub/sub
+    client.put(f'/api/productos/{producto.id}',
+              headers=auth_headers,
+              data=json.dumps({'nombre': 'Renombrado'}),
+              content_type='application/json')
+    assert otro_worker.get(clave)['nombre'] == 'Renombrado'
+    assert otro_worker.stats['l2_hits'] == 2
+
+    # Un borrado por lotes avisa al resto de workers con un único mensaje
+    claves = ['producto:1001', 'producto:1002']
+    for clave in claves:
+        app.cache_manager.set(clave, {'nombre': clave})
+        assert otro_worker.get(clave) == {'nombre': clave}
+    publicados = len(redis_falso.publicados)
+    assert app.cache_manager.delete_many(claves) == 2
+    assert len(redis_falso.publicados) == publicados + 1
+    assert [otro_worker.get(clave) for clave in claves] == [None, None]
+
+    # El presupuesto en bytes descarta las entradas menos usadas
+    l1 = CacheLocal(max_bytes=10)
+    l1.set('a', 1, 6)
+    l1.set('b', 2, 6)
+    assert l1.info() == {'entries': 1, 'bytes': 6, 'max_bytes': 10}
+
+# Test para ETag / If-None-Match con la versión de la fila
+def test_etag_producto(client, auth_headers):
+
+    user = User.query.filter_by(username='testuser').first()
+    producto = Producto(nombre='Versionado', precio=10.0, user_id=user.id)
+    db.session.add(producto)
+    db.session.commit()
+
+    response = client.get(f'/api/productos/{producto.id}')
+    etag = response.headers['ETag']
+    assert response.json['version'] == 1
+
+    response = client.get(f'/api/productos/{producto.id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    # Cualquier escritura cambia la versión y por tanto el ETag
+    client.post(f'/api/productos/{producto.id}/stock',
+               headers=auth_headers,
+               data=json.dumps({'delta': 2}),
+               content_type='application/json')
+    response = client.get(f'/api/productos/{producto.id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json['version'] == 2
+
+# Test para que una escritura concurrente entre la lectura y el flush devuelva 409 y no 500
+def test_actualizar_producto_conflicto(client, auth_headers, monkeypatch):
+
+    from app.blueprints.productos import controllers
+
+    user = User.query.filter_by(username='testuser').first()
+    producto = Producto(nombre='Original', precio=10.0, user_id=user.id)
+    db.session.add(producto)
+    db.session.commit()
+    id = producto.id
+
+    # Un POST /stock (UPDATE con version + 1) se cuela después de cargar el producto
+    load = controllers.producto_schema.load
+    def load_con_carrera(data, **kwargs):
+        db.session.connection().exec_driver_sql('UPDATE productos SET version = version + 1 WHERE id = ?', (id,))
+        return load(data, **kwargs)
+    monkeypatch.setattr(controllers.producto_schema, 'load', load_con_carrera)
+
+    response = client.put(f'/api/productos/{id}',
+                         headers=auth_headers,
+                         data=json.dumps({'nombre': 'Actualizado'}),
+                         content_type='application/json')
+    assert response.status_code == 409
+    assert 'error' in response.json
+
+    # Releyendo y reintentando sin carrera se actualiza
+    monkeypatch.undo()
+    response = client.put(f'/api/productos/{id}',
+                         headers=auth_headers,
+                         data=json.dumps({'nombre': 'Actualizado'}),
+                         content_type='application/json')
+    assert response.status_code == 200
+    assert response.json['producto']['nombre'] == 'Actualizado'
+
+# Test para los agregados incrementales y su recálculo desde cero
+def test_stats_productos(client, auth_headers):
+
+    from app.models.estadisticas import recalcular_stats
+
+    def crear(nombre, precio, stock):
+        return client.post('/api/productos', headers=auth_headers,
+                           data=json.dumps({'nombre': nombre, 'precio': precio, 'stock': stock}),
+                           content_type='application/json').json['producto']['id']
+
+    a = crear('A', 10.0, 2)
+    b = crear('B', 30.0, 1)
+    client.post('/api/productos/bulk', headers=auth_headers,
+                data=json.dumps([{'nombre': 'C', 'precio': 20.0, 'stock': 5}]),
+                content_type='application/json')
+    client.put(f'/api/productos/{a}', headers=auth_headers,
+               data=json.dumps({'precio': 15.0}), content_type='application/json')
+    client.post(f'/api/productos/{b}/stock', headers=auth_headers,
+                data=json.dumps({'delta': -1}), content_type='application/json')
+    client.delete(f'/api/productos/{a}', headers=auth_headers)
+
+    user = User.query.filter_by(username='testuser').first()
+    response = client.get(f'/api/productos/stats?user_id={user.id}')
+    assert response.status_code == 200
+    assert response.json['global'] == {
+        'total_productos': 2, 'total_stock': 5, 'valor_stock': 100.0, 'precio_medio': 25.0
+    }
+    assert response.json['usuario'] == response.json['global']
+
+    # El recálculo completo coincide con lo mantenido de forma incremental
+    recalcular_stats()
+    assert client.get('/api/productos/stats').json['global'] == response.json['global']
+
+# Test para el perfil SQLite de producción: WAL y lecturas GET por el pool de solo lectura
+def test_perfil_sqlite_produccion(tmp_path, monkeypatch):
+    from sqlalchemy import select, text
+    from app.config import config, ProductionConfig
+    from app.models.enrutado import engine_lectura
+
+    class ConfigPrueba(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'produccion.db'}"
+        SQLITE_READ_POOL = True
+    monkeypatch.setitem(config, 'prueba_sqlite', ConfigPrueba)
+
+    app = create_app('prueba_sqlite')
+    with app.app_context():
+        db.create_all()
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        user = User(username='lector')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Producto(nombre='Solo lectura', precio=1.0, user_id=user.id))
+        db.session.commit()
+
+        lectura = engine_lectura(app)
+        with app.test_request_context('/api/productos', method='GET'):
+            assert db.session.get_bind(clause=select(Producto)) is lectura
+        with app.test_request_context('/api/productos', method='POST'):
+            assert db.session.get_bind(clause=select(Producto)) is db.engine
+
+        # El pool mode=ro no puede escribir aunque se intente
+        with lectura.connect() as conn:
+            with pytest.raises(Exception, match='readonly'):
+                conn.execute(text('DELETE FROM productos'))
+
+    response = app.test_client().get('/api/productos')
+    assert [p['nombre'] for p in response.json['productos']] == ['Solo lectura']
+
+# Test para el pool de lectura con la URI relativa por defecto (Flask-SQLAlchemy la resuelve a instance/)
+def test_perfil_sqlite_uri_relativa(tmp_path, monkeypatch):
+    from flask import Flask
+    from app.config import config, ProductionConfig
+    from app.models.enrutado import engine_lectura
+
+    monkeypatch.setattr(Flask, 'auto_find_instance_path', lambda self: str(tmp_path))
+    class ConfigPrueba(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///users.db'
+    monkeypatch.setitem(config, 'prueba_relativa', ConfigPrueba)
+
+    app = create_app('prueba_relativa')
+    with app.app_context():
+        db.create_all()
+        user = User(username='relativo')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Producto(nombre='Instancia', precio=1.0, user_id=user.id))
+        db.session.commit()
+        producto_id = user.productos[0].id
+    assert engine_lectura(app).url.database == f"file:{tmp_path / 'users.db'}"
+
+    client = app.test_client()
+    assert [p['nombre'] for p in client.get('/api/productos').json['productos']] == ['Instancia']
+    assert client.get(f'/api/productos/{producto_id}').status_code == 200
+
+# Test para el enrutado lectura/escritura con dos ficheros SQLite (principal y réplica)
+def test_enrutado_lectura_escritura(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, insert, select
+    from app.config import config, Config
+    from app.models import use_primary
+    from app.models.enrutado import engine_lectura
+
+    replica = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = create_engine(replica)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User).values(username='replica', password_hash='x', role='user')).inserted_primary_key[0]
+        conn.execute(insert(Producto).values(nombre='En réplica', precio=1.0, user_id=user_id))
+    engine.dispose()
+
+    class ConfigPrueba(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'principal.db'}"
+        SQLALCHEMY_READ_URI = replica
+    monkeypatch.setitem(config, 'prueba_replica', ConfigPrueba)
+
+    app = create_app('prueba_replica')
+    with app.app_context():
+        db.create_all()
+        user = User(username='principal')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Producto(nombre='En principal', precio=1.0, user_id=user.id))
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    assert [p['nombre'] for p in client.get('/api/productos').json['productos']] == ['En réplica']
+
+    lectura = engine_lectura(app)
+    with app.test_request_context('/api/productos', method='GET'):
+        assert db.session.get_bind(clause=select(Producto)) is lectura
+        with use_primary():
+            assert db.session.get_bind(clause=select(Producto)) is db.engine
+        assert db.session.get_bind(clause=select(Producto)) is lectura
+
+        # Tras escribir, el resto de la petición lee del principal lo que acaba de escribir
+        db.session.add(Producto(nombre='Recién escrito', precio=3.0, user_id=user_id))
+        db.session.flush()
+        assert db.session.get_bind(clause=select(Producto)) is db.engine
+        assert db.session.scalar(select(Producto.id).filter_by(nombre='Recién escrito')) is not None
+        db.session.rollback()
+
+    with app.test_request_context('/api/productos', method='POST'):
+        assert db.session.get_bind(clause=select(Producto)) is db.engine
+
+# Test para el enrutado con la configuración de producción y URIs relativas (principal y réplica en instance/)
+def test_enrutado_produccion_uri_relativa(tmp_path, monkeypatch):
+    from flask import Flask
+    from sqlalchemy import create_engine, insert, select
+    from app.config import config, ProductionConfig
+    from app.models.enrutado import engine_lectura
+
+    monkeypatch.setattr(Flask, 'auto_find_instance_path', lambda self: str(tmp_path))
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User).values(username='replica', password_hash='x', role='user')).inserted_primary_key[0]
+        conn.execute(insert(Producto).values(nombre='En réplica', precio=1.0, user_id=user_id))
+    engine.dispose()
+
+    class ConfigPrueba(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///users.db'
+    monkeypatch.setitem(config, 'prueba_produccion', ConfigPrueba)
+
+    # Sin réplica: pool mode=ro sobre instance/users.db
+    app = create_app('prueba_produccion')
+    with app.app_context():
+        db.create_all()
+        with app.test_request_context('/api/productos', method='GET'):
+            assert db.session.get_bind(clause=select(Producto)) is engine_lectura(app)
+    response = app.test_client().get('/api/productos')
+    assert (response.status_code, response.json['productos']) == (200, [])
+
+    # Con réplica relativa: se resuelve contra instance/ como la principal
+    monkeypatch.setattr(ConfigPrueba, 'SQLALCHEMY_READ_URI', 'sqlite:///replica.db', raising=False)
+    app = create_app('prueba_produccion')
+    assert engine_lectura(app).url.database == str(tmp_path / 'replica.db')
+    response = app.test_client().get('/api/productos')
+    assert [p['nombre'] for p in response.json['productos']] == ['En réplica']
@@ -2,6 +2,8 @@
 
 import pytest
 import json
+import threading
+import time
 from app import create_app, db
 from app.models import User
 
@@ -188,6 +190,28 @@ def test_actualizar_usuario_propio(client, auth_headers):
     assert response.status_code == 200
     assert response.json['user']['email'] == 'newemail@test.com'
 
+# Test para que dos PUT concurrentes sobre el mismo usuario no terminen en 500
+def test_actualizar_usuario_conflicto(client, auth_headers, monkeypatch):
+
+    from app.blueprints.usuarios import controllers
+
+    user = User.query.filter_by(username='testuser').first()
+    id = user.id
+
+    # Otra petición actualiza el usuario después de cargarlo
+    load = controllers.user_update_schema.load
+    def load_con_carrera(data, **kwargs):
+        db.session.connection().exec_driver_sql('UPDATE users SET version = version + 1 WHERE id = ?', (id,))
+        return load(data, **kwargs)
+    monkeypatch.setattr(controllers.user_update_schema, 'load', load_con_carrera)
+
+    response = client.put(f'/api/usuarios/{id}',
+                         headers=auth_headers,
+                         data=json.dumps({'email': 'carrera@test.com'}),
+                         content_type='application/json')
+    assert response.status_code == 409
+    assert db.session.get(User, id).email == 'test@test.com'
+
 # Test para que un admin pueda eliminar usuarios
 def test_eliminar_usuario_admin(client, admin_headers):
     # Crear usuario a eliminar
@@ -202,3 +226,437 @@ def test_eliminar_usuario_admin(client, admin_headers):
     # Verificar que fue eliminado
     deleted_user = User.query.get(user.id)
     assert deleted_user is None
+
+# Test para obtener un usuario con sparse fieldsets
+def test_obtener_usuario_fields(client, auth_headers):
+    user = User.query.filter_by(username='testuser').first()
+
+    response = client.get(f'/api/usuarios/{user.id}?fields=id,username', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json == {'id': user.id, 'username': 'testuser'}
+
+    # password es load_only y nunca puede pedirse
+    response = client.get(f'/api/usuarios/{user.id}?fields=password', headers=auth_headers)
+    assert response.status_code == 400
+
+# Test para ETag / If-None-Match en la lectura de un usuario
+def test_etag_usuario(client, auth_headers):
+    user = User.query.filter_by(username='testuser').first()
+
+    response = client.get(f'/api/usuarios/{user.id}', headers=auth_headers)
+    etag = response.headers['ETag']
+
+    response = client.get(f'/api/usuarios/{user.id}', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+    client.put(f'/api/usuarios/{user.id}',
+               headers=auth_headers,
+               data=json.dumps({'email': 'otro@test.com'}),
+               content_type='application/json')
+    response = client.get(f'/api/usuarios/{user.id}', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['version'] == 2
+
+# Test para la caché de identidades y su invalidación al modificar usuarios
+def test_cache_identidades(app, client, admin_headers):
+    from sqlalchemy import event
+    from app.identidad import identidades
+
+    admin = User.query.filter_by(username='admin').first()
+    assert identidades.resolver('admin') == (admin.id, 'admin')
+
+    # Un segundo resolve no consulta la base de datos
+    consultas = []
+    def contar(*args):
+        consultas.append(args)
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        assert identidades.resolver('admin').id == admin.id
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    assert consultas == []
+
+    # Renombrar invalida la entrada antigua
+    client.put(f'/api/usuarios/{admin.id}',
+               headers=admin_headers,
+               data=json.dumps({'username': 'admin2'}),
+               content_type='application/json')
+    assert identidades.resolver('admin') is None
+    assert identidades.resolver('admin2').id == admin.id
+
+# Test para la caché de respuestas ya codificadas de cache_result
+def test_cache_respuesta_bytes(client, admin_headers, monkeypatch):
+    import app as app_module
+    from tests.fake_redis import FakeRedis
+
+    redis_falso = FakeRedis()
+    monkeypatch.setattr(app_module, 'redis_raw_client', redis_falso)
+
+    primera = client.get('/api/usuarios', headers=admin_headers)
+    assert primera.status_code == 200
+
+    # Se guarda el cuerpo exacto junto a status y content-type
+    clave, = redis_falso.keys('usuarios:g0:all:*')
+    assert redis_falso.get(clave).endswith(primera.data)
+
+    segunda = client.get('/api/usuarios', headers=admin_headers)
+    assert segunda.data == primera.data
+    assert segunda.mimetype == 'application/json'
+
+# Test para invalidar los listados cacheados avanzando la generación del espacio de nombres
+def test_invalidacion_generacional(app, client, admin_headers, monkeypatch):
+    import app as app_module
+    from app.cache import CacheManager
+    from tests.fake_redis import FakeRedis
+
+    redis_falso = FakeRedis()
+    monkeypatch.setattr(app_module, 'redis_raw_client', redis_falso)
+    monkeypatch.setattr(app_module, 'redis_client', redis_falso)
+    monkeypatch.setattr(app, 'cache_manager', CacheManager(redis_falso))
+
+    client.get('/api/usuarios', headers=admin_headers)
+    client.get('/api/usuarios?fields=id', headers=admin_headers)
+    assert len(redis_falso.keys('usuarios:g0:*')) == 2
+
+    admin = User.query.filter_by(username='admin').first()
+    client.put(f'/api/usuarios/{admin.id}',
+               headers=admin_headers,
+               data=json.dumps({'email': 'nuevo@test.com'}),
+               content_type='application/json')
+
+    # Un único INCR: las claves antiguas no se borran, simplemente dejan de leerse
+    assert len(redis_falso.keys('usuarios:g0:*')) == 2
+    response = client.get('/api/usuarios', headers=admin_headers)
+    assert any(u['email'] == 'nuevo@test.com' for u in response.json)
+    assert len(redis_falso.keys('usuarios:g1:*')) == 1
+
+    stats = client.get('/api/usuarios/cache/stats', headers=admin_headers)
+    assert stats.json['generations'] == {'usuarios': 1}
+
+# Test para la protección contra estampidas: una sola consulta por expiración
+def test_cache_sin_estampida(app, admin_headers, monkeypatch):
+    import app as app_module
+    from app.blueprints.usuarios.controllers import UsuarioController
+    from app.cache import desempaquetar_respuesta, empaquetar_respuesta
+    from app.metricas import metricas
+    from tests.fake_redis import FakeRedis
+
+    metricas.flush() # Lo acumulado por otras pruebas no va al Redis falso
+    redis_falso = FakeRedis()
+    monkeypatch.setattr(app_module, 'redis_raw_client', redis_falso)
+    monkeypatch.setattr(metricas, 'redis', redis_falso)
+
+    original = UsuarioController.get_usuarios
+    consultas = []
+    def get_usuarios_lento():
+        consultas.append(1)
+        time.sleep(0.2) # Ventana en la que llega el resto de peticiones
+        return original()
+    monkeypatch.setattr(UsuarioController, 'get_usuarios', staticmethod(get_usuarios_lento))
+
+    # Ocho peticiones simultáneas, cada una con su propio cliente
+    def rafaga():
+        barrera = threading.Barrier(8)
+        estados = []
+        def peticion():
+            cliente = app.test_client()
+            barrera.wait()
+            estados.append(cliente.get('/api/usuarios', headers=admin_headers).status_code)
+        hilos = [threading.Thread(target=peticion) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return estados
+
+    assert rafaga() == [200] * 8
+    assert len(consultas) == 1
+
+    # Tras la expiración lógica uno recalcula y el resto sirve el valor anterior
+    clave, = redis_falso.keys('usuarios:*')
+    status, content_type, delta, _, body = desempaquetar_respuesta(redis_falso.get(clave))
+    redis_falso.set(clave, empaquetar_respuesta(status, content_type, body, delta, time.time() - 1))
+    assert rafaga() == [200] * 8
+    assert len(consultas) == 2
+
+    # El refresco anticipado encontró el valor: es un hit con refresco, no un miss
+    usuarios = metricas.leer('cache')['usuarios']
+    assert (usuarios['misses'], usuarios['refreshes'], usuarios['hits']) == (1, 1, 15)
+
+# Test para las métricas compartidas entre workers (por prefijo de clave y por endpoint)
+def test_metricas_cluster(app, client, admin_headers, monkeypatch):
+    import app as app_module
+    from app.cache import CacheManager
+    from app.metricas import Metricas, metricas
+    from tests.fake_redis import FakeRedis
+
+    metricas.flush() # Lo acumulado por otras pruebas no va al Redis falso
+    redis_falso = FakeRedis()
+    monkeypatch.setattr(app_module, 'redis_raw_client', redis_falso)
+    monkeypatch.setattr(metricas, 'redis', redis_falso)
+    monkeypatch.setattr(metricas, 'flush_cada', 1000) # Solo se vuelca al leer
+    monkeypatch.setattr(metricas, 'intervalo', 1000)
+    monkeypatch.setattr(app, 'cache_manager', CacheManager(redis_falso))
+
+    client.get('/api/usuarios', headers=admin_headers)
+    client.get('/api/usuarios', headers=admin_headers)
+
+    # Otro worker ve los contadores en cuanto este los vuelca
+    otro_worker = Metricas()
+    otro_worker.redis = redis_falso
+    assert otro_worker.leer('cache') == {}
+    metricas.flush()
+    usuarios = otro_worker.leer('cache')['usuarios']
+    assert (usuarios['hits'], usuarios['misses'], usuarios['writes']) == (1, 1, 1)
+
+    stats = client.get('/api/usuarios/cache/stats', headers=admin_headers).json
+    assert stats['by_prefix']['usuarios']['hit_rate'] == 50.0
+    assert stats['by_prefix']['usuarios']['avg_value_bytes'] > 0
+    assert stats['request_stats']['usuarios.get_usuarios']['requests'] == 2
+
+# Test de inyección de fallos: timeouts, circuito abierto y reactivación al volver Redis
+def test_redis_resiliente_con_fallos():
+    import redis
+    from app.cache import CacheManager
+    from app.redis_resiliente import crear_cliente, RedisNoDisponible
+    from tests.proxy_fallos import ServidorResp, ProxyFallos
+
+    servidor = ServidorResp()
+    proxy = ProxyFallos(servidor.puerto)
+    cliente = crear_cliente(proxy.url, {'REDIS_SOCKET_TIMEOUT': 0.2, 'REDIS_CONNECT_TIMEOUT': 0.2,
+                                        'REDIS_BREAKER_THRESHOLD': 2, 'REDIS_PROBE_INTERVAL': 0.05})
+    assert cliente.set('clave', 'valor')
+    assert cliente.get('clave') == b'valor'
+
+    def esperar_cierre():
+        limite = time.monotonic() + 5
+        while cliente.breaker.abierto and time.monotonic() < limite:
+            time.sleep(0.02)
+        assert not cliente.breaker.abierto
+
+    # Latencia mayor que el timeout: tras dos fallos el circuito se abre y se falla al instante
+    proxy.latencia = 1.0
+    for _ in range(2):
+        with pytest.raises(redis.exceptions.TimeoutError):
+            cliente.get('clave')
+    assert cliente.breaker.abierto
+    inicio = time.perf_counter()
+    with pytest.raises(RedisNoDisponible):
+        cliente.get('clave')
+    assert CacheManager(cliente).get('clave') is None
+    assert time.perf_counter() - inicio < 0.05
+
+    # El sondeo en segundo plano reactiva el cliente cuando Redis vuelve a responder
+    proxy.latencia = 0
+    esperar_cierre()
+    assert cliente.get('clave') == b'valor'
+
+    # Conexiones cortadas
+    proxy.caer()
+    for _ in range(2):
+        with pytest.raises(redis.exceptions.ConnectionError):
+            cliente.get('clave')
+    assert cliente.breaker.abierto
+    proxy.levantar()
+    esperar_cierre()
+    assert cliente.get('clave') == b'valor'
+
+# Test para que agotar el pool local no abra el circuito cuando Redis responde
+def test_pool_agotado_no_abre_circuito():
+    from app.cache import CacheManager
+    from app.redis_resiliente import crear_cliente, PoolAgotado
+    from tests.proxy_fallos import ServidorResp
+
+    servidor = ServidorResp()
+    cliente = crear_cliente(f"redis://127.0.0.1:{servidor.puerto}/0",
+                            {'REDIS_MAX_CONNECTIONS': 1, 'REDIS_POOL_TIMEOUT': 0.01, 'REDIS_BREAKER_THRESHOLD': 2})
+    assert cliente.set('clave', 'valor')
+
+    pool = cliente.cliente.connection_pool
+    ocupada = pool.get_connection('GET') # Otro hilo tiene la única conexión
+    for _ in range(3):
+        with pytest.raises(PoolAgotado):
+            cliente.get('clave')
+    assert CacheManager(cliente).get('clave') is None # Cae al camino sin caché
+    assert not cliente.breaker.abierto
+
+    pool.release(ocupada)
+    assert cliente.get('clave') == b'valor'
+
+# Test para la reinicialización de recursos en un worker recién creado (preload_app)
+def test_reinit_worker(app, admin_headers):
+    import app as app_module
+    from app import reinit_worker, seed_worker_caches
+    from app.identidad import identidades
+
+    pool = db.engine.pool
+    cliente = app_module.redis_client
+    assert identidades.resolver('admin') is not None
+
+    reinit_worker(app, concurrency=4)
+    assert db.engine.pool is not pool
+    assert app_module.redis_client is not cliente
+    # 4 peticiones + listener de identidades + 2 hilos de trabajos + sondeo (L1 desactivada)
+    assert app_module.redis_client.cliente.connection_pool.max_connections == 8
+    app.config['CACHE_L1_ENABLED'] = True
+    assert app_module.redis_connections(app, 4) == 9
+    app.config['CACHE_L1_ENABLED'] = False
+    assert app.cache_manager.redis is app_module.redis_client
+
+    seed_worker_caches(app)
+    assert len(identidades._datos) == 0
+    assert User.query.filter_by(username='admin').first() is not None
+
+# Test para el asesor de índices: propone ix_users_role si falta y no ve recorridos de productos
+def test_asesor_indices(app, admin_headers):
+    from sqlalchemy import text
+    from app.models import Producto
+    from app.models.indices import asesorar, indices_sugeridos
+
+    admin = User.query.filter_by(username='admin').first()
+    db.session.add_all([Producto(nombre=f'Producto {i}', precio=float(i), user_id=admin.id) for i in range(5)])
+    db.session.execute(text('DROP INDEX ix_users_role'))
+    db.session.commit()
+
+    hallazgos = asesorar(app)
+    assert indices_sugeridos(hallazgos) == {('users', ('role',)): 'ix_users_role'}
+    assert any(h.origen == 'filtro de admins (run.py)' for h in hallazgos)
+    # productos.user_id (filtro, /productos/usuario y la cascada) ya usa ix_productos_user_id_created_at
+    assert not any(h.tabla == 'productos' for h in hallazgos)
+
+# Test para el borrado por lotes en segundo plano de un usuario con muchos productos
+def test_eliminar_usuario_por_lotes(app, client, admin_headers, monkeypatch):
+    from sqlalchemy import text
+    from app.cache import CacheManager
+    from app.models import Producto, ProductoStats
+    from app.models.estadisticas import recalcular_stats, STATS_GLOBAL
+    from app.trabajos import trabajos
+    from tests.fake_redis import FakeRedis
+
+    redis_falso = FakeRedis()
+    monkeypatch.setattr(app, 'cache_manager', CacheManager(redis_falso))
+
+    otro = User(username='otro', role='user')
+    dueño = User(username='inventario', role='user')
+    for u in (otro, dueño):
+        u.set_password('pass123')
+    db.session.add_all([otro, dueño])
+    db.session.commit()
+    dueño_id, otro_id = dueño.id, otro.id
+    db.session.add_all([Producto(nombre=f'Caja {i}', precio=2.0, stock=3, user_id=dueño_id) for i in range(25)])
+    db.session.add(Producto(nombre='Ajeno', precio=5.0, stock=1, user_id=otro_id))
+    db.session.commit()
+    recalcular_stats()
+    db.session.commit()
+
+    app.config['USER_PURGE_BATCH'] = 10
+    response = client.delete(f'/api/usuarios/{dueño_id}', headers=admin_headers)
+    assert response.status_code == 202
+    job_id = response.json['job_id']
+
+    for _ in range(100):
+        estado = trabajos.estado(job_id)
+        if estado['estado'] in ('completado', 'fallido'):
+            break
+        time.sleep(0.05)
+    assert estado['estado'] == 'completado'
+    assert estado['resultado'] == {'user_id': dueño_id, 'productos_borrados': 25}
+    assert redis_falso.get('gen:productos') is None # Los listados de productos no se cachean
+
+    db.session.expire_all()
+    assert db.session.get(User, dueño_id) is None
+    assert Producto.query.count() == 1
+    assert db.session.get(ProductoStats, dueño_id) is None
+    assert db.session.get(ProductoStats, STATS_GLOBAL).total_productos == 1
+    assert db.session.execute(text("SELECT count(*) FROM productos_fts WHERE productos_fts MATCH 'caja'")).scalar() == 0
+
+    # Con foreign_keys=ON la BD borra en cascada lo que quede de un usuario
+    db.session.execute(text('DELETE FROM users WHERE id = :id'), {'id': otro_id})
+    db.session.commit()
+    assert Producto.query.count() == 0
+
+# Test para la cola de trabajos en Redis: estado en /api/jobs, reintento con backoff y visibility timeout
+def test_cola_trabajos(app, client, auth_headers, admin_headers, monkeypatch):
+    from app.trabajos import trabajos, TAREAS, COLA
+    from tests.fake_redis import FakeRedis
+
+    redis_falso = FakeRedis()
+    monkeypatch.setattr(trabajos, 'redis', redis_falso)
+    monkeypatch.setattr(trabajos, 'backoff_base', 0.05)
+    monkeypatch.setattr(trabajos, 'visibilidad', 0.2)
+
+    llamadas = []
+    def inestable(n):
+        llamadas.append(n)
+        if len(llamadas) == 1:
+            raise RuntimeError('fallo transitorio')
+        return {'doble': n * 2}
+    monkeypatch.setitem(TAREAS, 'prueba_inestable', inestable)
+
+    job_id = trabajos.encolar('prueba_inestable', creado_por='admin', n=21)
+    response = client.get(f'/api/jobs/{job_id}', headers=admin_headers)
+    assert (response.status_code, response.json['estado']) == (200, 'en_cola')
+    assert client.get(f'/api/jobs/{job_id}', headers=auth_headers).status_code == 403
+    assert client.get('/api/jobs/no-existe', headers=admin_headers).status_code == 404
+
+    # Primer intento falla: vuelve a la cola, invisible hasta que pase el backoff
+    assert trabajos.procesar_uno(app)
+    estado = trabajos.estado(job_id)
+    assert (estado['estado'], estado['intentos'], estado['error']) == ('reintentando', 1, 'fallo transitorio')
+    assert not trabajos.procesar_uno(app)
+    time.sleep(0.1)
+    assert trabajos.procesar_uno(app)
+    estado = client.get(f'/api/jobs/{job_id}', headers=admin_headers).json
+    assert (estado['estado'], estado['intentos'], estado['resultado']) == ('completado', 2, {'doble': 42})
+    assert redis_falso.zrangebyscore(COLA, '-inf', '+inf') == []
+
+    # Un consumidor que muere tras reclamar: el trabajo reaparece al vencer el visibility timeout
+    job_id = trabajos.encolar('prueba_inestable', n=1)
+    assert trabajos.reclamar()[0] == job_id
+    assert trabajos.reclamar() is None
+    time.sleep(0.25)
+    assert trabajos.procesar_uno(app)
+    assert trabajos.estado(job_id)['estado'] == 'completado'
+
+# Test para el volcado de métricas al salir: se omite con el circuito de Redis abierto
+def test_metricas_flush_al_salir():
+    import atexit
+    from types import SimpleNamespace
+    from app.metricas import Metricas
+    from tests.fake_redis import FakeRedis
+
+    m = Metricas()
+    atexit.unregister(m.flush_al_salir)
+    m.redis = SimpleNamespace(breaker=SimpleNamespace(abierto=True),
+                              pipeline=lambda **kwargs: pytest.fail('no debe llamar a Redis'))
+    m.registrar('cache', 'usuarios', hits=1)
+    m.flush_al_salir()
+
+    m.redis = FakeRedis()
+    m.flush_al_salir()
+    assert m.redis.hgetall('metricas:cache:usuarios') == {'hits': '1'}
+
+# Test para que limpiar la caché no borre la cola de trabajos ni las métricas del mismo Redis
+def test_limpiar_cache_conserva_trabajos(app, client, admin_headers, monkeypatch):
+    from app.cache import CacheManager
+    from app.trabajos import trabajos, TAREAS, COLA
+    from tests.fake_redis import FakeRedis
+
+    redis_falso = FakeRedis()
+    monkeypatch.setattr(trabajos, 'redis', redis_falso)
+    monkeypatch.setattr(app, 'cache_manager', CacheManager(redis_falso))
+    monkeypatch.setitem(TAREAS, 'prueba', lambda: None)
+
+    job_id = trabajos.encolar('prueba')
+    redis_falso.hincrby('metricas:cache:usuarios', 'hits', 3)
+    redis_falso.set('usuarios:g0:all:/api/usuarios:', 'cacheado')
+    redis_falso.set('producto:1', '{}')
+
+    response = client.post('/api/usuarios/cache/clear', headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json['deleted'] == 2
+    assert redis_falso.keys('usuarios:*') == redis_falso.keys('producto:*') == []
+
+    assert trabajos.estado(job_id)['estado'] == 'en_cola'
+    assert redis_falso.zrangebyscore(COLA, '-inf', '+inf') == [job_id]
+    assert redis_falso.hgetall('metricas:cache:usuarios') == {'hits': '3'}
@@ -0,0 +1,46 @@
+# ------- Consumidor de la cola de trabajos en segundo plano (Redis) -------
+#   python worker.py
+# ./start.sh lo arranca junto a Gunicorn (logs en logs/worker.log) y ./stop.sh lo detiene.
+# Se pueden lanzar varios: cada trabajo se reclama con un lease exclusivo. SIGTERM/SIGINT
+# terminan el trabajo en curso y salen; si el proceso muere, el trabajo vuelve a la cola
+# cuando vence JOBS_VISIBILITY_TIMEOUT
+
+import os
+import signal
+import sys
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.trabajos import trabajos, TAREAS
+
+# Crear la aplicación (registra las tareas al importar los blueprints)
+config_name = os.environ.get('FLASK_ENV', 'development')
+app = create_app(config_name)
+
+def main():
+
+    # RedisResiliente siempre es "verdadero": comprobar la URL y que Redis responda al arrancar
+    if not app.config.get('REDIS_URL') or trabajos.redis is None:
+        print("Redis no configurado: los trabajos se ejecutan en los workers web")
+        sys.exit(1)
+    try:
+        trabajos.redis.ping()
+    except Exception as e:
+        print(f"Redis no disponible en {app.config['REDIS_URL']} ({e}): el worker no arranca")
+        sys.exit(1)
+
+    parar = threading.Event()
+    for senal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(senal, lambda *_: parar.set())
+
+    print(f"Worker de trabajos (pid {os.getpid()}) | tareas: {', '.join(sorted(TAREAS))}")
+    trabajos.trabajar(app, parar)
+    print("Worker de trabajos detenido")
+
+if __name__ == "__main__":
+    main()